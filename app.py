@@ -1,18 +1,32 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request, render_template, Response, stream_with_context
+from flask import Flask, jsonify, request, render_template, Response, stream_with_context, g, abort, make_response, send_file
 from pathlib import Path
+import hmac
 import json
 import logging
 import os
 import time
 from datetime import datetime
 import threading
-import queue
 
 # Import modules
 from modules.scanner import RepositoryScanner
 from modules.git_operations import GitOperations
-from modules.config import ConfigManager
+from modules.config import ConfigManager, data_dir
+from modules.inventory import InventoryStore, stored_fields
+from modules.scan_diff import ScanChangeLog, compact_diff, diff_events
+from modules.status_history import StatusHistory
+from modules.search_index import SearchIndex
+from modules.events import EventHub, ProgressTicker, format_sse_batch
+from modules.bulk_pull import BulkPull, select_repositories
+from modules.fetch_scheduler import FetchScheduler
+from modules.rescan_scheduler import RescanScheduler, ActivityTracker
+from modules.fs_watcher import FilesystemWatcher
+from modules.disk_usage import DiskUsageScheduler
+from modules.parallel_scan import ProcessPoolScanner, dedupe_scan_paths
+from modules import metrics, tracing, writer
+from modules.profiling import ProfileManager, ProfilerBusy, MODES as PROFILE_MODES
+from modules.jobs import JobManager, JobCancelled, ACTIVE_STATES, PRIORITY_HIGH, PRIORITY_NORMAL
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -26,26 +40,457 @@ app = Flask(__name__,
 # Initialize configuration
 config_manager = ConfigManager(app)
 
-# Global scan progress tracking
-scan_progress = {
-    "is_scanning": False,
-    "total_dirs": 0,
-    "processed_dirs": 0,
-    "git_repos_found": 0,
-    "scan_path": "",
-    "message": "",
-    "progress_queue": queue.Queue()
-}
+# Repository inventory with generation tracking for incremental sync
+inventory = InventoryStore(config_manager)
+
+# Compact record of what each scan added, removed, moved or changed
+scan_change_log = ScanChangeLog()
+
+# Status transitions over time, fed by every inventory write
+status_history = StatusHistory()
+inventory.add_listener(status_history.on_inventory_change)
+
+# Full-text search over names, paths, remotes, descriptions, branches and commit messages
+search_index = SearchIndex()
+search_index.attach(inventory)
+
+# Fan-out hub for progress events: "job:<id>" per job, plus the legacy
+# "scan" topic for scans and "pull:<repo_id>" for pulls
+event_hub = EventHub()
+
+def _max_concurrent_jobs():
+    return config_manager.get_config().get("max_concurrent_jobs", 4)
+
+# Scans, pulls and status refreshes run as jobs on a bounded worker pool
+job_manager = JobManager(event_hub, max_workers=_max_concurrent_jobs)
+
+# Keeps ahead/behind fresh by fetching remote-tracking refs in the background
+fetch_scheduler = FetchScheduler(inventory)
+
+# Process pool for scans when scan_processes > 0; started on first use
+process_scanner = ProcessPoolScanner()
+
+def worker_tasks_enabled():
+    """True when scans, enrichment and pulls are dispatched to Celery workers (task_backend: celery)"""
+    return config_manager.get_config().get("task_backend", "local") == "celery"
+
+def git_operations():
+    """GitOperations for jobs: local, or running each call as a task on a Celery worker"""
+    if worker_tasks_enabled():
+        # Celery is only imported when the worker backend is configured
+        from modules.tasks import RemoteGitOperations
+        return RemoteGitOperations(timeout=config_manager.get_config().get("task_timeout", 600))
+    return GitOperations()
+
+# In-flight interactive API requests; background rescans pause while any are running
+activity = ActivityTracker()
+
+def _interactive_work_in_progress():
+    return activity.busy() or bool(job_manager.active())
+
+def rescan_subtree(path, max_depth, should_stop):
+    """
+    Rescan one subtree of the scan directory into the inventory.
+    
+    Returns:
+        dict or None: The scan summary, or None if the walk was stopped and nothing was stored.
+    """
+    stopped = []
+    
+    def stop_requested():
+        if should_stop():
+            stopped.append(True)
+            return True
+        return False
+    
+    scanner = RepositoryScanner(config_manager.get_config())
+    git_repos, non_git_dirs = scanner.scan_directory(Path(path), max_depth=max_depth, should_stop=stop_requested)
+    if stopped:
+        return None
+    return store_subtree_scan(path, git_repos, non_git_dirs)
+
+def store_subtree_scan(path, git_repos, non_git_dirs):
+    """Store the walk of one subtree (an empty walk removes it) and push the diff to SSE clients"""
+    scanner = RepositoryScanner(config_manager.get_config())
+    result_data = {
+        "scan_time": datetime.now().isoformat(),
+        "scan_directory": path,
+        "git_repositories": scanner.get_repositories_info(git_repos),
+        "non_git_directories": scanner.get_directories_info(non_git_dirs),
+    }
+    summary, diff = store_scan_results([path], result_data)
+    for event in diff_events(diff):
+        event_hub.publish("scan", event)
+    return summary
+
+def refresh_watched_repositories(paths):
+    """Re-read the git state of repositories whose HEAD, index or refs changed on disk"""
+    by_path = {repo.get("path"): repo for repo in inventory.get_repositories()}
+    git_ops = GitOperations()
+    updates = {}
+    for path in paths:
+        repo = by_path.get(path)
+        if repo is None:
+            continue
+        git_info = git_ops.get_repository_info(path)
+        if "error" not in git_info:
+            updates[repo["id"]] = stored_fields(git_info)
+    if not updates:
+        return
+    
+    records = inventory.update_repositories(updates)
+    for repo_id, record in records.items():
+        previous = by_path[record.get("path")]
+        fields = sorted(key for key in updates[repo_id] if previous.get(key) != record.get(key))
+        if fields:
+            event_hub.publish("scan", {
+                "status": "changed",
+                "message": f"Repository changed: {record.get('path')} ({', '.join(fields)})",
+                "repository": {"id": repo_id, "path": record.get("path")},
+                "fields": fields
+            })
+
+# Rescans each top-level subtree of scan_directory as often as it actually changes
+rescan_scheduler = RescanScheduler(
+    rescan_subtree, config_manager.get_config, is_busy=_interactive_work_in_progress
+)
+
+def start_rescan_scheduler(reason=None):
+    """Start scheduled rescans (also the fallback when filesystem watching is unavailable)"""
+    if reason:
+        logger.info(f"Falling back to scheduled rescans: {reason}")
+    rescan_scheduler.configure(config_manager.get_config())
+    rescan_scheduler.start()
+
+# Live inventory updates from inotify; falls back to scheduled rescans
+fs_watcher = FilesystemWatcher(
+    config_manager.get_config,
+    store_subtree_scan,
+    refresh_watched_repositories,
+    lambda: [repo.get("path") for repo in inventory.get_repositories()],
+    on_fallback=start_rescan_scheduler
+)
+
+# Keeps `size` and `size_details` of every repository current, at idle I/O priority
+disk_usage = DiskUsageScheduler(inventory, is_busy=_interactive_work_in_progress)
+
+# Fields /api/repositories can be sorted by (?sort=<field>&order=asc|desc)
+REPOSITORY_SORT_FIELDS = ("name", "path", "last_modified", "status", "size")
+
+# Serialized /api/repositories bodies, by (sort field, descending), with the
+# generation each was built for; the inventory is read far more often than it changes
+_repositories_bodies = {}
+
+def _sorted_repositories(repositories, sort, descending):
+    """Sort by one field; repositories without a value for it come last in either order"""
+    def key(repo):
+        value = repo[sort]
+        return value.lower() if isinstance(value, str) else value
+    present = sorted((repo for repo in repositories if repo.get(sort) is not None), key=key, reverse=descending)
+    return present + [repo for repo in repositories if repo.get(sort) is None]
+
+def repositories_body(sort=None, descending=False):
+    """The /api/repositories JSON for the current inventory generation, in inventory order unless sorted"""
+    generation, body = _repositories_bodies.get((sort, descending), (None, None))
+    if generation == inventory.get_generation():
+        metrics.CACHE_REQUESTS.inc(cache="repositories_response", result="hit")
+        return body
+    metrics.CACHE_REQUESTS.inc(cache="repositories_response", result="miss")
+    generation, repositories = inventory.get_snapshot()
+    if sort:
+        repositories = _sorted_repositories(repositories, sort, descending)
+    body = f"{app.json.dumps(repositories)}\n"
+    _repositories_bodies[(sort, descending)] = (generation, body)
+    return body
+
+# Set once warm_up has finished (see /readyz)
+warmed_up = threading.Event()
+
+def warm_up():
+    """
+    Load the stored inventory and bring the search index up to date with it, so the
+    first requests after a restart do not pay for parsing a large inventory
+    """
+    started = time.perf_counter()
+    try:
+        repositories = len(inventory.get_repositories())
+        search_index.ensure_current()
+        repositories_body()
+        logger.info(f"Loaded {repositories} repositories in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logger.error(f"Error warming up: {e}")
+    finally:
+        warmed_up.set()
+
+def start_background_services():
+    """Start warming up and the background schedulers enabled in the configuration"""
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    config = config_manager.get_config()
+    metrics.registry.enabled = bool(config.get("metrics_enabled", False))
+    tracing.tracer.enabled = bool(config.get("tracing_enabled", False))
+    if config.get("fetch_enabled", False):
+        fetch_scheduler.configure(config)
+        fetch_scheduler.start()
+    if config.get("watch_enabled", False):
+        fs_watcher.start()
+    elif config.get("rescan_enabled", False):
+        start_rescan_scheduler()
+    if config.get("disk_usage_enabled", False):
+        disk_usage.configure(config)
+        disk_usage.start()
 
-# Global pull progress tracking
-pull_progress = {
-    "is_pulling": False,
-    "repo_id": "",
-    "repo_path": "",
-    "message": "",
-    "progress_queue": queue.Queue()
+def stop_background_services():
+    """Stop the background schedulers"""
+    fs_watcher.stop()
+    rescan_scheduler.stop()
+    fetch_scheduler.stop()
+    disk_usage.stop()
+    process_scanner.shutdown()
+
+# Role of this process under the multi-process server (see gunicorn.conf.py and modules.writer)
+role = writer.SINGLE
+writer_lock = writer.WriterLock(str(data_dir() / "writer.lock"))
+writer_socket = None
+
+# Routes reader workers answer from the shared inventory file; they forward everything else to the writer.
+# /metrics and the debug routes are forwarded too: only the writer enables metrics and tracing and runs jobs.
+READER_ROUTES = {
+    "/", "/debug", "/simplified", "/static/<path:filename>", "/healthz", "/readyz",
+    "/api/repositories", "/api/repositories/changes", "/api/browse_directories",
+    "/api/repository/<repo_id>/status"
 }
 
+def preload():
+    """
+    Load the config and the inventory in the server's master process, so that
+    every worker forked from it starts with the inventory already parsed
+    """
+    config_manager.init_config()
+    repositories_body()
+
+def start_worker():
+    """Become the writer if no other worker process is one, otherwise a reader"""
+    global role, writer_socket
+    writer_socket = os.environ["SENTINEL_WRITER_SOCKET"]
+    if writer_lock.acquire():
+        role = writer.WRITER
+        writer.serve_writer(app, writer_socket)
+        start_background_services()
+    else:
+        role = writer.READER
+        config_manager.follow_changes()
+        inventory.follow_changes()
+        warmed_up.set()
+    logger.info(f"Worker {os.getpid()} is the {role}")
+
+def stop_worker():
+    """Stop the writer's background services and give up the writer lock"""
+    if role == writer.WRITER:
+        stop_background_services()
+        writer_lock.release()
+
+# Maximum number of queued events sent in a single SSE write
+SSE_BATCH_SIZE = 100
+
+@app.before_request
+def forward_to_writer():
+    """In a reader worker, forward every request outside READER_ROUTES to the writer"""
+    if role != writer.READER or request.url_rule is None:
+        return
+    if request.method in ("GET", "HEAD") and request.url_rule.rule in READER_ROUTES:
+        return
+    return writer.forward(request, app.response_class, writer_socket)
+
+@app.before_request
+def track_interactive_request():
+    """Count API requests so background rescans can yield to them (progress streams excluded)"""
+    if request.path.endswith('/progress'):
+        return
+    if request.path.startswith('/api/'):
+        activity.begin()
+        g.tracked_request = True
+    if metrics.registry.enabled:
+        g.request_started = time.perf_counter()
+
+@app.teardown_request
+def untrack_interactive_request(exc):
+    if g.pop('tracked_request', False):
+        activity.end()
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.HTTP_REQUEST.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+
+def _sse_subscriber_counts():
+    # Per-job and per-repository topics are folded into their kind to keep label values bounded
+    counts = {}
+    for topic, count in event_hub.subscriber_counts().items():
+        kind = topic.split(":", 1)[0]
+        counts[kind] = counts.get(kind, 0) + count
+    return [({"topic": kind}, count) for kind, count in counts.items()]
+
+def _active_job_counts():
+    counts = {}
+    for job in job_manager.active():
+        counts[job.kind] = counts.get(job.kind, 0) + 1
+    return [({"kind": kind}, count) for kind, count in counts.items()]
+
+metrics.registry.gauge(
+    "sentinel_sse_subscribers", "Connected progress stream subscribers, by topic kind", ("topic",),
+    callback=_sse_subscriber_counts
+)
+metrics.registry.gauge(
+    "sentinel_job_queue_depth", "Jobs waiting for a worker",
+    callback=lambda: [({}, job_manager.queue_depth())]
+)
+metrics.registry.gauge(
+    "sentinel_jobs_active", "Queued or running jobs, by kind", ("kind",),
+    callback=_active_job_counts
+)
+metrics.registry.gauge(
+    "sentinel_fetch_due", "Repositories whose background fetch is due",
+    callback=lambda: [({}, fetch_scheduler.status()["due"])]
+)
+metrics.registry.gauge(
+    "sentinel_inventory_repositories", "Repositories in the inventory",
+    callback=lambda: [({}, len(inventory.get_repositories()))]
+)
+
+# On-demand CPU profiles of single requests and jobs, saved to data/profiles/
+profiler = ProfileManager()
+
+# Routes where ?profile=<mode> profiles the job they start rather than the request itself
+JOB_PROFILE_ENDPOINTS = ("scan_repositories", "scan_repository_paths", "pull_repository")
+
+def _profile_error(message, status):
+    abort(make_response(jsonify({"error": message}), status))
+
+def _require_profile_token():
+    """Abort unless the request carries SENTINEL_PROFILE_TOKEN in X-Profile-Token"""
+    # Read from the environment rather than the config, which GET /api/config exposes
+    token = os.environ.get("SENTINEL_PROFILE_TOKEN")
+    if not token:
+        _profile_error("Profiling is disabled (set SENTINEL_PROFILE_TOKEN)", 403)
+    if not hmac.compare_digest(str(token), request.headers.get("X-Profile-Token", "")):
+        _profile_error("Invalid or missing X-Profile-Token", 403)
+
+def requested_profile():
+    """
+    The profile requested with ?profile=<cprofile|sample>&profile_rate=<hz>, as a
+    (mode, rate) tuple, or None. Aborts the request if it is not authorized.
+    """
+    mode = request.args.get("profile")
+    if not mode:
+        return None
+    _require_profile_token()
+    if mode not in PROFILE_MODES:
+        _profile_error(f"'profile' must be one of: {', '.join(PROFILE_MODES)}", 400)
+    try:
+        rate = int(request.args.get("profile_rate", config_manager.get_config().get("profiling_sample_rate", 100)))
+    except ValueError:
+        _profile_error("'profile_rate' must be an integer", 400)
+    return mode, rate
+
+def profiled_job(func, profile):
+    """Wrap a job function so that it runs under the profiler; the summary is stored on the job"""
+    if profile is None:
+        return func
+    mode, rate = profile
+    
+    def run(job):
+        try:
+            # Sampling covers the job thread and the threads it starts (scan walkers)
+            session = profiler.session(mode, f"{job.kind}-{job.id}", rate=rate, follow_new_threads=True)
+        except ProfilerBusy as e:
+            job.profile = {"error": f"Not profiled: {e}"}
+            return func(job)
+        try:
+            with session:
+                return func(job)
+        finally:
+            job.profile = session.summary
+    return run
+
+@app.before_request
+def start_request_profile():
+    if request.endpoint in JOB_PROFILE_ENDPOINTS or request.path.endswith('/progress'):
+        return
+    profile = requested_profile()
+    if profile is None:
+        return
+    mode, rate = profile
+    try:
+        session = profiler.session(mode, f"request-{request.endpoint}", rate=rate)
+    except ProfilerBusy as e:
+        _profile_error(str(e), 409)
+    g.profile_session = session.__enter__()
+
+@app.after_request
+def finish_request_profile(response):
+    session = g.pop('profile_session', None)
+    if session is None:
+        return response
+    session.__exit__(None, None, None)
+    # The profiled response is returned under "response", next to the profile summary
+    return make_response(jsonify({
+        "profile": session.summary,
+        "status_code": response.status_code,
+        "response": response.get_json(silent=True) if response.is_json else None
+    }), response.status_code)
+
+@app.teardown_request
+def abandon_request_profile(exc):
+    # Requests that raised never reach after_request
+    session = g.pop('profile_session', None)
+    if session is not None:
+        session.__exit__(None, None, None)
+
+@app.route('/api/debug/profiles')
+def list_profiles():
+    """Saved profiles, newest first"""
+    _require_profile_token()
+    return jsonify(profiler.list())
+
+@app.route('/api/debug/profiles/<name>')
+def download_profile(name):
+    """Download a saved profile (.prof for pstats/snakeviz, .folded for speedscope/flamegraph.pl)"""
+    _require_profile_token()
+    path = profiler.path_for(name)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, as_attachment=True, download_name=path.name)
+
+@app.route('/api/debug/trace/<job_id>')
+def get_job_trace(job_id):
+    """A traced job's spans in the Chrome trace-event format (open in Perfetto or chrome://tracing)"""
+    # Span attributes include repository paths and git commands
+    _require_profile_token()
+    trace = tracing.tracer.get(job_id)
+    if trace is None:
+        return jsonify({"error": "No trace recorded for this job (set tracing_enabled, or it was evicted)"}), 404
+    return jsonify(trace.to_chrome())
+
+@app.route('/metrics')
+def get_metrics():
+    """Metrics in the Prometheus text format (404 unless metrics_enabled is set)"""
+    if not metrics.registry.enabled:
+        abort(404)
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/healthz')
+def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readiness():
+    """Readiness probe: 503 until the stored inventory has been loaded (and, in a reader, the writer is serving)"""
+    if not (warmed_up.is_set() and inventory.ready()):
+        return jsonify({"status": "starting"}), 503
+    if role == writer.READER and not os.path.exists(writer_socket):
+        return jsonify({"status": "waiting_for_writer"}), 503
+    return jsonify({"status": "ready", "role": role, "generation": inventory.get_generation()})
+
 # Routes
 @app.route('/')
 def index():
@@ -140,33 +585,48 @@ def browse_directories():
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
 
-@app.route('/api/scan/progress', methods=['GET'])
-def scan_progress_stream():
-    """Stream scan progress updates using Server-Sent Events"""
+def _last_event_id():
+    """Get the Last-Event-ID sent by a reconnecting EventSource (header or query parameter)"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None
+
+def _stream_events(topic, initial_event, heartbeat):
+    """
+    Build an SSE response that relays every event published on a hub topic.
+    
+    New clients get `initial_event` first; reconnecting clients (Last-Event-ID) get the
+    buffered events they missed instead, or a `resync` event followed by `initial_event`
+    if those were already evicted.
+    """
+    last_event_id = _last_event_id()
+    subscription = event_hub.subscribe(topic, last_event_id=last_event_id)
+    
     def generate():
-        # Initial event when connected
-        if scan_progress["is_scanning"]:
-            # Create a copy of scan_progress without the queue
-            progress_copy = {k: v for k, v in scan_progress.items() if k != "progress_queue"}
-            yield f"data: {json.dumps({'status': 'scanning', 'progress': progress_copy})}\n\n"
-        else:
-            yield f"data: {json.dumps({'status': 'idle'})}\n\n"
-        
-        # Wait for new events
-        while True:
-            try:
-                # Get a progress update if available or wait for 1 second
-                try:
-                    progress_update = scan_progress["progress_queue"].get(timeout=1.0)
-                    yield f"data: {json.dumps(progress_update)}\n\n"
-                except queue.Empty:
+        try:
+            if last_event_id is None:
+                yield f"data: {json.dumps(initial_event)}\n\n"
+            elif event_hub.replay_gap(topic, last_event_id):
+                yield f"data: {json.dumps({'status': 'resync', 'message': 'Missed events are no longer available; refetch current state'})}\n\n"
+                yield f"data: {json.dumps(initial_event)}\n\n"
+            
+            # Wait for new events, sending everything already queued in one write
+            while True:
+                events = subscription.get_batch(SSE_BATCH_SIZE, timeout=1.0)
+                if events:
+                    yield format_sse_batch(events)
+                elif subscription.overflowed:
+                    # Too slow to keep up: tell the client to reconnect with its Last-Event-ID
+                    yield f"data: {json.dumps({'status': 'resync', 'message': 'Client fell too far behind'})}\n\n"
+                    break
+                else:
                     # Send a heartbeat event to keep connection alive
-                    yield f"data: {json.dumps({'status': 'heartbeat'})}\n\n"
-                    
-                time.sleep(0.1)  # Small pause to prevent CPU hogging
-            except GeneratorExit:
-                # Client disconnected
-                break
+                    yield f"data: {json.dumps(heartbeat)}\n\n"
+        finally:
+            # Client disconnected
+            subscription.close()
     
     return Response(stream_with_context(generate()), 
                    mimetype='text/event-stream',
@@ -175,251 +635,714 @@ def scan_progress_stream():
                        'Connection': 'keep-alive'
                    })
 
+def _active_scan_job():
+    """The most recently submitted scan job that is still queued or running, if any"""
+    jobs = job_manager.active(kind="scan")
+    return jobs[0] if jobs else None
+
+def scan_stream_initial_event():
+    """First event sent to a new scan progress listener"""
+    job = _active_scan_job()
+    if job is not None:
+        return {'status': 'scanning', 'job_id': job.id, 'state': job.state, 'progress': dict(job.progress)}
+    return {'status': 'idle'}
+
+def pull_stream_initial_event(repo_id):
+    """First event sent to a new pull progress listener for a repository"""
+    job = job_manager.get_active(f"pull:{repo_id}")
+    if job is not None:
+        return {'status': 'pulling', 'job_id': job.id, 'state': job.state, 'progress': dict(job.progress), 'repo_id': repo_id}
+    return {'status': 'idle', 'repo_id': repo_id}
+
+@app.route('/api/scan/progress', methods=['GET'])
+def scan_progress_stream():
+    """Stream progress updates of all scan jobs using Server-Sent Events"""
+    return _stream_events("scan", scan_stream_initial_event(), {'status': 'heartbeat'})
+
 @app.route('/api/repository/<repo_id>/pull/progress', methods=['GET'])
 def pull_progress_stream(repo_id):
     """Stream pull progress updates using Server-Sent Events"""
-    def generate():
-        # Initial event when connected
-        if pull_progress["is_pulling"] and pull_progress["repo_id"] == repo_id:
-            # Create a copy of pull_progress without the queue
-            progress_copy = {k: v for k, v in pull_progress.items() if k != "progress_queue"}
-            yield f"data: {json.dumps({'status': 'pulling', 'progress': progress_copy})}\n\n"
+    return _stream_events(f"pull:{repo_id}", pull_stream_initial_event(repo_id), {'status': 'heartbeat', 'repo_id': repo_id})
+
+def store_scan_results(scan_paths, result_data):
+    """
+    Store a scan in the inventory and record its diff in the change log (unless the
+    scan changed no repository's presence, location or status).
+    
+    A scan of the configured scan_directory replaces the whole inventory; any other
+    scan only replaces the repositories under the scanned paths.
+    
+    Returns:
+        tuple: (summary, diff) where summary has the new generation and change counts.
+    """
+    scan_root = os.path.abspath(config_manager.get_config().get("scan_directory", ""))
+    with tracing.span("persist.inventory", repositories=len(result_data["git_repositories"])):
+        if scan_paths == [scan_root]:
+            summary = inventory.replace_scan(result_data)
         else:
-            yield f"data: {json.dumps({'status': 'idle', 'repo_id': repo_id})}\n\n"
-        
-        # Wait for new events
-        while True:
-            try:
-                # Get a progress update if available or wait for 1 second
-                try:
-                    progress_update = pull_progress["progress_queue"].get(timeout=1.0)
-                    # Only send updates for the requested repo
-                    if progress_update.get("repo_id") == repo_id:
-                        yield f"data: {json.dumps(progress_update)}\n\n"
-                except queue.Empty:
-                    # Send a heartbeat event to keep connection alive
-                    yield f"data: {json.dumps({'status': 'heartbeat', 'repo_id': repo_id})}\n\n"
-                    
-                time.sleep(0.1)  # Small pause to prevent CPU hogging
-            except GeneratorExit:
-                # Client disconnected
-                break
+            summary = inventory.merge_scan(scan_paths, result_data)
     
-    return Response(stream_with_context(generate()), 
-                   mimetype='text/event-stream',
-                   headers={
-                       'Cache-Control': 'no-cache',
-                       'Connection': 'keep-alive'
-                   })
+    diff = summary.pop("diff")
+    # Refreshed fields like last_modified bump the generation but are not part of the diff
+    if not summary["unchanged"] and any(diff[key] for key in ("added", "removed", "moved", "changed")):
+        with tracing.span("persist.change_log"):
+            scan_change_log.append(compact_diff(diff, summary["generation"], result_data["scan_time"]))
+    return summary, diff
 
-def progress_update_callback(update_info):
-    """Callback function to report scan progress"""
-    global scan_progress
+def perform_scan_async(job, scan_paths, max_depth):
+    """
+    Run a scan job on a job worker thread.
     
-    if update_info.get("type") == "git_repo":
-        scan_progress["git_repos_found"] += 1
+    A scan of the configured scan_directory replaces the whole inventory. Any other
+    scan is scoped: only repositories under the scanned paths are replaced and the
+    results are merged into the stored inventory.
+    """
+    scan_label = ", ".join(scan_paths)
+    progress = job.progress
     
-    scan_progress["processed_dirs"] += 1
-    scan_progress["message"] = update_info.get("message", "")
+    # Counters are updated from many scanner threads at once
+    progress_lock = threading.Lock()
     
-    # Put update in the queue for SSE clients
-    progress_update = {
-        "status": "progress", 
-        "progress": {k: v for k, v in scan_progress.items() if k != "progress_queue"},
-        "update": update_info
-    }
-    scan_progress["progress_queue"].put(progress_update)
-
-def pull_update_callback(update_info):
-    """Callback function to report pull progress"""
-    global pull_progress
+    def snapshot():
+        with progress_lock:
+            return dict(progress)
     
-    # Add the update to the progress info
-    pull_progress["message"] = update_info.get("message", "")
+    # Progress is published as a coalesced snapshot at most every 100ms,
+    # however fast the scanner reports directories
+    ticker = ProgressTicker(
+        event_hub, job.topics,
+        lambda: {"status": "progress", "progress": snapshot(), "job_id": job.id}
+    )
     
-    # Put update in the queue for SSE clients
-    progress_update = {
-        "status": update_info.get("status", "progress"), 
-        "progress": {k: v for k, v in pull_progress.items() if k != "progress_queue"},
-        "update": update_info,
-        "repo_id": pull_progress["repo_id"]
-    }
-    pull_progress["progress_queue"].put(progress_update)
-
-def perform_scan_async(scan_path, max_depth):
-    """Perform the scan in a background thread"""
-    global scan_progress
+    def progress_update_callback(update_info):
+        """Callback function to report scan progress"""
+        with progress_lock:
+            if update_info.get("type") == "git_repo":
+                progress["git_repos_found"] += 1
+            
+            progress["processed_dirs"] += 1
+            progress["message"] = update_info.get("message", "")
+        
+        # Found repositories and errors are sent individually; plain directory
+        # progress is folded into the next coalesced counter tick
+        if update_info.get("type") in ("git_repo", "error"):
+            job.publish({"status": "progress", "update": update_info})
+        ticker.mark()
     
     # Reset progress
-    scan_progress["is_scanning"] = True
-    scan_progress["total_dirs"] = 0  # Will be estimated
-    scan_progress["processed_dirs"] = 0
-    scan_progress["git_repos_found"] = 0
-    scan_progress["scan_path"] = scan_path
-    scan_progress["message"] = f"Starting scan of {scan_path}"
+    with progress_lock:
+        progress.update({
+            "is_scanning": True,
+            "total_dirs": 100,  # Placeholder value; directories are not counted up front
+            "processed_dirs": 0,
+            "git_repos_found": 0,
+            "scan_path": scan_label,
+            "message": f"Starting scan of {scan_label}"
+        })
     
     # Send initial message
-    scan_progress["progress_queue"].put({
-        "status": "started", 
-        "progress": {k: v for k, v in scan_progress.items() if k != "progress_queue"}
-    })
+    job.publish({"status": "started", "progress": snapshot()})
+    ticker.start()
+    scan_started = time.perf_counter()
     
     try:
-        # Skip directory counting for now to fix the error
-        scan_progress["total_dirs"] = 100  # Placeholder value
-        
-        # Perform the actual scan
-        scanner = RepositoryScanner(config_manager.get_config())
-        git_repos, non_git_dirs = scanner.scan_directory(
-            Path(scan_path),
-            max_depth=max_depth,
-            progress_callback=progress_update_callback  # Pass our callback
-        )
+        # Perform the actual scan of each requested path
+        config = config_manager.get_config()
+        repositories, directories = [], []
+        if worker_tasks_enabled():
+            scan_mode = "celery"
+            # Walk and enrich on the Celery workers; this thread only dispatches and collects
+            from modules.tasks import distributed_scan
+            for scan_path in scan_paths:
+                path_repos, path_dirs = distributed_scan(
+                    scan_path, config, max_depth,
+                    progress_callback=progress_update_callback,
+                    should_stop=lambda: job.cancelled,
+                    timeout=config.get("task_timeout", 600)
+                )
+                repositories.extend(path_repos)
+                directories.extend(path_dirs)
+        elif config.get("scan_processes", 0) > 0:
+            scan_mode = "processes"
+            # Walk shards and enrich chunks in worker processes to use more than one core
+            for scan_path in scan_paths:
+                path_repos, path_dirs = process_scanner.scan(
+                    scan_path, config, max_depth,
+                    processes=config["scan_processes"],
+                    progress_callback=progress_update_callback,
+                    should_stop=lambda: job.cancelled
+                )
+                repositories.extend(path_repos)
+                directories.extend(path_dirs)
+        else:
+            scan_mode = "threads"
+            scanner = RepositoryScanner(config)
+            git_repos, non_git_dirs = [], []
+            for scan_path in scan_paths:
+                path_repos, path_dirs = scanner.scan_directory(
+                    Path(scan_path),
+                    max_depth=max_depth,
+                    progress_callback=progress_update_callback,  # Pass our callback
+                    should_stop=lambda: job.cancelled
+                )
+                git_repos.extend(path_repos)
+                non_git_dirs.extend(path_dirs)
+            job.raise_if_cancelled()
+            walk_seconds = time.perf_counter() - scan_started
+            if walk_seconds > 0:
+                metrics.SCAN_RATE.set(snapshot()["processed_dirs"] / walk_seconds)
+            repositories = scanner.get_repositories_info(git_repos)
+            directories = scanner.get_directories_info(non_git_dirs)
+        
+        # Flush the final counters before the diff and completion events
+        ticker.stop()
+        metrics.SCAN_DURATION.observe(time.perf_counter() - scan_started, mode=scan_mode)
+        
+        # A cancelled walk only has partial results; never store them
+        job.raise_if_cancelled()
         
         # Process results
         result_data = {
             "scan_time": datetime.now().isoformat(),
-            "scan_directory": scan_path,
-            "git_repositories": scanner.get_repositories_info(git_repos),
-            "non_git_directories": scanner.get_directories_info(non_git_dirs),
+            "scan_directory": scan_label,
+            "git_repositories": repositories,
+            "non_git_directories": directories,
         }
         
-        # Save results
-        config_manager.save_scan_results(result_data)
+        # Save results, then push the diff against the previous generation to SSE clients
+        summary, diff = store_scan_results(scan_paths, result_data)
+        with tracing.span("stream.diff_events"):
+            for event in diff_events(diff):
+                job.publish(event)
         
         # Send completion message
-        scan_progress["progress_queue"].put({
+        job.message = f"Scan completed. Found {len(repositories)} Git repositories."
+        job.publish({
             "status": "completed", 
-            "progress": {k: v for k, v in scan_progress.items() if k != "progress_queue"},
-            "message": f"Scan completed. Found {len(git_repos)} Git repositories.",
-            "result": result_data
+            "progress": snapshot(),
+            "message": job.message,
+            "summary": summary
         })
+        return summary
+    except JobCancelled:
+        ticker.stop()
+        raise
     except Exception as e:
         logger.error(f"Error during scan: {e}")
-        scan_progress["progress_queue"].put({
+        ticker.stop()
+        job.message = f"Error during scan: {str(e)}"
+        job.publish({
             "status": "error", 
-            "progress": {k: v for k, v in scan_progress.items() if k != "progress_queue"},
-            "message": f"Error during scan: {str(e)}"
+            "progress": snapshot(),
+            "message": job.message
         })
+        raise
     finally:
-        scan_progress["is_scanning"] = False
+        with progress_lock:
+            progress["is_scanning"] = False
 
-def perform_pull_async(repo_id, repo_path):
-    """Perform the pull in a background thread"""
-    global pull_progress
+def perform_pull_async(job, repo_id, repo_path):
+    """
+    Run a pull job on a job worker thread.
+    
+    A pull cannot be interrupted once git has started, so cancellation only
+    applies while the job is still queued.
+    """
+    progress = job.progress
     
     # Reset progress
-    pull_progress["is_pulling"] = True
-    pull_progress["repo_id"] = repo_id
-    pull_progress["repo_path"] = repo_path
-    pull_progress["message"] = f"Starting pull for repository at {repo_path}"
-    
-    # Send initial message (careful not to include queue)
-    initial_progress = {k: v for k, v in pull_progress.items() if k != "progress_queue"}
-    pull_progress["progress_queue"].put({
+    progress.update({
+        "is_pulling": True,
+        "repo_id": repo_id,
+        "repo_path": repo_path,
+        "message": f"Starting pull for repository at {repo_path}"
+    })
+    
+    def pull_update_callback(update_info):
+        """Callback function to report pull progress"""
+        progress["message"] = update_info.get("message", "")
+        
+        # Publish the update to SSE clients of this repository
+        progress_update = {
+            "status": update_info.get("status", "progress"), 
+            "progress": dict(progress),
+            "update": update_info,
+            "repo_id": repo_id
+        }
+        # Git transfer progress (percentages) is coalesced so only the latest is pending
+        coalesce_key = "git-progress" if "operation" in update_info else None
+        job.publish(progress_update, coalesce_key=coalesce_key)
+    
+    # Send initial message
+    job.publish({
         "status": "started", 
-        "progress": initial_progress,
+        "progress": dict(progress),
         "repo_id": repo_id
     })
     
     try:
         # Perform the pull
-        git_ops = GitOperations()
+        git_ops = git_operations()
         pull_result = git_ops.pull_repository(repo_path, progress_callback=pull_update_callback)
         
-        # Send completion message (careful not to include queue)
-        completion_progress = {k: v for k, v in pull_progress.items() if k != "progress_queue"}
-        pull_progress["progress_queue"].put({
+        # Refresh the stored record so delta clients see the new state; a failed
+        # read must not replace the good record with an error record
+        if pull_result.get("success"):
+            git_info = git_ops.get_repository_info(repo_path)
+            if "error" not in git_info:
+                inventory.update_repository(repo_id, git_info)
+            else:
+                logger.warning(f"Could not re-read {repo_path} after pulling: {git_info['error']}")
+        
+        # Send completion message
+        job.message = pull_result.get("message", "Pull completed")
+        job.publish({
             "status": "completed", 
-            "progress": completion_progress,
-            "message": pull_result.get("message", "Pull completed"),
+            "progress": dict(progress),
+            "message": job.message,
             "result": pull_result,
             "repo_id": repo_id
         })
-        
-        return pull_result
     except Exception as e:
         logger.error(f"Error during pull: {e}")
         
-        # Send error message (careful not to include queue)
-        error_progress = {k: v for k, v in pull_progress.items() if k != "progress_queue"}
-        pull_progress["progress_queue"].put({
+        # Send error message
+        job.message = f"Error during pull: {str(e)}"
+        job.publish({
             "status": "error", 
-            "progress": error_progress,
-            "message": f"Error during pull: {str(e)}",
+            "progress": dict(progress),
+            "message": job.message,
             "repo_id": repo_id
         })
-        
-        return {
-            "success": False,
-            "message": f"Error: {str(e)}"
-        }
+        raise
     finally:
-        pull_progress["is_pulling"] = False
+        progress["is_pulling"] = False
+    
+    # A pull that git refused (local changes, no remote, conflicts) fails the job
+    if not pull_result.get("success"):
+        raise RuntimeError(pull_result.get("message", "Pull failed"))
+    return pull_result
+
+def perform_refresh_async(job, repo_id, repo_path):
+    """Run a status refresh job: re-read one repository's git state into the inventory"""
+    job.progress.update({"repo_id": repo_id, "repo_path": repo_path})
+    job.publish({"status": "started", "repo_id": repo_id})
+    
+    git_info = git_operations().get_repository_info(repo_path)
+    if "error" in git_info:
+        raise RuntimeError(git_info["error"])
+    repository = inventory.update_repository(repo_id, git_info)
+    
+    job.message = f"Refreshed status of {repo_path}"
+    job.publish({"status": "completed", "repo_id": repo_id, "message": job.message})
+    return {"repo_id": repo_id, "status": (repository or git_info).get("status")}
+
+def perform_bulk_pull_async(job, repositories):
+    """
+    Run a bulk pull job: pull many repositories with a global and a per-remote-host
+    concurrency limit, publishing aggregated progress for the whole batch.
+    """
+    config = config_manager.get_config()
+    progress = job.progress
+    progress_lock = threading.Lock()
+    
+    def snapshot():
+        with progress_lock:
+            return dict(progress)
+    
+    ticker = ProgressTicker(
+        event_hub, job.topics,
+        lambda: {"status": "progress", "progress": snapshot(), "job_id": job.id}
+    )
+    
+    def on_skip(repo, reason):
+        with progress_lock:
+            progress["skipped"] += 1
+        job.publish({"status": "skipped", "repo_id": repo.get("id"), "path": repo.get("path"), "reason": reason})
+        ticker.mark()
+    
+    def on_start(repo):
+        with progress_lock:
+            progress["running"] += 1
+            progress["message"] = f"Pulling {repo.get('path')}"
+        ticker.mark()
+    
+    def on_done(repo, ok, message, seconds):
+        with progress_lock:
+            progress["running"] -= 1
+            progress["pulled" if ok else "failed"] += 1
+        job.publish({
+            "status": "pulled" if ok else "failed",
+            "repo_id": repo.get("id"),
+            "path": repo.get("path"),
+            "message": message,
+            "seconds": round(seconds, 3)
+        })
+        ticker.mark()
+    
+    def pulling_elsewhere(repo):
+        # Leave repositories alone while a single-repository pull job has them
+        return "pull in progress" if job_manager.get_active(f"pull:{repo.get('id')}") else None
+    
+    progress.update({
+        "total": len(repositories),
+        "pulled": 0,
+        "failed": 0,
+        "skipped": 0,
+        "running": 0,
+        "message": f"Starting pull of {len(repositories)} repositories"
+    })
+    job.publish({"status": "started", "progress": snapshot()})
+    ticker.start()
+    
+    try:
+        bulk_pull = BulkPull(
+            inventory,
+            concurrency=config.get("bulk_pull_concurrency", 8),
+            per_host=config.get("bulk_pull_per_host", 2),
+            git_ops=git_operations()
+        )
+        summary = bulk_pull.run(
+            repositories,
+            on_skip=on_skip,
+            on_start=on_start,
+            on_done=on_done,
+            should_stop=lambda: job.cancelled,
+            skip_check=pulling_elsewhere
+        )
+    except Exception as e:
+        logger.error(f"Error during bulk pull: {e}")
+        ticker.stop()
+        job.message = f"Error during bulk pull: {str(e)}"
+        job.publish({"status": "error", "progress": snapshot(), "message": job.message})
+        raise
+    ticker.stop()
+    
+    if job.cancelled:
+        # Keep the partial summary visible on the cancelled job
+        progress["summary"] = summary
+        job.raise_if_cancelled()
+    
+    job.message = (
+        f"Bulk pull finished: {summary['pulled']} pulled, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped in {summary['duration_seconds']}s"
+    )
+    job.publish({
+        "status": "completed",
+        "progress": snapshot(),
+        "message": job.message,
+        "summary": summary
+    })
+    return summary
+
+def submit_scan_job(scan_paths, max_depth, profile=None):
+    """
+    Queue a scan job. Scans of different paths run concurrently; a request for
+    the same paths as an active scan returns that scan instead.
+    
+    Args:
+        profile (tuple, optional): (mode, rate) to run the scan under the profiler.
+    
+    Returns:
+        tuple: (job, created)
+    """
+    scan_paths = dedupe_scan_paths(scan_paths)
+    return job_manager.submit(
+        "scan",
+        profiled_job(lambda job: perform_scan_async(job, scan_paths, max_depth), profile),
+        params={"paths": scan_paths, "max_depth": max_depth},
+        priority=PRIORITY_NORMAL,
+        dedupe_key="scan:" + "|".join(scan_paths),
+        topics=("scan",)
+    )
 
 @app.route('/api/scan', methods=['GET'])
 def scan_repositories():
     """Scan for repositories based on query parameters and return initial response"""
-    global scan_progress
+    scan_path = request.args.get('path', config_manager.get_config().get('scan_directory'))
+    max_depth = int(request.args.get('depth', config_manager.get_config().get('max_depth', 10)))
     
-    # If already scanning, return current status
-    if scan_progress["is_scanning"]:
+    job, created = submit_scan_job([scan_path], max_depth, profile=requested_profile())
+    
+    # If this path is already being scanned, return that scan's status
+    if not created:
         return jsonify({
             "status": "already_scanning", 
             "message": "Scan already in progress", 
-            "progress": {k: v for k, v in scan_progress.items() if k != "progress_queue"}
+            "job_id": job.id,
+            "progress": dict(job.progress)
         })
     
-    scan_path = request.args.get('path', config_manager.get_config().get('scan_directory'))
-    max_depth = int(request.args.get('depth', config_manager.get_config().get('max_depth', 10)))
+    return jsonify({
+        "status": "started",
+        "message": f"Scan started for {scan_path} with max depth {max_depth}",
+        "job_id": job.id,
+        "job_url": f"/api/jobs/{job.id}",
+        "listen_url": "/api/scan/progress"
+    })
+
+@app.route('/api/scan/paths', methods=['POST'])
+def scan_repository_paths():
+    """
+    Rescan a list of specific paths in one request and merge the results into the
+    stored inventory. Paths that no longer exist drop their repositories.
+    """
+    payload = request.get_json(silent=True) or {}
+    scan_paths = payload.get("paths")
+    if not isinstance(scan_paths, list) or not scan_paths or \
+            not all(isinstance(p, str) and p.strip() for p in scan_paths):
+        return jsonify({"error": "'paths' must be a non-empty list of paths"}), 400
     
-    # Start scan in background thread
-    scan_thread = threading.Thread(
-        target=perform_scan_async, 
-        args=(scan_path, max_depth)
-    )
-    scan_thread.daemon = True
-    scan_thread.start()
+    try:
+        max_depth = int(payload.get('depth', config_manager.get_config().get('max_depth', 10)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'depth' must be an integer"}), 400
+    
+    job, created = submit_scan_job(scan_paths, max_depth, profile=requested_profile())
+    
+    if not created:
+        return jsonify({
+            "status": "already_scanning", 
+            "message": "Scan already in progress", 
+            "job_id": job.id,
+            "progress": dict(job.progress)
+        })
     
     return jsonify({
         "status": "started",
-        "message": f"Scan started for {scan_path} with max depth {max_depth}",
+        "message": f"Scan started for {len(scan_paths)} path(s) with max depth {max_depth}",
+        "paths": job.params["paths"],
+        "job_id": job.id,
+        "job_url": f"/api/jobs/{job.id}",
         "listen_url": "/api/scan/progress"
     })
 
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List recent jobs (newest first), optionally filtered by `kind` and `state`"""
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer"}), 400
+    
+    jobs = job_manager.list(kind=request.args.get('kind'), state=request.args.get('state'))
+    return jsonify({
+        "total": len(jobs),
+        "queued": job_manager.queue_depth(),
+        "jobs": [job.to_dict() for job in jobs[:limit]]
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get one job, including its result once it has finished"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict(include_result=True))
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or ask a running job to stop at its next safe point"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.state not in ACTIVE_STATES:
+        return jsonify({"error": f"Job already {job.state}", "job": job.to_dict()}), 409
+    
+    job_manager.cancel(job_id)
+    return jsonify({"status": "cancelling", "job": job.to_dict()})
+
+@app.route('/api/jobs/<job_id>/progress', methods=['GET'])
+def job_progress_stream(job_id):
+    """Stream one job's state changes and progress updates using Server-Sent Events"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return _stream_events(job.topic, {'status': 'job', 'job': job.to_dict()}, {'status': 'heartbeat', 'job_id': job_id})
+
+@app.route('/api/scan/changes', methods=['GET'])
+def get_scan_changes():
+    """Get the compact diff records of recent scans (optionally only those after a generation)"""
+    try:
+        since = int(request.args.get('since', 0))
+        limit = min(max(int(request.args.get('limit', 50)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "'since' and 'limit' must be integers"}), 400
+    
+    return jsonify(scan_change_log.get_records(since=since, limit=limit))
+
 @app.route('/api/repositories', methods=['GET'])
 def get_repositories():
-    """Get all repositories with optional filtering"""
+    """Get all repositories, optionally sorted with ?sort=<field>&order=asc|desc"""
+    sort = request.args.get('sort') or None
+    order = request.args.get('order', 'asc')
+    if sort is not None and sort not in REPOSITORY_SORT_FIELDS:
+        return jsonify({"error": f"sort must be one of: {', '.join(REPOSITORY_SORT_FIELDS)}"}), 400
+    if order not in ('asc', 'desc'):
+        return jsonify({"error": "order must be asc or desc"}), 400
     try:
-        # Load the latest scan results
-        results = config_manager.get_scan_results()
-        
-        # Apply filters if provided
         # TODO: Implement filtering logic
-        
-        return jsonify(results.get("git_repositories", []))
+        return app.response_class(repositories_body(sort, order == 'desc'), mimetype=app.json.mimetype)
     except Exception as e:
         logger.error(f"Error retrieving repositories: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/repositories/pull', methods=['POST'])
+def pull_repositories():
+    """
+    Pull many repositories in one background job, selected by an `ids` list and/or
+    a `filter` object (`status`, `path`, `name`, `host`). Repositories with local
+    changes or without a remote are skipped.
+    """
+    payload = request.get_json(silent=True) or {}
+    ids = payload.get("ids")
+    filters = payload.get("filter")
+    if ids is None and filters is None:
+        return jsonify({"error": "Provide 'ids' (a list of repository IDs) and/or 'filter' (an object)"}), 400
+    if ids is not None and not (isinstance(ids, list) and all(isinstance(i, str) for i in ids)):
+        return jsonify({"error": "'ids' must be a list of repository IDs"}), 400
+    if filters is not None and not isinstance(filters, dict):
+        return jsonify({"error": "'filter' must be an object"}), 400
+    
+    try:
+        repositories = select_repositories(inventory.get_repositories(), ids=ids, filters=filters)
+        
+        job, created = job_manager.submit(
+            "bulk_pull",
+            lambda job: perform_bulk_pull_async(job, repositories),
+            params={"repositories": len(repositories), "filter": filters},
+            priority=PRIORITY_NORMAL,
+            dedupe_key="bulk_pull"
+        )
+        
+        # Only one bulk pull runs at a time
+        if not created:
+            return jsonify({
+                "status": "already_pulling",
+                "message": "Bulk pull already in progress",
+                "job_id": job.id,
+                "progress": dict(job.progress)
+            })
+        
+        return jsonify({
+            "status": "started",
+            "message": f"Pull started for {len(repositories)} repositories",
+            "total": len(repositories),
+            "job_id": job.id,
+            "job_url": f"/api/jobs/{job.id}",
+            "listen_url": f"/api/jobs/{job.id}/progress"
+        })
+    except Exception as e:
+        logger.error(f"Error initiating bulk pull: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/repositories/changes', methods=['GET'])
+def get_repository_changes():
+    """Get repositories added, changed or removed since a given inventory generation"""
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"error": "'since' must be an integer generation number"}), 400
+    
+    try:
+        return jsonify(inventory.changes_since(since))
+    except Exception as e:
+        logger.error(f"Error retrieving repository changes: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/search', methods=['GET'])
+def search_repositories():
+    """Search repositories by name, path, remote URL, description, branch or recent commit message"""
+    query = request.args.get('q', '').strip()
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 500)
+    except ValueError:
+        return jsonify({"error": "'page' and 'per_page' must be integers"}), 400
+    
+    if not query:
+        return jsonify({"query": query, "total": 0, "page": page, "per_page": per_page, "results": []})
+    
+    try:
+        matches = search_index.search(query, page=page, per_page=per_page)
+        scores = {match["id"]: match["score"] for match in matches["results"]}
+        repositories = inventory.get_repositories_by_ids(list(scores))
+        
+        return jsonify({
+            "query": query,
+            "total": matches["total"],
+            "page": page,
+            "per_page": per_page,
+            "results": [{**repo, "score": scores[repo["id"]]} for repo in repositories]
+        })
+    except Exception as e:
+        logger.error(f"Error searching repositories for '{query}': {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/history/status', methods=['GET'])
+def get_status_history():
+    """Get status series for all repositories (or a comma-separated `ids` list) over the last `days` days"""
+    try:
+        days = float(request.args.get('days', 30))
+    except ValueError:
+        return jsonify({"error": "'days' must be a number"}), 400
+    
+    repo_ids = request.args.get('ids')
+    repo_ids = [i for i in repo_ids.split(',') if i] if repo_ids else None
+    
+    try:
+        since = time.time() - days * 86400
+        return jsonify(status_history.query(since=since, repo_ids=repo_ids))
+    except Exception as e:
+        logger.error(f"Error retrieving status history: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/fetch/status', methods=['GET'])
+def get_fetch_status():
+    """Get background fetch scheduler statistics, including repositories whose remotes are failing"""
+    return jsonify(fetch_scheduler.status())
+
+@app.route('/api/rescan/status', methods=['GET'])
+def get_rescan_status():
+    """Get the scheduled rescan budget usage and each subtree's interval and change rate"""
+    return jsonify(rescan_scheduler.status())
+
+@app.route('/api/watch/status', methods=['GET'])
+def get_watch_status():
+    """Get the filesystem watcher's mode (watching or fallback), watch count and event statistics"""
+    return jsonify(fs_watcher.status())
+
+@app.route('/api/disk_usage/status', methods=['GET'])
+def get_disk_usage_status():
+    """Get disk usage pass statistics and the directory cache's size and hit counts"""
+    return jsonify(disk_usage.status())
+
+@app.route('/api/disk_usage/refresh', methods=['POST'])
+def refresh_disk_usage():
+    """Measure every repository's disk usage now instead of at the next interval"""
+    if not disk_usage.status()["running"]:
+        return jsonify({"error": "Disk usage measurement is disabled"}), 409
+    disk_usage.refresh()
+    return jsonify({"status": "scheduled"}), 202
+
 @app.route('/api/repository/<repo_id>', methods=['GET'])
 def get_repository(repo_id):
     """Get detailed information about a specific repository"""
     try:
         # Load the repository by ID
-        # We'll use path as ID for now
-        results = config_manager.get_scan_results()
-        repositories = results.get("git_repositories", [])
-        
-        repository = next((repo for repo in repositories if repo.get("id") == repo_id), None)
+        repository = inventory.get_repository(repo_id)
         
         if not repository:
             return jsonify({"error": "Repository not found"}), 404
         
         # Get detailed Git information
-        git_ops = GitOperations()
+        git_ops = git_operations()
         git_info = git_ops.get_repository_info(repository.get("path"))
         
+        # Store the enriched data (bumps the generation only if something changed)
+        if "error" not in git_info:
+            repository = inventory.update_repository(repo_id, git_info) or repository
+        
         # Combine the data
         detailed_info = {**repository, **git_info}
         
@@ -431,54 +1354,79 @@ def get_repository(repo_id):
 @app.route('/api/repository/<repo_id>/pull', methods=['POST'])
 def pull_repository(repo_id):
     """Pull the latest changes for a repository"""
-    global pull_progress
-    
+    profile = requested_profile()
     try:
         # Find the repository
-        results = config_manager.get_scan_results()
-        repositories = results.get("git_repositories", [])
-        
-        repository = next((repo for repo in repositories if repo.get("id") == repo_id), None)
+        repository = inventory.get_repository(repo_id)
         
         if not repository:
             return jsonify({"error": "Repository not found"}), 404
         
+        # Queue the pull; a repository only ever has one active pull job
+        repo_path = repository.get("path")
+        job, created = job_manager.submit(
+            "pull",
+            profiled_job(lambda job: perform_pull_async(job, repo_id, repo_path), profile),
+            params={"repo_id": repo_id, "path": repo_path},
+            priority=PRIORITY_HIGH,
+            dedupe_key=f"pull:{repo_id}",
+            topics=(f"pull:{repo_id}",)
+        )
+        
         # If already pulling this repository, return current status
-        if pull_progress["is_pulling"] and pull_progress["repo_id"] == repo_id:
+        if not created:
             return jsonify({
                 "status": "already_pulling", 
                 "message": "Pull already in progress", 
-                "progress": {k: v for k, v in pull_progress.items() if k != "progress_queue"},
+                "job_id": job.id,
+                "progress": dict(job.progress),
                 "repository": repository
             })
         
-        # Start pull in background thread
-        repo_path = repository.get("path")
-        pull_thread = threading.Thread(
-            target=perform_pull_async, 
-            args=(repo_id, repo_path)
-        )
-        pull_thread.daemon = True
-        pull_thread.start()
-        
         return jsonify({
             "status": "started",
             "message": f"Pull started for repository at {repo_path}",
             "repository": repository,
+            "job_id": job.id,
+            "job_url": f"/api/jobs/{job.id}",
             "listen_url": f"/api/repository/{repo_id}/pull/progress"
         })
     except Exception as e:
         logger.error(f"Error initiating repository pull: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/repository/<repo_id>/refresh', methods=['POST'])
+def refresh_repository(repo_id):
+    """Queue a job that re-reads a repository's git status into the inventory"""
+    try:
+        repository = inventory.get_repository(repo_id)
+        
+        if not repository:
+            return jsonify({"error": "Repository not found"}), 404
+        
+        repo_path = repository.get("path")
+        job, created = job_manager.submit(
+            "refresh",
+            lambda job: perform_refresh_async(job, repo_id, repo_path),
+            params={"repo_id": repo_id, "path": repo_path},
+            priority=PRIORITY_HIGH,
+            dedupe_key=f"refresh:{repo_id}"
+        )
+        
+        return jsonify({
+            "status": "started" if created else "already_refreshing",
+            "job_id": job.id,
+            "job_url": f"/api/jobs/{job.id}"
+        })
+    except Exception as e:
+        logger.error(f"Error initiating repository refresh: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/repository/<repo_id>/status', methods=['GET'])
 def get_repository_status(repo_id):
     """Get the git status for a specific repository"""
     try:
-        results = config_manager.get_scan_results()
-        repositories = results.get("git_repositories", [])
-        
-        repository = next((repo for repo in repositories if repo.get("id") == repo_id), None)
+        repository = inventory.get_repository(repo_id)
         
         if not repository:
             return jsonify({"error": "Repository not found"}), 404
@@ -503,9 +1451,7 @@ def get_repository_status(repo_id):
 def discard_repository_changes(repo_id):
     """Discard all local changes (reset --hard and clean -fd) for a repository."""
     try:
-        results = config_manager.get_scan_results()
-        repositories = results.get("git_repositories", [])
-        repository = next((repo for repo in repositories if repo.get("id") == repo_id), None)
+        repository = inventory.get_repository(repo_id)
 
         if not repository:
             return jsonify({"error": "Repository not found"}), 404
@@ -542,6 +1488,8 @@ def update_config():
     try:
         new_config = request.json
         config_manager.update_config(new_config)
+        metrics.registry.enabled = bool(config_manager.get_config().get("metrics_enabled", False))
+        tracing.tracer.enabled = bool(config_manager.get_config().get("tracing_enabled", False))
         return jsonify({"success": True, "config": config_manager.get_config()})
     except Exception as e:
         logger.error(f"Error updating configuration: {e}")
@@ -549,11 +1497,15 @@ def update_config():
 
 if __name__ == '__main__':
     # Create necessary directories
-    os.makedirs('data', exist_ok=True)
+    os.makedirs(data_dir(), exist_ok=True)
     os.makedirs('modules', exist_ok=True)
     
     # Ensure config is initialized
     config_manager.init_config()
     
+    # With the debug reloader, only the serving child process runs background services
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
+    
     # Run the app on port 8080 instead of 5000 (which conflicts with AirPlay on macOS)
     app.run(debug=True, host='0.0.0.0', port=8080)
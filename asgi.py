@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Async (ASGI) serving mode.
+
+Progress streams (/api/scan/progress, /api/repository/<id>/pull/progress and
+/api/jobs/<id>/progress) are served as asyncio tasks that sleep until the event
+hub wakes them, so an idle listener costs a coroutine instead of a worker thread. Every other route is
+handed to the Flask app through asgiref's WSGI adapter.
+
+Run with:
+    uvicorn asgi:application --host 0.0.0.0 --port 8080
+"""
+import re
+import json
+import asyncio
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import (
+    app, event_hub, job_manager, scan_stream_initial_event, pull_stream_initial_event,
+    start_background_services, stop_background_services, SSE_BATCH_SIZE
+)
+from modules.events import format_sse_batch
+
+logger = logging.getLogger(__name__)
+
+# Idle streams only need an occasional heartbeat to keep proxies from closing them
+HEARTBEAT_INTERVAL = 15.0
+
+PULL_PROGRESS_PATH = re.compile(r"^/api/repository/([^/]+)/pull/progress$")
+JOB_PROGRESS_PATH = re.compile(r"^/api/jobs/([^/]+)/progress$")
+
+class _WsgiToAsgiInstance(WsgiToAsgiInstance):
+    """
+    Runs one Flask request on its own executor thread. asgiref runs every WSGI request
+    on one shared thread by default (thread_sensitive), which serializes all Flask
+    routes and breaks under concurrent requests.
+    """
+    async def run_wsgi_app(self, body):
+        # asgiref's run_wsgi_app is decorated with sync_to_async; __wrapped__ is the plain function
+        await sync_to_async(WsgiToAsgiInstance.run_wsgi_app.__wrapped__, thread_sensitive=False)(self, body)
+
+class _WsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that runs each Flask request on its own executor thread"""
+    async def __call__(self, scope, receive, send):
+        await _WsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+flask_application = _WsgiToAsgi(app)
+
+def _sse_data(payload):
+    return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+def _last_event_id(scope):
+    """Get the Last-Event-ID from the request headers or the last_event_id query parameter"""
+    for name, value in scope.get("headers", []):
+        if name.lower() == b"last-event-id":
+            last_event_id = value.decode("latin-1")
+            break
+    else:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        last_event_id = query.get("last_event_id", [None])[0]
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None
+
+async def stream_events(scope, receive, send, topic, initial_event, heartbeat):
+    """
+    Relay every event published on a hub topic to one SSE client.
+
+    The task awaits an asyncio.Event that the hub sets (thread-safely) whenever an
+    event is queued for this subscription, so nothing runs while the stream is idle
+    apart from the heartbeat timer.
+    """
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    last_event_id = _last_event_id(scope)
+    subscription = event_hub.subscribe(topic, last_event_id=last_event_id)
+    subscription.set_waker(lambda: loop.call_soon_threadsafe(wake.set))
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                subscription.close()
+                return
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"connection", b"keep-alive"),
+            ],
+        })
+
+        if last_event_id is None:
+            await send({"type": "http.response.body", "body": _sse_data(initial_event), "more_body": True})
+        elif event_hub.replay_gap(topic, last_event_id):
+            resync = {'status': 'resync', 'message': 'Missed events are no longer available; refetch current state'}
+            await send({"type": "http.response.body", "body": _sse_data(resync), "more_body": True})
+            await send({"type": "http.response.body", "body": _sse_data(initial_event), "more_body": True})
+
+        while not subscription.closed:
+            wake.clear()
+            events = subscription.drain(SSE_BATCH_SIZE)
+            if events:
+                await send({"type": "http.response.body", "body": format_sse_batch(events).encode("utf-8"), "more_body": True})
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                await send({"type": "http.response.body", "body": _sse_data(heartbeat), "more_body": True})
+
+        if subscription.overflowed:
+            resync = {'status': 'resync', 'message': 'Client fell too far behind'}
+            await send({"type": "http.response.body", "body": _sse_data(resync), "more_body": False})
+    except OSError:
+        # Client went away mid-write
+        pass
+    finally:
+        subscription.close()
+        watcher.cancel()
+
+async def lifespan(receive, send):
+    """Start background services on server startup and stop them on shutdown"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            start_background_services()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.get_running_loop().run_in_executor(None, stop_background_services)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def application(scope, receive, send):
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] == "http" and scope.get("method") == "GET":
+        path = scope.get("path", "")
+        if path == "/api/scan/progress":
+            return await stream_events(
+                scope, receive, send, "scan",
+                scan_stream_initial_event(), {'status': 'heartbeat'}
+            )
+        match = PULL_PROGRESS_PATH.match(path)
+        if match:
+            repo_id = match.group(1)
+            return await stream_events(
+                scope, receive, send, f"pull:{repo_id}",
+                pull_stream_initial_event(repo_id), {'status': 'heartbeat', 'repo_id': repo_id}
+            )
+        match = JOB_PROGRESS_PATH.match(path)
+        job = job_manager.get(match.group(1)) if match else None
+        if job is not None:
+            # Unknown jobs fall through to Flask for the 404
+            return await stream_events(
+                scope, receive, send, job.topic,
+                {'status': 'job', 'job': job.to_dict()}, {'status': 'heartbeat', 'job_id': job.id}
+            )
+
+    return await flask_application(scope, receive, send)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    # Ensure config is initialized
+    from app import config_manager
+    config_manager.init_config()
+
+    uvicorn.run("asgi:application", host="0.0.0.0", port=8080)
@@ -0,0 +1,62 @@
+"""
+Shared helpers for benchmark result files: commit tagging, latency
+percentiles, and saving/loading the JSON reports compared across commits.
+"""
+import json
+import statistics
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def latency_summary(seconds):
+    """Mean and p50/p90/p99/max of a list of durations, in milliseconds"""
+    if not seconds:
+        return {"calls": 0}
+    ordered = sorted(seconds)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000
+
+    return {
+        "calls": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_report(report, name, output=None):
+    """
+    Write a report to `output`, or to benchmarks/results/<name>-<commit>-<time>.json.
+
+    Returns:
+        Path: Where the report was written.
+    """
+    path = Path(output) if output else \
+        RESULTS_DIR / f"{name}-{report.get('commit') or 'unknown'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+def change(current, baseline):
+    """Relative change as a signed percentage string, or '-' without a baseline"""
+    if not baseline:
+        return "-"
+    return f"{(current - baseline) / baseline * 100:+.1f}%"
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark GitOperations on a generated fleet of repositories with local bare
+remotes (see synthetic_repos.py).
+
+Micro benchmarks call each operation on up to --calls repositories, one call
+at a time. They report p50/p90/p99/max latency and git processes spawned per call:
+
+- info: get_repository_info (what scans and refreshes run per repository)
+- status: get_git_status
+- ahead_behind: fetch_tracking_refs (fetch plus ahead/behind recount)
+- pull: pull_repository (dirty repositories are refused before any fetch)
+
+Macro benchmarks run info and ahead_behind over the whole fleet on --concurrency
+threads, like a scan's enrichment or a fetch sweep, and report throughput.
+
+    python benchmarks/git_benchmark.py --repos 1000 --history 500 --output before.json
+    python benchmarks/git_benchmark.py --repos 1000 --history 500 --compare before.json
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import concurrent.futures
+from pathlib import Path
+from datetime import datetime
+
+from tabulate import tabulate
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from modules import metrics
+from modules.git_operations import GitOperations
+from synthetic_repos import build_fleet, add_fleet_arguments, fleet_options
+from bench_report import git_commit, latency_summary, save_report, load_report, change
+
+OPERATIONS = ("info", "status", "ahead_behind", "pull")
+MACRO_OPERATIONS = ("info", "ahead_behind")
+
+def _call(git_ops, operation, path):
+    """Run one operation; returns whether git reported success"""
+    if operation == "info":
+        return "error" not in git_ops.get_repository_info(path)
+    if operation == "status":
+        return git_ops.get_git_status(path) is not None
+    if operation == "ahead_behind":
+        return git_ops.fetch_tracking_refs(path)["success"]
+    return git_ops.pull_repository(path)["success"]
+
+def micro(git_ops, operation, paths):
+    """Sequential calls: per-call latency and git processes spawned per call"""
+    durations, spawns, succeeded = [], [], 0
+    for path in paths:
+        spawned = metrics.GIT_SUBPROCESSES.total()
+        started = time.perf_counter()
+        succeeded += _call(git_ops, operation, path)
+        durations.append(time.perf_counter() - started)
+        spawns.append(metrics.GIT_SUBPROCESSES.total() - spawned)
+    return {
+        **latency_summary(durations),
+        "spawns_per_call": sum(spawns) / len(spawns) if spawns else 0,
+        "succeeded": succeeded
+    }
+
+def macro(git_ops, operation, paths, concurrency):
+    """The whole fleet on a thread pool: throughput and total git processes"""
+    spawned = metrics.GIT_SUBPROCESSES.total()
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        succeeded = sum(executor.map(lambda path: _call(git_ops, operation, path), paths))
+    elapsed = time.perf_counter() - started
+    return {
+        "repositories": len(paths),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "repos_per_second": len(paths) / elapsed if elapsed else None,
+        "spawns": metrics.GIT_SUBPROCESSES.total() - spawned,
+        "succeeded": succeeded
+    }
+
+def print_results(report, baseline=None):
+    before = (baseline or {}).get("micro", {})
+    rows = []
+    for operation, result in report["micro"].items():
+        if not result["calls"]:
+            continue
+        row = [operation, result["calls"], f"{result['p50_ms']:.1f}", f"{result['p90_ms']:.1f}",
+               f"{result['p99_ms']:.1f}", f"{result['max_ms']:.1f}", f"{result['spawns_per_call']:.1f}",
+               result["succeeded"]]
+        if baseline is not None:
+            row.append(change(result["p50_ms"], before.get(operation, {}).get("p50_ms")))
+        rows.append(row)
+    headers = ["Operation", "Calls", "p50 ms", "p90 ms", "p99 ms", "max ms", "Spawns/call", "Succeeded"]
+    if baseline is not None:
+        headers.append(f"p50 vs {baseline.get('commit') or 'baseline'}")
+    print(tabulate(rows, headers=headers))
+
+    if report["macro"]:
+        before = (baseline or {}).get("macro", {})
+        rows = []
+        for operation, result in report["macro"].items():
+            row = [operation, result["repositories"], result["concurrency"], f"{result['seconds']:.2f}",
+                   f"{result['repos_per_second']:.1f}", result["spawns"]]
+            if baseline is not None:
+                row.append(change(result["seconds"], before.get(operation, {}).get("seconds")))
+            rows.append(row)
+        headers = ["Fleet operation", "Repos", "Threads", "Seconds", "Repos/sec", "Spawns"]
+        if baseline is not None:
+            headers.append("vs baseline")
+        print()
+        print(tabulate(rows, headers=headers))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GitOperations on a generated repository fleet")
+    add_fleet_arguments(parser)
+    parser.add_argument("--calls", type=int, default=200, help="Repositories sampled per micro benchmark")
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--concurrency", type=int, default=8, help="Threads for the fleet-wide benchmarks")
+    parser.add_argument("--no-macro", action="store_true", help="Skip the fleet-wide benchmarks")
+    parser.add_argument("--keep", help="Build the fleet in this directory and keep it")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/git-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    metrics.registry.enabled = True
+
+    if args.keep:
+        workdir = Path(args.keep)
+    else:
+        workdir = Path(tempfile.mkdtemp(prefix="sentinel-gitbench-")) / "fleet"
+    print(f"Building {args.repos} repositories under {workdir} ...")
+    started = time.perf_counter()
+    fleet = build_fleet(workdir, **fleet_options(args))
+    print(f"Built in {time.perf_counter() - started:.1f}s")
+
+    git_ops = GitOperations()
+    paths = fleet["repositories"]
+    sample = paths[:args.calls]
+    try:
+        report = {
+            "benchmark": "git",
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "fleet": {**fleet["options"], "dirty_repositories": len(fleet["dirty"])},
+            "micro": {},
+            "macro": {}
+        }
+        for operation in [op for op in OPERATIONS if op in args.operations and op != "pull"]:
+            report["micro"][operation] = micro(git_ops, operation, sample)
+        if not args.no_macro:
+            for operation in [op for op in MACRO_OPERATIONS if op in args.operations]:
+                report["macro"][operation] = macro(git_ops, operation, paths, args.concurrency)
+        # Pulls change the repositories, so they run last
+        if "pull" in args.operations:
+            report["micro"]["pull"] = micro(git_ops, "pull", sample)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir.parent, ignore_errors=True)
+
+    print_results(report, load_report(args.compare) if args.compare else None)
+    print(f"Results saved to {save_report(report, 'git', args.output)}")
+
+if __name__ == "__main__":
+    main()
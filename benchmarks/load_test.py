@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+HTTP and SSE load test for the API.
+
+Starts the app in a separate process on its own data directory
+(SENTINEL_DATA_DIR), seeded with an inventory of --repos repositories. A few
+of them (--real-repos) are real repositories with a local remote, so
+`/api/repository/<id>` does real git work. Then, for --duration seconds:
+
+- --clients threads request `/api/repositories`, `/api/repository/<id>` and
+  `/api/browse_directories` in the --mix proportions, as fast as they can
+- --listeners threads hold `/api/scan/progress` streams open
+- scoped scans of a synthetic tree run back to back, so the streams carry live events
+
+Reported: per-endpoint throughput and latency percentiles, and how late each SSE
+event reaches listeners compared to the first listener that got it (fan-out lag). Also
+the time from the scan request to its `started` event, and peak server RSS and threads.
+
+    python benchmarks/load_test.py --repos 10000 --clients 16 --listeners 200 --duration 30
+    python benchmarks/load_test.py --server asgi --listeners 2000
+    python benchmarks/load_test.py --server gunicorn --workers 4
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import urllib.parse
+from pathlib import Path
+from datetime import datetime
+
+from tabulate import tabulate
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic_tree import build_tree
+from synthetic_repos import build_fleet
+from bench_report import git_commit, latency_summary, save_report, load_report, change
+
+ENDPOINTS = ("repositories", "repository", "browse")
+STATUSES = ["Clean", "Changed", "Ahead", "Behind", "Diverged"]
+
+def seed_inventory(data_dir, code_dir, repos, real_paths, seed):
+    """Write a config and an inventory of `repos` records, the first ones backed by `real_paths`"""
+    rng = random.Random(seed)
+    records = []
+    for index in range(repos):
+        if index < len(real_paths):
+            path = real_paths[index]
+        else:
+            path = str(code_dir / "seeded" / f"area{index % 50:02d}" / f"repo{index:05d}")
+        records.append({
+            "id": hashlib.md5(path.encode()).hexdigest(),
+            "name": Path(path).name,
+            "path": path,
+            "description": None,
+            "last_modified": datetime.now().isoformat(),
+            "type": "git_repository",
+            "current_branch": "main",
+            "remotes": [{"name": "origin", "fetch_url": f"git@github.com:org/repo{index}.git",
+                         "push_url": f"git@github.com:org/repo{index}.git"}],
+            "recent_commits": [
+                {"hash": f"{index:040x}", "short_hash": f"{index:07x}", "message": f"Commit {n} of repo {index}",
+                 "author": "bench", "author_email": "bench@example.com", "date": datetime.now().isoformat()}
+                for n in range(5)
+            ],
+            "has_changes": False,
+            "changed_files": [],
+            "ahead": 0,
+            "behind": 0,
+            "status": rng.choice(STATUSES)
+        })
+    inventory = {
+        "scan_time": datetime.now().isoformat(),
+        "scan_directory": str(code_dir),
+        "git_repositories": records,
+        "non_git_directories": [],
+        "generation": 1
+    }
+    config = {
+        "scan_directory": str(code_dir),
+        "browseable_base_paths": [str(code_dir)],
+        "max_depth": 10,
+        "excluded_dirs": ["node_modules", ".git", "venv", "__pycache__", "dist", "build",
+                          ".terraform", "modules", ".venv", "env"],
+        "high_level_dirs": [],
+        # Keep background work from competing with the measured load
+        "fetch_enabled": False,
+        "rescan_enabled": False,
+        "watch_enabled": False
+    }
+    data_dir.mkdir(parents=True, exist_ok=True)
+    with open(data_dir / "config.json", "w") as f:
+        json.dump(config, f)
+    with open(data_dir / "git_repos_scan.json", "w") as f:
+        json.dump(inventory, f)
+    return [record["id"] for record in records[:len(real_paths)]]
+
+def serve(args):
+    """Run the app in this process (the harness starts this as a subprocess)"""
+    if args.server == "gunicorn":
+        os.chdir(ROOT)
+        os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                                   "--bind", f"127.0.0.1:{args.port}", "--workers", str(args.workers)])
+    elif args.server == "asgi":
+        import uvicorn
+        os.chdir(ROOT)
+        uvicorn.run("asgi:application", host="127.0.0.1", port=args.port, log_level="warning")
+    else:
+        import logging
+        import app as sentinel
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        sentinel.config_manager.init_config()
+        sentinel.start_background_services()
+        sentinel.app.run(host="127.0.0.1", port=args.port, threaded=True)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_up(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/readyz")
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server did not come up on port {port} within {timeout}s")
+
+class ServerStats:
+    """Polls the RSS and thread count of the server process and its worker processes from /proc"""
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.peak_threads = 0
+        self.samples = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _processes(self):
+        """The server process and its worker processes (not the git processes it runs)"""
+        pids = [self.pid]
+        try:
+            with open(f"/proc/{self.pid}/task/{self.pid}/children") as f:
+                children = [int(pid) for pid in f.read().split()]
+        except OSError:
+            return pids
+        for pid in children:
+            try:
+                with open(f"/proc/{pid}/comm") as f:
+                    if not f.read().startswith("git"):
+                        pids.append(pid)
+            except OSError:
+                pass
+        return pids
+
+    def _read(self):
+        rss, threads = 0, 0
+        for pid in self._processes():
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        key, _, value = line.partition(":")
+                        if key == "VmRSS":
+                            rss += int(value.split()[0])
+                        elif key == "Threads":
+                            threads += int(value.split()[0])
+            except OSError:
+                if pid == self.pid:
+                    raise
+        return rss / 1024, threads
+
+    def _run(self):
+        started = time.monotonic()
+        while not self._stopped.wait(self.interval):
+            try:
+                rss, threads = self._read()
+            except OSError:
+                return
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+            self.peak_threads = max(self.peak_threads, threads)
+            self.samples.append((round(time.monotonic() - started, 2), round(rss, 1), threads))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+class Client(threading.Thread):
+    """Requests endpoints in the given proportions until stopped, recording latency per endpoint"""
+    def __init__(self, port, mix, repo_ids, browse_paths, stop, seed):
+        super().__init__(daemon=True)
+        self.port = port
+        self.endpoints = [name for name, weight in mix.items() for _ in range(weight)]
+        self.repo_ids = repo_ids
+        self.browse_paths = browse_paths
+        self.stop = stop
+        self.rng = random.Random(seed)
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+
+    def _path(self, endpoint):
+        if endpoint == "repositories":
+            return "/api/repositories"
+        if endpoint == "repository":
+            return f"/api/repository/{self.rng.choice(self.repo_ids)}"
+        return "/api/browse_directories?path=" + urllib.parse.quote(self.rng.choice(self.browse_paths))
+
+    def run(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        while not self.stop.is_set():
+            endpoint = self.rng.choice(self.endpoints)
+            started = time.perf_counter()
+            try:
+                connection.request("GET", self._path(endpoint))
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    self.errors[endpoint] += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                self.errors[endpoint] += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+                continue
+            self.latencies[endpoint].append(time.perf_counter() - started)
+
+class Listener(threading.Thread):
+    """Holds one /api/scan/progress stream open and records when each event arrives"""
+    def __init__(self, port, stop):
+        super().__init__(daemon=True)
+        self.port = port
+        self.stop = stop
+        self.connected = threading.Event()
+        self.arrivals = {}
+        self.started_events = {}
+        self.disconnected = False
+
+    def run(self):
+        try:
+            sock = socket.create_connection(("127.0.0.1", self.port), timeout=5)
+            sock.sendall(b"GET /api/scan/progress HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+            sock.settimeout(0.5)
+            self.connected.set()
+            buffer = b""
+            event_id = None
+            while not self.stop.is_set():
+                try:
+                    chunk = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    self.disconnected = not self.stop.is_set()
+                    break
+                arrived = time.perf_counter()
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.startswith(b"id: "):
+                        event_id = int(line[4:])
+                        self.arrivals[event_id] = arrived
+                    elif line.startswith(b"data: ") and b'"started"' in line:
+                        data = json.loads(line[6:])
+                        if data.get("status") == "started" and data.get("job_id"):
+                            self.started_events[data["job_id"]] = arrived
+            sock.close()
+        except OSError:
+            self.disconnected = True
+            self.connected.set()
+
+class ScanDriver(threading.Thread):
+    """Starts scoped scans of `scan_path` back to back, remembering when each was requested"""
+    def __init__(self, port, scan_path, stop):
+        super().__init__(daemon=True)
+        self.port = port
+        self.scan_path = scan_path
+        self.stop = stop
+        self.requested = {}
+        self.completed = 0
+        self.errors = 0
+
+    def _get(self, connection, path):
+        connection.request("GET", path)
+        response = connection.getresponse()
+        body = response.read()
+        if response.status >= 400:
+            raise http.client.HTTPException(f"{path} returned {response.status}")
+        return json.loads(body)
+
+    def _scan(self, connection):
+        requested = time.perf_counter()
+        job_id = self._get(connection, "/api/scan?path=" + urllib.parse.quote(self.scan_path))["job_id"]
+        self.requested[job_id] = requested
+        while not self.stop.is_set():
+            if self._get(connection, f"/api/jobs/{job_id}")["state"] not in ("queued", "running"):
+                self.completed += 1
+                return
+            time.sleep(0.1)
+
+    def run(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        while not self.stop.is_set():
+            try:
+                self._scan(connection)
+            except (OSError, ValueError, http.client.HTTPException):
+                self.errors += 1
+                connection.close()
+                time.sleep(0.5)
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (expected {', '.join(ENDPOINTS)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+def run_load(args, port, repo_ids, browse_paths, scan_path, server_pid):
+    stop = threading.Event()
+    stats = ServerStats(server_pid)
+    stats.start()
+
+    listeners = [Listener(port, stop) for _ in range(args.listeners)]
+    for listener in listeners:
+        listener.start()
+    for listener in listeners:
+        listener.connected.wait(10)
+    # Let the server register every subscription before events start flowing
+    time.sleep(1.0)
+
+    clients = [Client(port, args.mix, repo_ids, browse_paths, stop, seed) for seed in range(args.clients)]
+    driver = ScanDriver(port, scan_path, stop)
+    started = time.perf_counter()
+    for thread in clients + [driver]:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for thread in clients + [driver] + listeners:
+        thread.join(timeout=10)
+    stats.stop()
+
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        latencies = [latency for client in clients for latency in client.latencies[endpoint]]
+        errors = sum(client.errors[endpoint] for client in clients)
+        if latencies or errors:
+            endpoints[endpoint] = {**latency_summary(latencies), "errors": errors,
+                                   "requests_per_second": len(latencies) / elapsed}
+
+    # Fan-out lag: each listener's arrival time against the first arrival of the same event
+    first_arrival = {}
+    for listener in listeners:
+        for event_id, arrived in listener.arrivals.items():
+            first_arrival[event_id] = min(arrived, first_arrival.get(event_id, arrived))
+    fanout = [arrived - first_arrival[event_id]
+              for listener in listeners for event_id, arrived in listener.arrivals.items()]
+    started_lag = [arrived - driver.requested[job_id]
+                   for listener in listeners for job_id, arrived in listener.started_events.items()
+                   if job_id in driver.requested]
+
+    return {
+        "duration": elapsed,
+        "endpoints": endpoints,
+        "sse": {
+            "listeners": len(listeners),
+            "disconnected": sum(listener.disconnected for listener in listeners),
+            "events": len(first_arrival),
+            "deliveries": len(fanout),
+            "fanout_lag": latency_summary(fanout),
+            "started_lag": latency_summary(started_lag)
+        },
+        "scans_completed": driver.completed,
+        "scan_errors": driver.errors,
+        "server": {"peak_rss_mb": stats.peak_rss_mb, "peak_threads": stats.peak_threads,
+                   "samples": stats.samples}
+    }
+
+def print_results(report, baseline=None):
+    before = (baseline or {}).get("results", {}).get("endpoints", {})
+    results = report["results"]
+    rows = []
+    for endpoint, result in results["endpoints"].items():
+        row = [endpoint, result["calls"], f"{result['requests_per_second']:.1f}",
+               f"{result.get('p50_ms', 0):.1f}", f"{result.get('p99_ms', 0):.1f}", result["errors"]]
+        if baseline is not None:
+            row.append(change(result.get("p99_ms", 0), before.get(endpoint, {}).get("p99_ms")))
+        rows.append(row)
+    headers = ["Endpoint", "Requests", "Req/sec", "p50 ms", "p99 ms", "Errors"]
+    if baseline is not None:
+        headers.append("p99 vs baseline")
+    print(tabulate(rows, headers=headers))
+
+    sse = results["sse"]
+    print()
+    print(tabulate([
+        ["Listeners (disconnected)", f"{sse['listeners']} ({sse['disconnected']})"],
+        ["Events / deliveries", f"{sse['events']} / {sse['deliveries']}"],
+        ["Fan-out lag p50 / p99 ms", f"{sse['fanout_lag'].get('p50_ms', 0):.1f} / {sse['fanout_lag'].get('p99_ms', 0):.1f}"],
+        ["Scan request to 'started' p50 / p99 ms",
+         f"{sse['started_lag'].get('p50_ms', 0):.1f} / {sse['started_lag'].get('p99_ms', 0):.1f}"],
+        ["Scans completed (errors)", f"{results['scans_completed']} ({results['scan_errors']})"],
+        ["Server peak RSS MB / threads (all processes)", f"{results['server']['peak_rss_mb']:.1f} / {results['server']['peak_threads']}"]
+    ], headers=["SSE and server", ""]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the HTTP API and SSE streams")
+    parser.add_argument("--server", choices=("threaded", "asgi", "gunicorn"), default="threaded",
+                        help="Werkzeug threaded server (like app.py), uvicorn with asgi.py, "
+                             "or gunicorn with gunicorn.conf.py")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes with --server gunicorn")
+    parser.add_argument("--repos", type=int, default=10000, help="Repositories in the seeded inventory")
+    parser.add_argument("--real-repos", type=int, default=20,
+                        help="Seeded repositories backed by real repositories, used for /api/repository/<id>")
+    parser.add_argument("--scan-repos", type=int, default=100, help="Repositories in the tree the live scans walk")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent HTTP clients")
+    parser.add_argument("--listeners", type=int, default=100, help="Concurrent /api/scan/progress listeners")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("repositories=1,repository=4,browse=2"),
+                        help="Endpoint weights, e.g. repositories=1,repository=4,browse=2")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    workdir = Path(tempfile.mkdtemp(prefix="sentinel-load-"))
+    server = None
+    try:
+        code_dir = workdir / "code"
+        print(f"Building fixtures under {workdir} ...")
+        fleet = build_fleet(code_dir / "real", repos=args.real_repos, history=50, dirty_ratio=0.2)
+        build_tree(code_dir / "live", repos=args.scan_repos, projects=5, node_modules_packages=30,
+                   venv_packages=20, padding_dirs=50)
+        repo_ids = seed_inventory(workdir / "data", code_dir, args.repos, fleet["repositories"], seed=1)
+        browse_paths = [str(code_dir)] + [str(path) for path in sorted((code_dir / "live").iterdir())]
+
+        port = free_port()
+        environment = {**os.environ, "SENTINEL_DATA_DIR": str(workdir / "data")}
+        server = subprocess.Popen(
+            [sys.executable, __file__, "--serve", "--server", args.server, "--port", str(port),
+             "--workers", str(args.workers)],
+            env=environment, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        wait_until_up(port)
+        print(f"Running {args.duration:.0f}s of load: {args.clients} clients, {args.listeners} listeners, "
+              f"{args.repos} repositories ({args.server} server)")
+        results = run_load(args, port, repo_ids, browse_paths, str(code_dir / "live"), server.pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "benchmark": "load",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "cpus": os.cpu_count(),
+        "server": args.server,
+        "options": {"repos": args.repos, "clients": args.clients, "listeners": args.listeners,
+                    "duration": args.duration, "mix": args.mix,
+                    "workers": args.workers if args.server == "gunicorn" else 1},
+        "results": results
+    }
+    print_results(report, load_report(args.compare) if args.compare else None)
+    print(f"Results saved to {save_report(report, 'load', args.output)}")
+
+if __name__ == "__main__":
+    main()
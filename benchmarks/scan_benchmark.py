@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark the directory walk of RepositoryScanner.scan_directory on a synthetic tree.
+
+Each scanner runs in a fresh process: the first run is cold (no Python-level
+caches; also no OS caches with --drop-caches, which needs root), followed by
+--warm-runs warm runs. Reported per scanner: wall time, directories visited
+per second, peak RSS and peak thread count. Results are saved as JSON, and
+--compare prints the change against an earlier results file:
+
+    python benchmarks/scan_benchmark.py --repos 500 --output before.json
+    python benchmarks/scan_benchmark.py --repos 500 --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import resource
+import argparse
+import tempfile
+import itertools
+import statistics
+import subprocess
+import threading
+from pathlib import Path
+from datetime import datetime
+
+from tabulate import tabulate
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic_tree import build_tree, add_tree_arguments, tree_options
+from bench_report import git_commit, save_report, load_report, change
+
+SCANNERS = ("RepositoryScanner.scan_directory",)
+
+EXCLUDED_DIRS = [
+    "node_modules", ".git", "venv", "__pycache__", "dist", "build",
+    ".terraform", "modules", ".venv", "env"
+]
+
+class ThreadPeak:
+    """Polls the thread count in the background and keeps the highest value seen"""
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            # Minus this polling thread
+            self.peak = max(self.peak, threading.active_count() - 1)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        return False
+
+def _scan_function(name, config):
+    """
+    A callable running one full walk with the named scanner, and a counter
+    of the directories it visited (every visited directory looks for a .gitignore).
+    """
+    visited = itertools.count()
+    from modules.scanner import RepositoryScanner
+
+    class CountingScanner(RepositoryScanner):
+        def get_gitignore_matcher(self, directory):
+            next(visited)
+            return super().get_gitignore_matcher(directory)
+
+    scanner = CountingScanner(config)
+    run = lambda: scanner.scan_directory(Path(config["scan_directory"]), max_depth=config["max_depth"])
+    return run, visited
+
+def run_worker(args):
+    """Time one scanner in this (fresh) process and print the measurements as JSON"""
+    config = {"scan_directory": args.root, "max_depth": args.max_depth,
+              "excluded_dirs": EXCLUDED_DIRS, "high_level_dirs": []}
+    run, visited = _scan_function(args.worker, config)
+    logging.disable(logging.WARNING)
+
+    runs = []
+    for _ in range(1 + args.warm_runs):
+        before = next(visited)
+        with ThreadPeak() as threads:
+            started = time.perf_counter()
+            git_repos, _ = run()
+            elapsed = time.perf_counter() - started
+        directories = next(visited) - before - 1
+        runs.append({
+            "seconds": elapsed,
+            "directories": directories,
+            "dirs_per_second": directories / elapsed if elapsed else None,
+            "repositories": len(git_repos),
+            "peak_threads": threads.peak,
+            # ru_maxrss is in kilobytes on Linux
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        })
+    print(json.dumps(runs))
+
+def drop_caches():
+    """Drop the OS page, dentry and inode caches; returns False without the privileges to"""
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+def measure(name, root, args):
+    cold_cache = drop_caches() if args.drop_caches else False
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", name, "--root", str(root),
+         "--max-depth", str(args.max_depth), "--warm-runs", str(args.warm_runs)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    runs = json.loads(output.strip().splitlines()[-1])
+    cold, warm = runs[0], runs[1:]
+    result = {"cold": {**cold, "os_cache_dropped": cold_cache}}
+    if warm:
+        result["warm"] = {
+            "median_seconds": statistics.median(run["seconds"] for run in warm),
+            "best_seconds": min(run["seconds"] for run in warm),
+            "directories": warm[-1]["directories"],
+            "dirs_per_second": statistics.median(run["dirs_per_second"] for run in warm),
+            "repositories": warm[-1]["repositories"],
+            "peak_threads": max(run["peak_threads"] for run in warm),
+            "peak_rss_mb": warm[-1]["peak_rss_mb"]
+        }
+    return result
+
+def print_results(report, baseline=None):
+    rows = []
+    for name, result in report["results"].items():
+        previous = (baseline or {}).get("results", {}).get(name, {})
+        for phase in ("cold", "warm"):
+            if phase not in result:
+                continue
+            measured = result[phase]
+            seconds = measured["seconds"] if phase == "cold" else measured["median_seconds"]
+            row = [name, phase, measured["directories"], measured["repositories"], f"{seconds:.3f}",
+                   f"{measured['dirs_per_second']:.0f}", measured["peak_threads"], f"{measured['peak_rss_mb']:.1f}"]
+            if baseline is not None:
+                before = previous.get(phase)
+                before_seconds = before and (before["seconds"] if phase == "cold" else before["median_seconds"])
+                row.append(change(seconds, before_seconds))
+            rows.append(row)
+    headers = ["Scanner", "Run", "Dirs", "Repos", "Seconds", "Dirs/sec", "Peak threads", "Peak RSS MB"]
+    if baseline is not None:
+        headers.append(f"vs {baseline.get('commit') or 'baseline'}")
+    print(tabulate(rows, headers=headers))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scanners' directory walk")
+    add_tree_arguments(parser)
+    parser.add_argument("--root", help="Existing tree to scan instead of generating one")
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--warm-runs", type=int, default=3)
+    parser.add_argument("--scanners", nargs="+", choices=SCANNERS, default=list(SCANNERS))
+    parser.add_argument("--drop-caches", action="store_true",
+                        help="Drop OS caches before each cold run (needs root)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/scan-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--worker", choices=SCANNERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    created = None
+    if args.root:
+        root = Path(args.root).resolve()
+        tree = {"root": str(root)}
+    else:
+        created = Path(tempfile.mkdtemp(prefix="sentinel-bench-"))
+        root = created / "code"
+        print(f"Building synthetic tree under {root} ...")
+        tree = build_tree(root, **tree_options(args))
+
+    try:
+        report = {
+            "benchmark": "scan",
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "max_depth": args.max_depth,
+            "tree": tree,
+            "results": {name: measure(name, root, args) for name in args.scanners}
+        }
+    finally:
+        if created:
+            shutil.rmtree(created, ignore_errors=True)
+
+    print_results(report, load_report(args.compare) if args.compare else None)
+    print(f"Results saved to {save_report(report, 'scan', args.output)}")
+
+if __name__ == "__main__":
+    main()
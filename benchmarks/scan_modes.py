@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compare thread and process scan modes on the same tree.
+
+Builds a synthetic tree of git repositories (or uses --root), then times a
+full scan plus enrichment with RepositoryScanner's thread mode and with
+ProcessPoolScanner at each requested process count.
+
+    python benchmarks/scan_modes.py --groups 16 --repos-per-group 25 --processes 4 8 16
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+from tabulate import tabulate
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.scanner import RepositoryScanner
+from modules.parallel_scan import ProcessPoolScanner
+
+EXCLUDED_DIRS = [
+    "node_modules", ".git", "venv", "__pycache__", "dist", "build",
+    ".terraform", "modules", ".venv", "env"
+]
+
+def git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+def build_tree(root, groups, repos_per_group, padding_dirs):
+    """Create `groups` top-level directories, each holding repositories and plain directories"""
+    for group in range(groups):
+        group_dir = root / f"group{group:03d}"
+        for index in range(repos_per_group):
+            repo = group_dir / f"repo{index:03d}"
+            repo.mkdir(parents=True)
+            git("init", "-q", cwd=repo)
+            (repo / "README.md").write_text(f"repository {group}/{index}\n")
+            git("add", ".", cwd=repo)
+            git("-c", "user.name=bench", "-c", "user.email=bench@example.com", "commit", "-qm", "initial", cwd=repo)
+        for index in range(padding_dirs):
+            (group_dir / f"docs{index:03d}" / "nested").mkdir(parents=True)
+
+def thread_scan(root, config):
+    scanner = RepositoryScanner(config)
+    git_repos, _ = scanner.scan_directory(root, max_depth=config["max_depth"])
+    return scanner.get_repositories_info(git_repos)
+
+def process_scan(scanner, root, config, processes):
+    repositories, _ = scanner.scan(str(root), config, config["max_depth"], processes=processes)
+    return repositories
+
+def timed(func, repeat):
+    """Best wall time of `repeat` runs, and the last result"""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark thread vs process scan modes")
+    parser.add_argument("--root", help="Existing directory to scan instead of a synthetic tree")
+    parser.add_argument("--groups", type=int, default=8, help="Top-level directories (shards) to create")
+    parser.add_argument("--repos-per-group", type=int, default=20, help="Repositories per top-level directory")
+    parser.add_argument("--padding-dirs", type=int, default=20, help="Plain directories per top-level directory")
+    parser.add_argument("--processes", type=int, nargs="+", default=[os.cpu_count() or 1],
+                        help="Process counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode; the best time is reported")
+    parser.add_argument("--max-depth", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    created = None
+    if args.root:
+        root = Path(args.root).resolve()
+    else:
+        created = Path(tempfile.mkdtemp(prefix="sentinel-bench-"))
+        root = created / "code"
+        print(f"Building {args.groups * args.repos_per_group} repositories under {root} ...")
+        build_tree(root, args.groups, args.repos_per_group, args.padding_dirs)
+
+    config = {"scan_directory": str(root), "max_depth": args.max_depth,
+              "excluded_dirs": EXCLUDED_DIRS, "high_level_dirs": []}
+    rows = []
+    try:
+        baseline, repositories = timed(lambda: thread_scan(root, config), args.repeat)
+        rows.append(["threads", "-", len(repositories), f"{baseline:.2f}", "1.00x"])
+        for processes in args.processes:
+            scanner = ProcessPoolScanner(processes)
+            # Start the pool before timing; it is reused across scans in the app
+            process_scan(scanner, root, config, processes)
+            elapsed, repositories = timed(lambda: process_scan(scanner, root, config, processes), args.repeat)
+            scanner.shutdown()
+            rows.append(["processes", processes, len(repositories), f"{elapsed:.2f}", f"{baseline / elapsed:.2f}x"])
+    finally:
+        if created:
+            shutil.rmtree(created, ignore_errors=True)
+
+    print(tabulate(rows, headers=["Mode", "Processes", "Repositories", "Best seconds", "Speedup"]))
+
+if __name__ == "__main__":
+    main()
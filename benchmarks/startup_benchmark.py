@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark how fast the app comes back after a (container) restart.
+
+The app is started --restarts times on a data directory seeded with an
+inventory of --repos repositories (see load_test.py). The first start also
+builds the search index; later starts find it current. For each start it
+measures:
+
+- listening: process start until /healthz answers
+- ready: process start until /readyz answers 200 (inventory loaded, search index current)
+- first_request: latency of the first /api/repositories once ready
+- rss_mb: server RSS once ready
+
+It also reports how long `import app` takes and whether importing it pulled
+in GitPython or gitignore_parser.
+
+    python benchmarks/startup_benchmark.py --repos 10000 --output before.json
+    python benchmarks/startup_benchmark.py --repos 10000 --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import statistics
+import argparse
+import tempfile
+import subprocess
+import http.client
+from pathlib import Path
+from datetime import datetime
+
+from tabulate import tabulate
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from load_test import seed_inventory, free_port
+from bench_report import git_commit, save_report, load_report, change
+
+MEASURES = ("listening", "ready", "first_request")
+
+IMPORT_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+import app
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "git_imported": "git" in sys.modules,
+    "gitignore_parser_imported": "gitignore_parser" in sys.modules
+}))
+"""
+
+def _status(port, path):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+def _wait_for(port, path, started, process, timeout=120, interval=0.005):
+    """Seconds from `started` until `path` answers 200"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if _status(port, path) == 200:
+                return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(interval)
+    raise RuntimeError(f"{path} did not answer within {timeout}s")
+
+def _rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+def start_once(server, environment):
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "benchmarks" / "load_test.py"), "--serve", "--server", server, "--port", str(port)],
+        env=environment, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        listening = _wait_for(port, "/healthz", started, process)
+        ready = _wait_for(port, "/readyz", started, process)
+        request_started = time.perf_counter()
+        status = _status(port, "/api/repositories")
+        first_request = time.perf_counter() - request_started
+        return {
+            "listening": listening,
+            "ready": ready,
+            "first_request": first_request,
+            "first_request_status": status,
+            "rss_mb": _rss_mb(process.pid)
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def measure_import(environment):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=environment, cwd=ROOT,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def print_results(report, baseline=None):
+    results = report["results"]
+    before = (baseline or {}).get("results", {})
+    rows = []
+    for phase in ("first_start", "restart"):
+        if phase not in results:
+            continue
+        for measure in MEASURES:
+            seconds = results[phase][measure]
+            row = [phase, measure, f"{seconds * 1000:.0f}"]
+            if baseline is not None:
+                row.append(change(seconds, before.get(phase, {}).get(measure)))
+            rows.append(row)
+    headers = ["Start", "Measure", "ms"]
+    if baseline is not None:
+        headers.append(f"vs {baseline.get('commit') or 'baseline'}")
+    print(tabulate(rows, headers=headers))
+    imported = results["import"]
+    print()
+    print(f"import app: {imported['seconds'] * 1000:.0f} ms "
+          f"(GitPython imported: {imported['git_imported']}, "
+          f"gitignore_parser imported: {imported['gitignore_parser_imported']}); "
+          f"server RSS once ready: {results['rss_mb']:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app startup on a seeded inventory")
+    parser.add_argument("--server", choices=("threaded", "asgi"), default="threaded")
+    parser.add_argument("--repos", type=int, default=10000, help="Repositories in the seeded inventory")
+    parser.add_argument("--restarts", type=int, default=5, help="Starts after the first one")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/startup-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="sentinel-startup-"))
+    try:
+        seed_inventory(workdir / "data", workdir / "code", args.repos, [], seed=1)
+        environment = {**os.environ, "SENTINEL_DATA_DIR": str(workdir / "data")}
+        print(f"Starting the {args.server} server {1 + args.restarts} times on {args.repos} repositories ...")
+        first = start_once(args.server, environment)
+        restarts = [start_once(args.server, environment) for _ in range(args.restarts)]
+        results = {"first_start": first, "import": measure_import(environment),
+                   "rss_mb": (restarts or [first])[-1]["rss_mb"]}
+        if restarts:
+            results["restart"] = {measure: statistics.median(run[measure] for run in restarts) for measure in MEASURES}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "benchmark": "startup",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "cpus": os.cpu_count(),
+        "server": args.server,
+        "repos": args.repos,
+        "results": results
+    }
+    print_results(report, load_report(args.compare) if args.compare else None)
+    print(f"Results saved to {save_report(report, 'startup', args.output)}")
+
+if __name__ == "__main__":
+    main()
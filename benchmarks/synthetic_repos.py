@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Reproducible fleets of git repositories with local bare remotes, for the
+git-operations benchmarks.
+
+One template repository is built per fleet and copied, so fleets of 10k
+repositories take seconds rather than hours. The remote's history is written with a
+single `git fast-import`, however long it is. Every repository:
+
+- has --files tracked files of --file-size bytes, and a history of --history commits
+- is --behind commits behind its remote and --ahead local commits ahead of it
+- has --dirty-files modified tracked files, in a --dirty-ratio share of the fleet
+
+    python benchmarks/synthetic_repos.py /tmp/fleet --repos 1000 --history 500
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import subprocess
+from pathlib import Path
+
+DEFAULTS = {
+    "repos": 10,
+    "history": 100,
+    "files": 50,
+    "file_size": 2048,
+    "dirty_files": 3,
+    "dirty_ratio": 0.5,
+    "ahead": 1,
+    "behind": 2,
+    "seed": 1
+}
+
+IDENTITY = ["-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+
+def git(*args, cwd, input=None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, input=input)
+
+def _content(rng, size):
+    line = " ".join(f"{rng.random():.8f}" for _ in range(8)) + "\n"
+    return (line * (size // len(line) + 1))[:size].encode()
+
+def _fast_import_stream(rng, history, files, file_size):
+    """A fast-import stream: one commit adding every file, then one modified file per commit"""
+    chunks = []
+    timestamp = 1_700_000_000
+    for number in range(history):
+        message = f"commit {number}".encode()
+        chunks.append(b"commit refs/heads/main\n")
+        chunks.append(f"committer bench <bench@example.com> {timestamp + number * 60} +0000\n".encode())
+        chunks.append(f"data {len(message)}\n".encode() + message + b"\n")
+        paths = range(files) if number == 0 else [rng.randrange(files)]
+        for index in paths:
+            data = _content(rng, file_size)
+            chunks.append(f"M 100644 inline src/file{index:04d}.txt\n".encode())
+            chunks.append(f"data {len(data)}\n".encode() + data + b"\n")
+    return b"".join(chunks)
+
+def build_fleet(root, repos=DEFAULTS["repos"], history=DEFAULTS["history"], files=DEFAULTS["files"],
+                file_size=DEFAULTS["file_size"], dirty_files=DEFAULTS["dirty_files"],
+                dirty_ratio=DEFAULTS["dirty_ratio"], ahead=DEFAULTS["ahead"], behind=DEFAULTS["behind"],
+                seed=DEFAULTS["seed"]):
+    """
+    Create a fleet under `root` (which must not exist yet): a bare remote at
+    root/remote.git shared by every repository under root/repos/.
+
+    Returns:
+        dict: The options used, the repository paths and which of them are dirty.
+    """
+    if behind >= history:
+        raise ValueError("--behind must be smaller than --history")
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True)
+
+    remote = root / "remote.git"
+    git("init", "-q", "--bare", "-b", "main", str(remote), cwd=root)
+    git("fast-import", "--quiet", cwd=remote, input=_fast_import_stream(rng, history, files, file_size))
+
+    template = root / "template"
+    git("clone", "-q", str(remote), str(template), cwd=root)
+    git("config", "user.name", "bench", cwd=template)
+    git("config", "user.email", "bench@example.com", cwd=template)
+    git("config", "pull.rebase", "false", cwd=template)
+    if behind:
+        git("reset", "-q", "--hard", f"HEAD~{behind}", cwd=template)
+    for number in range(ahead):
+        (template / f"local{number:03d}.txt").write_text(f"local change {number}\n")
+        git("add", ".", cwd=template)
+        git(*IDENTITY, "commit", "-qm", f"local commit {number}", cwd=template)
+
+    repos_dir = root / "repos"
+    repos_dir.mkdir()
+    paths, dirty = [], []
+    for index in range(repos):
+        repo = repos_dir / f"repo{index:05d}"
+        shutil.copytree(template, repo, symlinks=True)
+        paths.append(str(repo))
+        if dirty_files and rng.random() < dirty_ratio:
+            for file_index in rng.sample(range(files), min(dirty_files, files)):
+                with open(repo / "src" / f"file{file_index:04d}.txt", "a") as f:
+                    f.write("uncommitted change\n")
+            dirty.append(str(repo))
+    shutil.rmtree(template)
+
+    return {
+        "options": {
+            "repos": repos, "history": history, "files": files, "file_size": file_size,
+            "dirty_files": dirty_files, "dirty_ratio": dirty_ratio, "ahead": ahead,
+            "behind": behind, "seed": seed
+        },
+        "remote": str(remote),
+        "repositories": paths,
+        "dirty": dirty
+    }
+
+def add_fleet_arguments(parser):
+    """Add the generator options to an argparse parser"""
+    parser.add_argument("--repos", type=int, default=DEFAULTS["repos"], help="Repositories in the fleet")
+    parser.add_argument("--history", type=int, default=DEFAULTS["history"], help="Commits on the remote")
+    parser.add_argument("--files", type=int, default=DEFAULTS["files"], help="Tracked files per repository")
+    parser.add_argument("--file-size", type=int, default=DEFAULTS["file_size"], help="Bytes per tracked file")
+    parser.add_argument("--dirty-files", type=int, default=DEFAULTS["dirty_files"],
+                        help="Modified tracked files in each dirty repository")
+    parser.add_argument("--dirty-ratio", type=float, default=DEFAULTS["dirty_ratio"],
+                        help="Share of repositories with local changes")
+    parser.add_argument("--ahead", type=int, default=DEFAULTS["ahead"], help="Local commits not on the remote")
+    parser.add_argument("--behind", type=int, default=DEFAULTS["behind"], help="Remote commits not pulled yet")
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+
+def fleet_options(args):
+    """The build_fleet keyword arguments from parsed add_fleet_arguments options"""
+    return {name: getattr(args, name) for name in DEFAULTS}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible fleet of git repositories")
+    parser.add_argument("root", help="Directory to create")
+    add_fleet_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.root):
+        sys.exit(f"{args.root} already exists")
+    fleet = build_fleet(args.root, **fleet_options(args))
+    print(json.dumps({**fleet, "repositories": len(fleet["repositories"]), "dirty": len(fleet["dirty"])}, indent=2))
+
+if __name__ == "__main__":
+    main()
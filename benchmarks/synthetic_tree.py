@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Reproducible synthetic repository trees for the benchmarks.
+
+The same seed and options always produce the same layout:
+
+- git repositories at depths 1 to --max-repo-depth
+- project directories with large node_modules/ and venv/ trees the scanner should prune
+- nested .gitignore files excluding generated build directories
+- symlink loops (a `loop -> .` link), which the scanner follows until max_depth
+- git worktrees (a `.git` file rather than a directory), walked like plain directories
+
+    python benchmarks/synthetic_tree.py /tmp/tree --repos 500 --seed 7
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+from pathlib import Path
+
+DEFAULTS = {
+    "repos": 200,
+    "max_repo_depth": 4,
+    "projects": 20,
+    "node_modules_packages": 150,
+    "venv_packages": 100,
+    "gitignores": 10,
+    "symlink_loops": 5,
+    "worktrees": 5,
+    "padding_dirs": 200,
+    "seed": 1
+}
+
+AREAS = ["work", "personal", "oss", "clients", "archive", "experiments"]
+
+def git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+def _nested_dir(rng, root, depth):
+    """A directory `depth` levels below root, reusing names so levels are shared"""
+    parts = [rng.choice(AREAS)] + [f"group{rng.randrange(6)}" for _ in range(depth - 1)]
+    return root.joinpath(*parts)
+
+def _make_package_tree(base, packages, rng):
+    for index in range(packages):
+        package = base / f"pkg{index:04d}"
+        (package / "lib" / "internal").mkdir(parents=True, exist_ok=True)
+        if rng.random() < 0.3:
+            (package / "node_modules" / f"dep{index:04d}" / "dist").mkdir(parents=True, exist_ok=True)
+
+def build_tree(root, repos=DEFAULTS["repos"], max_repo_depth=DEFAULTS["max_repo_depth"],
+               projects=DEFAULTS["projects"], node_modules_packages=DEFAULTS["node_modules_packages"],
+               venv_packages=DEFAULTS["venv_packages"], gitignores=DEFAULTS["gitignores"],
+               symlink_loops=DEFAULTS["symlink_loops"], worktrees=DEFAULTS["worktrees"],
+               padding_dirs=DEFAULTS["padding_dirs"], seed=DEFAULTS["seed"]):
+    """
+    Create a synthetic tree under `root` (which must not exist yet).
+
+    Returns:
+        dict: The options used and counts of what was created (the tree's manifest).
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True)
+    options = {
+        "repos": repos, "max_repo_depth": max_repo_depth, "projects": projects,
+        "node_modules_packages": node_modules_packages, "venv_packages": venv_packages,
+        "gitignores": gitignores, "symlink_loops": symlink_loops, "worktrees": worktrees,
+        "padding_dirs": padding_dirs, "seed": seed
+    }
+
+    repo_paths = []
+    for index in range(repos):
+        repo = _nested_dir(rng, root, rng.randint(1, max_repo_depth)) / f"repo{index:04d}"
+        repo.mkdir(parents=True)
+        git("init", "-q", cwd=repo)
+        (repo / "src").mkdir()
+        repo_paths.append(repo)
+
+    # Worktrees need a commit to check out
+    for index, repo in enumerate(rng.sample(repo_paths, min(worktrees, len(repo_paths)))):
+        (repo / "README.md").write_text(f"{repo.name}\n")
+        git("add", ".", cwd=repo)
+        git("-c", "user.name=bench", "-c", "user.email=bench@example.com", "commit", "-qm", "initial", cwd=repo)
+        git("worktree", "add", "-q", "-b", f"wt{index}", str(repo.parent / f"{repo.name}-wt{index}"), cwd=repo)
+
+    # Non-git projects holding dependency trees the scanner should not descend into
+    project_paths = []
+    for index in range(projects):
+        project = _nested_dir(rng, root, rng.randint(1, max_repo_depth)) / f"project{index:03d}"
+        (project / "src").mkdir(parents=True)
+        _make_package_tree(project / "node_modules", node_modules_packages, rng)
+        _make_package_tree(project / "venv" / "lib" / "python3.11" / "site-packages", venv_packages, rng)
+        project_paths.append(project)
+
+    for project in rng.sample(project_paths, min(gitignores, len(project_paths))):
+        (project / ".gitignore").write_text("build-output/\n*.tmp\n")
+        (project / "build-output" / "deep" / "deeper").mkdir(parents=True)
+        (project / "scratch.tmp" / "nested").mkdir(parents=True)
+
+    for project in rng.sample(project_paths, min(symlink_loops, len(project_paths))):
+        os.symlink(".", project / "loop")
+
+    for index in range(padding_dirs):
+        (_nested_dir(rng, root, rng.randint(1, max_repo_depth)) / f"notes{index:04d}").mkdir(parents=True, exist_ok=True)
+
+    directories = sum(len(dirs) for _, dirs, _ in os.walk(root)) + 1
+    return {
+        "options": options,
+        "repositories": len(repo_paths),
+        "worktrees": min(worktrees, len(repo_paths)),
+        "projects": len(project_paths),
+        "directories_on_disk": directories
+    }
+
+def add_tree_arguments(parser):
+    """Add the generator options to an argparse parser"""
+    parser.add_argument("--repos", type=int, default=DEFAULTS["repos"], help="Git repositories to create")
+    parser.add_argument("--max-repo-depth", type=int, default=DEFAULTS["max_repo_depth"],
+                        help="Deepest level repositories and projects are placed at")
+    parser.add_argument("--projects", type=int, default=DEFAULTS["projects"],
+                        help="Non-git projects with node_modules/ and venv/ trees")
+    parser.add_argument("--node-modules-packages", type=int, default=DEFAULTS["node_modules_packages"])
+    parser.add_argument("--venv-packages", type=int, default=DEFAULTS["venv_packages"])
+    parser.add_argument("--gitignores", type=int, default=DEFAULTS["gitignores"],
+                        help="Projects with a .gitignore excluding generated directories")
+    parser.add_argument("--symlink-loops", type=int, default=DEFAULTS["symlink_loops"])
+    parser.add_argument("--worktrees", type=int, default=DEFAULTS["worktrees"])
+    parser.add_argument("--padding-dirs", type=int, default=DEFAULTS["padding_dirs"],
+                        help="Plain directories scattered through the tree")
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+
+def tree_options(args):
+    """The build_tree keyword arguments from parsed add_tree_arguments options"""
+    return {name: getattr(args, name) for name in DEFAULTS}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic repository tree")
+    parser.add_argument("root", help="Directory to create")
+    add_tree_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.root):
+        sys.exit(f"{args.root} already exists")
+    print(json.dumps(build_tree(args.root, **tree_options(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Production server configuration.
+
+    gunicorn -c gunicorn.conf.py
+
+The app is loaded once in the master process, which also parses the stored
+inventory, and then forked into SENTINEL_WORKERS worker processes of
+SENTINEL_THREADS threads each. One worker becomes the writer: it runs jobs,
+progress streams and the background services. The others serve the read-only
+routes and forward every other request to the writer (see modules/writer.py).
+"""
+import os
+import tempfile
+
+wsgi_app = "app:app"
+bind = os.environ.get("SENTINEL_BIND", "0.0.0.0:8080")
+workers = int(os.environ.get("SENTINEL_WORKERS", 4))
+worker_class = "gthread"
+# Progress streams hold a thread for as long as a client listens
+threads = int(os.environ.get("SENTINEL_THREADS", 32))
+preload_app = True
+accesslog = os.environ.get("SENTINEL_ACCESS_LOG")
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before any worker is forked"""
+    import app
+    os.environ["SENTINEL_WRITER_SOCKET"] = os.path.join(tempfile.mkdtemp(prefix="sentinel-"), "writer.sock")
+    app.preload()
+
+def post_fork(server, worker):
+    import app
+    app.start_worker()
+
+def worker_exit(server, worker):
+    import app
+    app.stop_worker()
@@ -3,4 +3,4 @@ This file is used to mark the modules directory as a Python package.
 It allows importing modules from this directory.
 """
 
-__all__ = ['config', 'scanner', 'git_operations']
+__all__ = ['config', 'scanner', 'git_operations', 'inventory', 'scan_diff', 'status_history', 'search_index', 'events', 'jobs', 'bulk_pull', 'fetch_scheduler', 'rescan_scheduler', 'fs_watcher', 'disk_usage', 'tasks', 'parallel_scan', 'metrics', 'tracing', 'profiling', 'writer']
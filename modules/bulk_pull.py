@@ -0,0 +1,269 @@
+import os
+import re
+import time
+import threading
+import logging
+import concurrent.futures
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+from .git_operations import GitOperations
+
+logger = logging.getLogger(__name__)
+
+# scp-like git URLs: [user@]host:path
+_SCP_URL = re.compile(r"^(?:[^@/]+@)?([^:/]+):(?!//)")
+
+def remote_host(repo):
+    """
+    Get the host of a repository's first remote URL.
+
+    Returns:
+        str or None: Lower-cased host name, "local" for remotes on the local
+                     filesystem, or None if the repository has no remote URL.
+    """
+    url = next((r.get("fetch_url") for r in repo.get("remotes", []) or [] if r.get("fetch_url")), None)
+    if not url:
+        return None
+    if "://" in url:
+        parts = urlsplit(url)
+        return (parts.hostname or "local").lower() if parts.scheme != "file" else "local"
+    match = _SCP_URL.match(url)
+    if match:
+        return match.group(1).lower()
+    return "local"
+
+def _is_under(path, parent):
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+def select_repositories(repositories, ids=None, filters=None):
+    """
+    Pick repositories by ID list and/or filter.
+
+    Args:
+        repositories (list): Repository records.
+        ids (list, optional): Repository IDs to include.
+        filters (dict, optional): Any of `status` (string or list), `path` (repositories at or below a directory),
+                                  `name` (case-insensitive substring) and `host` (remote host).
+
+    Returns:
+        list: The matching records, in inventory order.
+    """
+    selected = repositories
+    if ids is not None:
+        wanted = set(ids)
+        selected = [repo for repo in selected if repo.get("id") in wanted]
+    if filters:
+        statuses = filters.get("status")
+        if isinstance(statuses, str):
+            statuses = [statuses]
+        path_prefix = filters.get("path")
+        name = (filters.get("name") or "").lower()
+        host = (filters.get("host") or "").lower()
+        selected = [
+            repo for repo in selected
+            if (not statuses or repo.get("status") in statuses)
+            and (not path_prefix or _is_under(repo.get("path") or "", path_prefix))
+            and (not name or name in (repo.get("name") or "").lower())
+            and (not host or remote_host(repo) == host)
+        ]
+    return selected
+
+class HostLimitedRunner:
+    """
+    Runs one task per item on a thread pool with a global concurrency limit and
+    a per-host limit, so a large batch never opens more than `per_host`
+    connections to the same git server. Hosts are served round-robin, so one
+    busy host does not hold up the others.
+    """
+    def __init__(self, concurrency=8, per_host=2):
+        self.concurrency = max(int(concurrency), 1)
+        self.per_host = max(int(per_host), 1)
+
+    def run(self, items, host_of, task, on_done=None, should_stop=None):
+        """
+        Run task(item) for every item and wait for all of them.
+
+        Args:
+            items (iterable): Work items.
+            host_of (function): Returns the host an item talks to.
+            task (function): Called on a pool thread for each item.
+            on_done (function, optional): Called as on_done(item, result, error) when a task finishes.
+            should_stop (function, optional): Once it returns True no new tasks are started.
+
+        Returns:
+            list: Items that were never started because of should_stop.
+        """
+        pending = OrderedDict()
+        for item in items:
+            pending.setdefault(host_of(item), deque()).append(item)
+        running = {host: 0 for host in pending}
+        hosts = list(pending)
+        cond = threading.Condition()
+        state = {"active": 0, "next": 0}
+
+        def pick_host():
+            for offset in range(len(hosts)):
+                index = (state["next"] + offset) % len(hosts)
+                host = hosts[index]
+                if pending[host] and running[host] < self.per_host:
+                    state["next"] = (index + 1) % len(hosts)
+                    return host
+            return None
+
+        def execute(host, item):
+            result, error = None, None
+            try:
+                result = task(item)
+            except Exception as e:
+                error = e
+            try:
+                if on_done:
+                    on_done(item, result, error)
+            finally:
+                with cond:
+                    running[host] -= 1
+                    state["active"] -= 1
+                    cond.notify_all()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                with cond:
+                    while True:
+                        stopping = should_stop is not None and should_stop()
+                        host = None if stopping or state["active"] >= self.concurrency else pick_host()
+                        if host is not None:
+                            break
+                        if state["active"] == 0 and (stopping or not any(pending.values())):
+                            return [item for queue in pending.values() for item in queue] if stopping else []
+                        # Wait for a slot; the timeout lets a stop request be noticed
+                        cond.wait(0.5)
+                    item = pending[host].popleft()
+                    running[host] += 1
+                    state["active"] += 1
+                executor.submit(execute, host, item)
+
+class BulkPull:
+    """
+    Pulls a batch of repositories with global and per-remote-host concurrency limits.
+
+    Repositories with local changes or without a remote are skipped up front.
+    Refreshed repository info for successful pulls is collected and written to
+    the inventory in batches rather than once per repository.
+    """
+    # Flush refreshed records to the inventory after this many pulls or seconds
+    FLUSH_COUNT = 50
+    FLUSH_INTERVAL = 2.0
+
+    def __init__(self, inventory, concurrency=8, per_host=2, git_ops=None):
+        self.inventory = inventory
+        self.runner = HostLimitedRunner(concurrency, per_host)
+        self.git_ops = git_ops or GitOperations()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._updates = {}
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def skip_reason(repo):
+        """Why a repository should not be pulled, or None if it can be"""
+        if repo.get("has_changes") or repo.get("status") == "Changed":
+            return "local changes"
+        if remote_host(repo) is None:
+            return "no remote"
+        return None
+
+    def _flush(self, force=False):
+        """Write collected repository updates to the inventory"""
+        with self._lock:
+            due = force or len(self._updates) >= self.FLUSH_COUNT or \
+                time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL
+            if not due or not self._updates:
+                return
+            updates, self._updates = self._updates, {}
+            self._last_flush = time.monotonic()
+        # Writes are serialized so batches land in order
+        with self._flush_lock:
+            self.inventory.update_repositories(updates)
+
+    def _pull(self, repo):
+        result = self.git_ops.pull_repository(repo["path"])
+        if result.get("success"):
+            info = self.git_ops.get_repository_info(repo["path"])
+            if "error" not in info:
+                with self._lock:
+                    self._updates[repo["id"]] = info
+            self._flush()
+        return result
+
+    def run(self, repositories, on_skip=None, on_start=None, on_done=None, should_stop=None, skip_check=None):
+        """
+        Pull every repository that is safe to pull.
+
+        Args:
+            repositories (list): Repository records to pull.
+            on_skip (function, optional): Called as on_skip(repo, reason) for each skipped repository.
+            on_start (function, optional): Called as on_start(repo) before each pull.
+            on_done (function, optional): Called as on_done(repo, ok, message, seconds) after each pull.
+            should_stop (function, optional): Once it returns True no new pulls are started.
+            skip_check (function, optional): Extra check returning a skip reason (or None) for a repository.
+
+        Returns:
+            dict: Summary with counts, duration, throughput, failures, skips and per-host statistics.
+        """
+        started = time.monotonic()
+        to_pull, skipped = [], []
+        for repo in repositories:
+            reason = self.skip_reason(repo) or (skip_check(repo) if skip_check else None)
+            if reason:
+                skipped.append({"id": repo.get("id"), "path": repo.get("path"), "reason": reason})
+                if on_skip:
+                    on_skip(repo, reason)
+            else:
+                to_pull.append(repo)
+
+        failures = []
+        hosts = {}
+        pulled = 0
+        stats_lock = threading.Lock()
+
+        def task(repo):
+            if on_start:
+                on_start(repo)
+            begin = time.monotonic()
+            return self._pull(repo), time.monotonic() - begin
+
+        def done(repo, result, error):
+            nonlocal pulled
+            pull_result, seconds = result if result else ({"success": False}, 0.0)
+            ok = error is None and pull_result.get("success", False)
+            message = str(error) if error else pull_result.get("message", "")
+            host = remote_host(repo)
+            with stats_lock:
+                host_stats = hosts.setdefault(host, {"pulled": 0, "failed": 0, "seconds": 0.0})
+                host_stats["seconds"] = round(host_stats["seconds"] + seconds, 3)
+                if ok:
+                    pulled += 1
+                    host_stats["pulled"] += 1
+                else:
+                    host_stats["failed"] += 1
+                    failures.append({"id": repo.get("id"), "path": repo.get("path"), "host": host, "message": message})
+            if on_done:
+                on_done(repo, ok, message, seconds)
+
+        not_started = self.runner.run(to_pull, remote_host, task, on_done=done, should_stop=should_stop)
+        self._flush(force=True)
+
+        duration = time.monotonic() - started
+        return {
+            "total": len(repositories),
+            "pulled": pulled,
+            "failed": len(failures),
+            "skipped": len(skipped),
+            "not_started": len(not_started),
+            "duration_seconds": round(duration, 3),
+            "repositories_per_second": round(pulled / duration, 3) if duration > 0 else 0.0,
+            "failures": failures,
+            "skipped_repositories": skipped,
+            "hosts": hosts
+        }
@@ -5,43 +5,86 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def data_dir():
+    """Directory holding the config, inventory and state files (SENTINEL_DATA_DIR overrides data/)"""
+    return Path(os.environ.get("SENTINEL_DATA_DIR") or Path(__file__).parent.parent / "data")
+
+def defaults():
+    """The configuration written on first start"""
+    return {
+        "scan_directory": os.path.expanduser("~/code"),
+        "max_depth": 10,
+        "max_concurrent_jobs": 4,
+        "scan_processes": 0,
+        "bulk_pull_concurrency": 8,
+        "bulk_pull_per_host": 2,
+        "fetch_enabled": False,
+        "fetch_interval": 900,
+        "fetch_rate_per_minute": 30,
+        "rescan_enabled": False,
+        "rescan_interval": 3600,
+        "rescan_budget_per_hour": 20000,
+        "watch_enabled": False,
+        "disk_usage_enabled": False,
+        "disk_usage_interval": 21600,
+        "disk_usage_threads": 4,
+        "task_backend": "local",
+        "task_timeout": 600,
+        "metrics_enabled": False,
+        "tracing_enabled": False,
+        "profiling_sample_rate": 100,
+        "verbose": False,
+        "excluded_dirs": [
+            "node_modules", ".git", "venv", "__pycache__", "dist", "build",
+            ".terraform", "modules", ".venv", "env"
+        ],
+        "high_level_dirs": [],
+        "repositories_file": "data/repositories.json",
+        "browseable_base_paths": [str(Path.home())] # Default to user's home directory
+    }
+
 class ConfigManager:
     """
     Handles configuration loading, saving, and management.
     """
     def __init__(self, app=None):
         self.app = app
-        self.config_file = Path(__file__).parent.parent / "data" / "config.json"
-        self.scan_results_file = Path(__file__).parent.parent / "data" / "git_repos_scan.json"
+        self.config_file = data_dir() / "config.json"
+        self.scan_results_file = data_dir() / "git_repos_scan.json"
         self.config = {}
+        self._follow_changes = False
+        self._config_signature = None
     
     def init_config(self):
         """Initialize configuration with defaults if not exists"""
         if not os.path.exists(self.config_file):
-            default_config = {
-                "scan_directory": os.path.expanduser("~/code"),
-                "max_depth": 10,
-                "verbose": False,
-                "excluded_dirs": [
-                    "node_modules", ".git", "venv", "__pycache__", "dist", "build",
-                    ".terraform", "modules", ".venv", "env"
-                ],
-                "high_level_dirs": [],
-                "repositories_file": "data/repositories.json",
-                "browseable_base_paths": [str(Path.home())] # Default to user's home directory
-            }
+            default_config = defaults()
             self.save_config(default_config)
             logger.info(f"Created default configuration at {self.config_file}")
             return default_config
         else:
             return self.get_config()
     
+    def follow_changes(self):
+        """Reload the config whenever another process replaces the file (reader workers, see modules.writer)"""
+        self._follow_changes = True
+
+    @staticmethod
+    def file_signature(path):
+        """Identity of a file's current version, changed by every save; None if it does not exist"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
     def load_config(self):
         """Load configuration from file"""
         try:
             if not os.path.exists(self.config_file):
                 return self.init_config()
-                
+            
+            self._config_signature = self.file_signature(self.config_file)
             with open(self.config_file, 'r') as f:
                 self.config = json.load(f)
             
@@ -57,16 +100,19 @@ class ConfigManager:
     
     def get_config(self):
         """Get the current configuration"""
-        if not self.config:
+        if not self.config or \
+                (self._follow_changes and self.file_signature(self.config_file) != self._config_signature):
             self.load_config()
         return self.config
 
     def save_config(self, config):
-        """Save configuration to file"""
+        """Save configuration to file atomically (readers in other processes never see a partial file)"""
         try:
             os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            with open(self.config_file, 'w') as f:
+            tmp_file = f"{self.config_file}.tmp"
+            with open(tmp_file, 'w') as f:
                 json.dump(config, f, indent=2)
+            os.replace(tmp_file, self.config_file)
             self.config = config
             return True
         except Exception as e:
@@ -92,11 +138,13 @@ class ConfigManager:
             return {"git_repositories": [], "non_git_directories": []}
     
     def save_scan_results(self, results):
-        """Save scan results to file"""
+        """Save scan results to file atomically (write to a temp file, then rename)"""
         try:
             os.makedirs(os.path.dirname(self.scan_results_file), exist_ok=True)
-            with open(self.scan_results_file, 'w') as f:
+            tmp_file = f"{self.scan_results_file}.tmp"
+            with open(tmp_file, 'w') as f:
                 json.dump(results, f, indent=2)
+            os.replace(tmp_file, self.scan_results_file)
             return True
         except Exception as e:
             logger.error(f"Error saving scan results: {e}")
@@ -0,0 +1,425 @@
+import os
+import json
+import time
+import ctypes
+import ctypes.util
+import logging
+import platform
+import threading
+import concurrent.futures
+from pathlib import Path
+
+from .config import data_dir
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+
+# ioprio_set(2) syscall number by machine; the priority it sets applies to one thread
+IOPRIO_SET_SYSCALLS = {"x86_64": 251, "aarch64": 30, "i386": 289, "i686": 289, "armv7l": 314, "ppc64le": 273}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+# Highest nice value: the lowest CPU priority
+LOWEST_NICE = 19
+
+HEX_DIGITS = set("0123456789abcdef")
+
+def lower_io_priority():
+    """
+    Move the calling thread to the idle I/O scheduling class and the lowest CPU
+    priority, so its reads only get the disk when nothing else wants it (with
+    I/O schedulers that honour classes, such as BFQ).
+
+    Returns:
+        bool: Whether the I/O priority was lowered (Linux only).
+    """
+    thread_id = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, thread_id, LOWEST_NICE)
+    except (AttributeError, OSError) as e:
+        logger.debug(f"Could not lower the CPU priority of thread {thread_id}: {e}")
+
+    number = IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if number is None:
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if libc.syscall(number, IOPRIO_WHO_PROCESS, thread_id, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0:
+            return True
+        err = ctypes.get_errno()
+        logger.debug(f"ioprio_set failed for thread {thread_id}: {os.strerror(err)}")
+    except (OSError, AttributeError) as e:
+        logger.debug(f"ioprio_set is not available: {e}")
+    return False
+
+class DirectoryCache:
+    """
+    What each directory directly contains, keyed by its (device, inode): its
+    mtime when listed, the allocated bytes and count of its files, whether it
+    holds a `.git` entry, and the names of its subdirectories.
+
+    A directory whose inode and mtime are unchanged is not listed again, so a
+    walk only stats the subdirectories of unchanged directories. Files rewritten
+    in place do not change their directory's mtime; entries older than `max_age`
+    are listed again to pick those up.
+
+    Entries of directories no complete pass visited are dropped when it ends.
+    The cache is persisted after every pass so restarts keep it.
+    """
+    def __init__(self, cache_file=None, max_age=24 * HOUR):
+        self.cache_file = Path(cache_file) if cache_file else data_dir() / "disk_usage_cache.json"
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = None
+        self._seen = set()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def load(self):
+        """Load the persisted entries on first use"""
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r') as f:
+                    self._entries = json.load(f).get("directories", {})
+        except Exception as e:
+            logger.error(f"Error loading disk usage cache: {e}")
+
+    def save(self):
+        """Write the entries atomically"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({"directories": self._entries}, f, separators=(",", ":"))
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"Error saving disk usage cache: {e}")
+
+    def list_directory(self, path, st):
+        """
+        The contents of the directory at `path`, whose lstat is `st`.
+
+        Returns:
+            tuple: (bytes, files, has_git, subdirectory names)
+        """
+        key = f"{st.st_dev}:{st.st_ino}"
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == st.st_mtime_ns and now - entry[1] < self.max_age:
+            with self._lock:
+                self._seen.add(key)
+                self._stats["hits"] += 1
+            return entry[2], entry[3], entry[4], entry[5]
+
+        size, files, has_git, subdirs = 0, 0, False, []
+        with os.scandir(path) as entries:
+            for item in entries:
+                try:
+                    if item.is_dir(follow_symlinks=False):
+                        subdirs.append(item.name)
+                        continue
+                    item_stat = item.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                # A .git file is a linked worktree or a submodule checkout
+                has_git = has_git or item.name == ".git"
+                size += item_stat.st_blocks * 512
+                files += 1
+        has_git = has_git or ".git" in subdirs
+
+        with self._lock:
+            self._entries[key] = [st.st_mtime_ns, now, size, files, has_git, subdirs]
+            self._seen.add(key)
+            self._stats["misses"] += 1
+        return size, files, has_git, subdirs
+
+    def finish_pass(self, complete):
+        """Forget directories a complete pass did not visit, then persist"""
+        with self._lock:
+            if complete:
+                self._entries = {key: entry for key, entry in self._entries.items() if key in self._seen}
+            self._seen = set()
+        self.save()
+
+    def stats(self):
+        with self._lock:
+            return {"directories": len(self._entries or {}), **self._stats}
+
+class _Walk:
+    """
+    One repository's walk. Every directory is a task on the shared thread pool,
+    so siblings are listed in parallel; bytes are summed per category.
+    """
+    def __init__(self, cache, executor, objects_dir, should_stop):
+        self.cache = cache
+        self.executor = executor
+        self.objects_dir = objects_dir
+        self.should_stop = should_stop
+        self.totals = {"worktree": 0, "git": 0, "pack": 0, "loose": 0}
+        self.files = 0
+        self.directories = 0
+        self.stopped = False
+        self._pending = 0
+        self._done = threading.Condition()
+
+    def add(self, path, category, top=False):
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return
+        self._submit(path, st, category, top)
+
+    def _submit(self, path, st, category, top):
+        with self._done:
+            self._pending += 1
+        self.executor.submit(self._visit, path, st, category, top)
+
+    def _child_category(self, category, path, name):
+        if category == "git" and path == self.objects_dir:
+            if name == "pack":
+                return "pack"
+            if len(name) == 2 and set(name) <= HEX_DIGITS:
+                return "loose"
+        return category
+
+    def _visit(self, path, st, category, top):
+        try:
+            if self.should_stop():
+                self.stopped = True
+                return
+            try:
+                size, files, has_git, subdirs = self.cache.list_directory(path, st)
+            except OSError:
+                return
+            # A nested repository is an inventory entry of its own
+            if category == "worktree" and has_git and not top:
+                return
+            with self._done:
+                # Like du, the directory's own blocks count too
+                self.totals[category] += size + st.st_blocks * 512
+                self.files += files
+                self.directories += 1
+
+            for name in subdirs:
+                if category == "worktree" and name == ".git":
+                    continue
+                child = os.path.join(path, name)
+                try:
+                    child_st = os.stat(child, follow_symlinks=False)
+                except OSError:
+                    continue
+                # Do not cross into other filesystems (mounts, bind mounts)
+                if child_st.st_dev != st.st_dev:
+                    continue
+                self._submit(child, child_st, self._child_category(category, path, name), False)
+        except Exception as e:
+            logger.error(f"Error measuring {path}: {e}")
+        finally:
+            with self._done:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._done.notify_all()
+
+    def wait(self):
+        with self._done:
+            while self._pending:
+                self._done.wait()
+
+class DiskUsageScheduler:
+    """
+    Keeps a `size` field (bytes allocated on disk) on every inventoried
+    repository, plus `size_details` splitting it into the worktree and `.git`,
+    and `.git` into packs and loose objects.
+
+    - Every `interval` seconds all repositories are walked on a pool of
+      `threads` threads running in the idle I/O class at the lowest CPU
+      priority (see lower_io_priority).
+    - Directories unchanged since they were last listed are not listed again
+      (see DirectoryCache), so a pass over an unchanged tree only stats directories.
+    - Nested repositories, symlinks and other filesystems are not entered.
+      Hard-linked files (e.g. objects of local clones) count in every repository.
+    - While `is_busy()` is true the walk pauses between directories.
+
+    Only repositories whose size changed are written to the inventory: once at the
+    end of a pass, and every FLUSH_INTERVAL seconds during a long one.
+    """
+    # Longest time measured sizes wait before being written to the inventory (seconds)
+    FLUSH_INTERVAL = 300.0
+    # Seconds after start before the first pass, so restarts do not start with a disk walk
+    STARTUP_DELAY = 60.0
+
+    def __init__(self, inventory, is_busy=None, cache_file=None, interval=6 * HOUR, threads=4, max_age=24 * HOUR):
+        """
+        Args:
+            inventory (InventoryStore): Inventory to read repositories from and write sizes to.
+            is_busy (function, optional): True while background work should yield.
+        """
+        self.inventory = inventory
+        self.is_busy = is_busy or (lambda: False)
+        self.cache = DirectoryCache(cache_file, max_age)
+        self.interval = interval
+        self.threads = threads
+        self._executor = None
+        self._next_pass = 0.0
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {
+            "passes": 0, "measured": 0, "changed": 0, "paused_seconds": 0.0,
+            "last_pass": None, "last_pass_seconds": None, "io_priority_lowered": None
+        }
+
+    def configure(self, config):
+        """Apply `disk_usage_*` settings from the application config"""
+        self.interval = config.get("disk_usage_interval", self.interval)
+        self.threads = config.get("disk_usage_threads", self.threads)
+        self.cache.max_age = config.get("disk_usage_max_age", self.cache.max_age)
+
+    def _init_thread(self):
+        self._stats["io_priority_lowered"] = lower_io_priority()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.threads, thread_name_prefix="disk-usage", initializer=self._init_thread
+            )
+        return self._executor
+
+    def _should_stop(self):
+        """Called before each directory: wait while interactive work runs, then report a stop"""
+        if self.is_busy():
+            paused = time.monotonic()
+            while self.is_busy() and not self._stopped.is_set():
+                self._stopped.wait(0.1)
+            self._stats["paused_seconds"] = round(self._stats["paused_seconds"] + time.monotonic() - paused, 3)
+        return self._stopped.is_set()
+
+    def measure(self, repo_path):
+        """
+        Measure one repository.
+
+        Returns:
+            dict or None: `size` and `size_details` fields, or None if the walk was stopped.
+        """
+        self.cache.load()
+        before = self.cache.stats()
+        git_dir = os.path.join(repo_path, ".git")
+        walk = _Walk(self.cache, self._get_executor(), os.path.join(git_dir, "objects"), self._should_stop)
+        walk.add(repo_path, "worktree", top=True)
+        walk.add(git_dir, "git", top=True)
+        walk.wait()
+
+        after = self.cache.stats()
+        metrics.CACHE_REQUESTS.inc(after["hits"] - before["hits"], cache="disk_usage", result="hit")
+        metrics.CACHE_REQUESTS.inc(after["misses"] - before["misses"], cache="disk_usage", result="miss")
+        if walk.stopped:
+            return None
+
+        totals = walk.totals
+        git = totals["git"] + totals["pack"] + totals["loose"]
+        return {
+            "size": totals["worktree"] + git,
+            "size_details": {
+                "worktree": totals["worktree"],
+                "git": git,
+                "pack": totals["pack"],
+                "loose": totals["loose"],
+                "files": walk.files,
+                "directories": walk.directories
+            }
+        }
+
+    def run_once(self):
+        """
+        Measure every inventoried repository and store the sizes that changed.
+
+        Returns:
+            dict: Repositories measured and changed, and whether the pass completed.
+        """
+        started = time.monotonic()
+        measured, changed, complete = 0, 0, True
+        updates = {}
+        last_flush = started
+        for repo in self.inventory.get_repositories():
+            path = repo.get("path")
+            if not path or not os.path.isdir(path):
+                continue
+            fields = self.measure(path)
+            if fields is None:
+                complete = False
+                break
+            measured += 1
+            if repo.get("size") != fields["size"] or repo.get("size_details") != fields["size_details"]:
+                updates[repo["id"]] = fields
+            # Every write bumps the generation and rewrites the inventory, so they are rare
+            if updates and time.monotonic() - last_flush >= self.FLUSH_INTERVAL:
+                changed += len(self.inventory.update_repositories(updates))
+                updates = {}
+                last_flush = time.monotonic()
+        if updates:
+            changed += len(self.inventory.update_repositories(updates))
+        self.cache.finish_pass(complete)
+
+        seconds = round(time.monotonic() - started, 3)
+        self._stats["measured"] += measured
+        self._stats["changed"] += changed
+        if complete:
+            self._stats["passes"] += 1
+            self._stats["last_pass"] = time.time()
+            self._stats["last_pass_seconds"] = seconds
+        logger.info(f"Disk usage pass measured {measured} repositories ({changed} changed) in {seconds}s")
+        return {"measured": measured, "changed": changed, "complete": complete, "seconds": seconds}
+
+    def refresh(self):
+        """Start a pass now instead of waiting for the interval"""
+        self._next_pass = 0.0
+        self._wake.set()
+
+    def _run(self):
+        # This thread writes the inventory under its lock, so only the pool runs at idle priority
+        while not self._stopped.is_set():
+            if time.monotonic() >= self._next_pass:
+                self._wake.clear()
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Error in disk usage scheduler: {e}")
+                self._next_pass = time.monotonic() + self.interval
+            self._wake.wait(1.0)
+
+    def start(self):
+        """Start measuring in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._next_pass = time.monotonic() + self.STARTUP_DELAY
+        self._thread = threading.Thread(target=self._run, name="disk-usage", daemon=True)
+        self._thread.start()
+        logger.info(f"Disk usage scheduler started (every {self.interval}s on {self.threads} threads)")
+
+    def stop(self):
+        """Stop the scheduler; a pass in progress is abandoned without storing the rest"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def status(self):
+        """Pass statistics and the directory cache's size and hit counts"""
+        return {
+            "running": self._thread is not None,
+            "paused": self.is_busy(),
+            "interval": self.interval,
+            "threads": self.threads,
+            "next_pass_in": round(max(0.0, self._next_pass - time.monotonic()), 1) if self._thread else None,
+            **self._stats,
+            "cache": self.cache.stats()
+        }
@@ -0,0 +1,312 @@
+import json
+import threading
+import itertools
+import logging
+from collections import deque, OrderedDict
+
+from . import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """
+    One listener's view of a topic: a bounded queue of events not yet delivered.
+
+    Events published with a coalesce key replace an undelivered event with the
+    same key instead of queueing behind it. If the queue still overflows, the
+    subscription is dropped (`overflowed` is set) so a slow client can never
+    grow memory without bound; it can reconnect with its last event id and
+    resume from the topic's replay buffer.
+    """
+    def __init__(self, hub, topic, max_pending):
+        self.hub = hub
+        self.topic = topic
+        self.max_pending = max_pending
+        self.overflowed = False
+        self.closed = False
+        self._pending = deque()
+        self._slots = {}
+        self._cond = threading.Condition()
+        self._waker = None
+
+    def set_waker(self, waker):
+        """
+        Register a function called (from the publishing thread) whenever an event
+        is queued or the subscription closes, e.g. to wake an asyncio task.
+        """
+        self._waker = waker
+
+    def _wake(self):
+        self._cond.notify_all()
+        if self._waker is not None:
+            self._waker()
+
+    def _deliver(self, event, coalesce_key=None):
+        """Queue an event for this subscriber (called by the hub)"""
+        with self._cond:
+            if self.closed:
+                return
+            if coalesce_key is not None:
+                slot = self._slots.get(coalesce_key)
+                if slot is not None:
+                    slot[0] = event
+                    return
+            if len(self._pending) >= self.max_pending:
+                self.overflowed = True
+                self.closed = True
+                self._pending.clear()
+                self._slots.clear()
+                self._wake()
+                return
+            slot = [event, coalesce_key]
+            self._pending.append(slot)
+            if coalesce_key is not None:
+                self._slots[coalesce_key] = slot
+            self._wake()
+
+    def _pop(self):
+        slot = self._pending.popleft()
+        if slot[1] is not None and self._slots.get(slot[1]) is slot:
+            del self._slots[slot[1]]
+        return slot[0]
+
+    def get(self, timeout=None):
+        """
+        Wait for the next event.
+
+        Returns:
+            dict or None: The next event, or None on timeout or once the subscription is closed.
+        """
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            if self._pending:
+                return self._pop()
+            return None
+
+    def get_batch(self, max_events, timeout=None):
+        """Wait for at least one event, then return up to `max_events` that are ready"""
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            batch = []
+            while self._pending and len(batch) < max_events:
+                batch.append(self._pop())
+            return batch
+
+    def pending(self):
+        """Number of events queued for this subscriber"""
+        with self._cond:
+            return len(self._pending)
+
+    def drain(self, max_events):
+        """Return up to `max_events` queued events without waiting"""
+        with self._cond:
+            batch = []
+            while self._pending and len(batch) < max_events:
+                batch.append(self._pop())
+            return batch
+
+    def close(self):
+        """Stop receiving events and release the subscriber slot"""
+        with self._cond:
+            self.closed = True
+            self._wake()
+        self.hub._unsubscribe(self)
+
+class EventHub:
+    """
+    Publish/subscribe hub that fans every event out to every subscriber of a topic.
+
+    Each event gets an id that increases across the whole hub, and each topic keeps
+    a bounded replay buffer so reconnecting clients can resume from a `Last-Event-ID`.
+    Buffers are dropped when their topic is released (e.g. its job finished) and has
+    no subscribers left, and at most `max_topics` buffers are kept: beyond that, the
+    least recently published topic without subscribers loses its buffer.
+    """
+    def __init__(self, replay_size=256, max_pending=1000, max_topics=512):
+        self.replay_size = replay_size
+        self.max_pending = max_pending
+        self.max_topics = max_topics
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._replay = OrderedDict()
+        self._evicted = {}
+        self._released = set()
+        self._subscribers = {}
+
+    def publish(self, topic, data, coalesce_key=None):
+        """
+        Publish an event to every subscriber of a topic.
+
+        Args:
+            topic (str): Topic name, e.g. "scan" or "pull:<repo_id>".
+            data (dict): JSON-serializable event payload.
+            coalesce_key (str, optional): Events sharing a key replace each other
+                                          while still undelivered (e.g. progress ticks).
+
+        Returns:
+            int: The event id.
+        """
+        with tracing.span("stream.publish", topic=topic):
+            with self._lock:
+                event = {"id": next(self._ids), "topic": topic, "data": data}
+                self._released.discard(topic)
+                buffer = self._replay.get(topic)
+                if buffer is None:
+                    buffer = self._replay[topic] = deque(maxlen=self.replay_size)
+                    self._evict_idle_topics()
+                else:
+                    self._replay.move_to_end(topic)
+                if len(buffer) == buffer.maxlen:
+                    self._evicted[topic] = buffer[0]["id"]
+                buffer.append(event)
+                subscribers = list(self._subscribers.get(topic, ()))
+
+            for subscription in subscribers:
+                subscription._deliver(event, coalesce_key)
+                if subscription.overflowed:
+                    logger.warning(f"Dropping slow subscriber on topic '{topic}' after {self.max_pending} pending events")
+                    self._unsubscribe(subscription)
+            return event["id"]
+
+    def subscribe(self, topic, last_event_id=None):
+        """
+        Subscribe to a topic.
+
+        Args:
+            topic (str): Topic name.
+            last_event_id (int, optional): Id of the last event the client saw. Buffered
+                                           events after it are replayed first.
+
+        Returns:
+            Subscription: The new subscription; call close() when done.
+        """
+        subscription = Subscription(self, topic, self.max_pending)
+        with self._lock:
+            if last_event_id is not None:
+                gap = self._gap_locked(topic, last_event_id)
+                metrics.CACHE_REQUESTS.inc(cache="sse_replay", result="miss" if gap else "hit")
+                for event in self._replay.get(topic, ()):
+                    if event["id"] > last_event_id:
+                        subscription._deliver(event)
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+                    if subscription.topic in self._released:
+                        self._drop_topic(subscription.topic)
+
+    def release(self, topic):
+        """
+        Drop a topic's replay buffer once nothing more will be published on it (e.g. a
+        finished job's topic): now if it has no subscribers, else when the last one leaves.
+        Publishing on the topic again starts a new buffer.
+        """
+        with self._lock:
+            if self._subscribers.get(topic):
+                self._released.add(topic)
+            else:
+                self._drop_topic(topic)
+
+    def _drop_topic(self, topic):
+        self._released.discard(topic)
+        self._replay.pop(topic, None)
+        self._evicted.pop(topic, None)
+
+    def _evict_idle_topics(self):
+        """Drop the least recently published buffers without subscribers beyond max_topics"""
+        excess = len(self._replay) - self.max_topics
+        if excess <= 0:
+            return
+        idle = [topic for topic in self._replay if not self._subscribers.get(topic)]
+        for topic in idle[:excess]:
+            self._drop_topic(topic)
+
+    def _gap_locked(self, topic, last_event_id):
+        # Without a buffer (released or evicted), nothing after last_event_id can be replayed
+        if topic not in self._replay:
+            return True
+        return self._evicted.get(topic, 0) > last_event_id
+
+    def replay_gap(self, topic, last_event_id):
+        """True if events after `last_event_id` are no longer in the topic's replay buffer"""
+        with self._lock:
+            return self._gap_locked(topic, last_event_id)
+
+    def subscriber_counts(self):
+        """Number of subscribers per topic"""
+        with self._lock:
+            return {topic: len(subscribers) for topic, subscribers in self._subscribers.items()}
+
+    def subscriber_count(self, topic=None):
+        """Number of subscribers on one topic, or across all topics"""
+        with self._lock:
+            if topic is not None:
+                return len(self._subscribers.get(topic, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+def format_sse(event):
+    """Format a hub event as a Server-Sent Events frame carrying its id"""
+    return f"id: {event['id']}\ndata: {json.dumps(event['data'])}\n\n"
+
+def format_sse_batch(events):
+    """Format several hub events as one chunk so they go out in a single write"""
+    return "".join(format_sse(event) for event in events)
+
+class ProgressTicker:
+    """
+    Publishes a snapshot of fast-changing progress counters at a fixed tick rate.
+
+    Producers call mark() after updating their counters (cheap: no copy, no publish).
+    A background thread publishes snapshot() at most once per interval while marked,
+    coalesced so that slow subscribers only ever hold the latest snapshot.
+    `topic` may be a single topic or a sequence of topics to publish each tick to.
+    """
+    def __init__(self, hub, topic, snapshot, interval=0.1, coalesce_key="progress"):
+        self.hub = hub
+        self.topics = (topic,) if isinstance(topic, str) else tuple(topic)
+        self.snapshot = snapshot
+        self.interval = interval
+        self.coalesce_key = coalesce_key
+        self._dirty = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def mark(self):
+        """Note that the counters changed since the last tick"""
+        self._dirty.set()
+
+    def _publish(self):
+        self._dirty.clear()
+        snapshot = self.snapshot()
+        for topic in self.topics:
+            self.hub.publish(topic, snapshot, coalesce_key=self.coalesce_key)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self._dirty.wait(self.interval) and not self._stopped.is_set():
+                self._publish()
+                self._stopped.wait(self.interval)
+
+    def start(self):
+        """Start ticking in a daemon thread"""
+        self._stopped.clear()
+        # Ticks of a traced job show up in its trace
+        self._thread = threading.Thread(target=tracing.bind(self._run), daemon=True)
+        self._thread.start()
+
+    def stop(self, flush=True):
+        """Stop ticking, publishing a final snapshot if anything changed since the last tick"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush and self._dirty.is_set():
+            self._publish()
@@ -0,0 +1,275 @@
+import time
+import heapq
+import random
+import threading
+import logging
+
+from .git_operations import GitOperations
+from .bulk_pull import HostLimitedRunner, remote_host
+
+logger = logging.getLogger(__name__)
+
+def status_from_counts(has_changes, ahead, behind):
+    """Repository status for the given local-change flag and ahead/behind counts"""
+    if has_changes:
+        return "Changed"
+    if ahead > 0 and behind > 0:
+        return "Diverged"
+    if ahead > 0:
+        return "Ahead"
+    if behind > 0:
+        return "Behind"
+    return "Clean"
+
+class TokenBucket:
+    """Rate limiter allowing `rate_per_minute` operations with bursts of up to `burst`"""
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, rate_per_minute // 6))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self):
+        """Number of whole tokens that can be taken right now"""
+        self._refill()
+        return int(self.tokens)
+
+    def take(self, count):
+        """Take up to `count` tokens; returns how many were taken"""
+        self._refill()
+        taken = min(count, int(self.tokens))
+        self.tokens -= taken
+        return taken
+
+class _FetchState:
+    """Scheduling state of one repository"""
+    __slots__ = ("due", "interval", "failures", "last_fetch", "last_change", "last_error")
+
+    def __init__(self, due, interval):
+        self.due = due
+        self.interval = interval
+        self.failures = 0
+        self.last_fetch = None
+        self.last_change = None
+        self.last_error = None
+
+class FetchScheduler:
+    """
+    Periodically fetches remote-tracking refs for every inventoried repository
+    and writes fresh `ahead`/`behind`/`status` values back to the inventory.
+
+    - Each repository has its own interval: it halves (down to `min_interval`)
+      when a fetch brings new commits and grows by half (up to `max_interval`)
+      when nothing changed, so busy repositories are checked more often.
+    - Failing remotes back off exponentially, up to `max_backoff`.
+    - Every due time gets +/- `jitter` so fetches do not bunch up.
+    - A token bucket caps fetches per minute across all repositories, and at
+      most `per_host` fetches run against one remote host at a time.
+    """
+    # How often the repository list is re-read from the inventory (seconds)
+    RECONCILE_INTERVAL = 30.0
+
+    def __init__(self, inventory, git_ops=None, interval=900, min_interval=300, max_interval=6 * 3600,
+                 max_backoff=24 * 3600, rate_per_minute=30, concurrency=4, per_host=2, jitter=0.2):
+        self.inventory = inventory
+        self.git_ops = git_ops or GitOperations()
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_backoff = max_backoff
+        self.rate_per_minute = rate_per_minute
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._states = {}
+        self._heap = []
+        self._bucket = TokenBucket(rate_per_minute)
+        self._last_reconcile = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self._stats = {"fetched": 0, "failed": 0, "changed": 0, "last_run": None}
+
+    def configure(self, config):
+        """Apply `fetch_*` settings from the application config"""
+        self.interval = config.get("fetch_interval", self.interval)
+        self.min_interval = config.get("fetch_min_interval", self.min_interval)
+        self.max_interval = config.get("fetch_max_interval", self.max_interval)
+        self.rate_per_minute = config.get("fetch_rate_per_minute", self.rate_per_minute)
+        self.concurrency = config.get("fetch_concurrency", self.concurrency)
+        self.per_host = config.get("fetch_per_host", self.per_host)
+        self._bucket = TokenBucket(self.rate_per_minute)
+
+    def _jittered(self, seconds):
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule(self, repo_id, state, delay, now):
+        state.due = now + delay
+        heapq.heappush(self._heap, (state.due, repo_id))
+
+    def _reconcile(self, now):
+        """Track new repositories (spread over one interval) and forget removed ones"""
+        repo_ids = {repo.get("id") for repo in self.inventory.get_repositories()}
+        with self._lock:
+            for repo_id in list(self._states):
+                if repo_id not in repo_ids:
+                    # Its heap entry is skipped lazily
+                    del self._states[repo_id]
+            for repo_id in repo_ids - set(self._states):
+                state = _FetchState(now, self.interval)
+                self._states[repo_id] = state
+                self._schedule(repo_id, state, random.uniform(0, self.interval), now)
+        self._last_reconcile = now
+
+    def _pop_due(self, now, limit):
+        """Pop up to `limit` repository IDs whose fetch is due"""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(due) < limit:
+                due_time, repo_id = heapq.heappop(self._heap)
+                state = self._states.get(repo_id)
+                if state is not None and state.due == due_time:
+                    due.append(repo_id)
+        return due
+
+    def _record_result(self, repo, result, now):
+        """Update one repository's schedule from a fetch result"""
+        with self._lock:
+            state = self._states.get(repo.get("id"))
+            if state is None:
+                return
+            state.last_fetch = time.time()
+            if result.get("success"):
+                state.failures = 0
+                state.last_error = None
+                if result.get("updated"):
+                    state.last_change = state.last_fetch
+                    state.interval = max(self.min_interval, state.interval / 2)
+                else:
+                    state.interval = min(self.max_interval, state.interval * 1.5)
+                delay = state.interval
+            else:
+                state.failures += 1
+                state.last_error = result.get("message")
+                delay = min(self.max_backoff, state.interval * 2 ** state.failures)
+            self._schedule(repo.get("id"), state, self._jittered(delay), now)
+
+    def run_once(self):
+        """
+        Fetch every repository that is due, within the rate limit.
+
+        Returns:
+            int: Number of repositories fetched.
+        """
+        now = time.monotonic()
+        if self._last_reconcile is None or now - self._last_reconcile >= self.RECONCILE_INTERVAL:
+            self._reconcile(now)
+
+        repo_ids = self._pop_due(now, self._bucket.available())
+        if not repo_ids:
+            return 0
+        self._bucket.take(len(repo_ids))
+
+        repositories = self.inventory.get_repositories_by_ids(repo_ids)
+        updates = {}
+        results_lock = threading.Lock()
+
+        def fetch(repo):
+            return self.git_ops.fetch_tracking_refs(repo["path"])
+
+        def done(repo, result, error):
+            result = result or {"success": False, "message": str(error)}
+            self._record_result(repo, result, time.monotonic())
+            with results_lock:
+                if result.get("skipped"):
+                    return
+                self._stats["fetched" if result.get("success") else "failed"] += 1
+                if result.get("success"):
+                    if result.get("updated"):
+                        self._stats["changed"] += 1
+                    ahead, behind = result["ahead"], result["behind"]
+                    updates[repo["id"]] = {
+                        "ahead": ahead,
+                        "behind": behind,
+                        "status": status_from_counts(repo.get("has_changes"), ahead, behind)
+                    }
+
+        # Repositories without a remote have no host to run on; just reschedule them
+        remote_repos = []
+        for repo in repositories:
+            if remote_host(repo) is None:
+                done(repo, {"success": True, "updated": False, "skipped": True}, None)
+            else:
+                remote_repos.append(repo)
+
+        not_started = HostLimitedRunner(self.concurrency, self.per_host).run(
+            remote_repos, remote_host, fetch, on_done=done, should_stop=self._stopped.is_set
+        )
+        # Stopped part-way: keep the remaining repositories due for the next run
+        with self._lock:
+            for repo in not_started:
+                state = self._states.get(repo.get("id"))
+                if state is not None:
+                    self._schedule(repo.get("id"), state, 0, now)
+        # One inventory write per batch; unchanged records do not bump the generation
+        if updates:
+            self.inventory.update_repositories(updates)
+        self._stats["last_run"] = time.time()
+        return len(repositories) - len(not_started)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error in fetch scheduler: {e}")
+            self._stopped.wait(1.0)
+
+    def start(self):
+        """Start fetching in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="fetch-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Fetch scheduler started (interval {self.interval}s, {self.rate_per_minute} fetches/min)")
+
+    def stop(self):
+        """Stop the scheduler thread, letting in-flight fetches finish"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        """Scheduler statistics and the repositories whose remotes are failing"""
+        now = time.monotonic()
+        with self._lock:
+            states = list(self._states.items())
+        failing = sorted(
+            ((repo_id, state) for repo_id, state in states if state.failures),
+            key=lambda item: -item[1].failures
+        )
+        next_due = min((state.due for _, state in states), default=None)
+        return {
+            "running": self._thread is not None,
+            "tracked": len(states),
+            "due": sum(1 for _, state in states if state.due <= now),
+            "next_fetch_in": round(max(0.0, next_due - now), 1) if next_due is not None else None,
+            "rate_per_minute": self.rate_per_minute,
+            **self._stats,
+            "failing": [
+                {
+                    "id": repo_id,
+                    "failures": state.failures,
+                    "retry_in": round(max(0.0, state.due - now), 1),
+                    "error": state.last_error
+                }
+                for repo_id, state in failing[:50]
+            ]
+        }
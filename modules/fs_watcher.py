@@ -0,0 +1,435 @@
+import os
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+import time
+import logging
+from pathlib import Path
+
+from .scanner import RepositoryScanner, git_signature
+
+logger = logging.getLogger(__name__)
+
+# inotify event flags (<sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+MAX_USER_WATCHES_FILE = "/proc/sys/fs/inotify/max_user_watches"
+
+class WatchLimitReached(OSError):
+    """Raised when the per-user inotify watch limit (max_user_watches) is exhausted"""
+
+def max_user_watches():
+    """The kernel's per-user inotify watch limit, or None if it cannot be read"""
+    try:
+        with open(MAX_USER_WATCHES_FILE) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+class Inotify:
+    """Minimal ctypes binding to the Linux inotify API"""
+    def __init__(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            init1, add_watch, rm_watch = libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+        except (OSError, AttributeError) as e:
+            raise OSError(errno.ENOSYS, f"inotify is not available: {e}")
+        add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._add_watch, self._rm_watch = add_watch, rm_watch
+
+        self.fd = init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+    def add_watch(self, path, mask):
+        """Watch `path` for the events in `mask`; returns the watch descriptor"""
+        wd = self._add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise WatchLimitReached(err, "inotify watch limit reached", str(path))
+            raise OSError(err, os.strerror(err), str(path))
+        return wd
+
+    def rm_watch(self, wd):
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self, timeout):
+        """
+        Wait up to `timeout` seconds and return the pending events.
+
+        Returns:
+            list: (wd, mask, name) tuples; name is '' for events on the watched path itself.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+def _is_under(path, parent):
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+class FilesystemWatcher:
+    """
+    Keeps the inventory live by watching the scan directory with inotify.
+
+    - Every non-repository directory the scanner walks is watched for
+      subdirectories appearing or disappearing (clones, deletes, moves). The
+      affected subtree is rescanned and stored through `store_subtree`.
+    - Each repository's `.git` directory and `refs/heads` / `refs/remotes` are
+      watched for HEAD, index and ref updates. The repository's git state is
+      re-read through `refresh_repositories`.
+    - Events are debounced for `debounce` seconds, so a clone or a commit
+      lands as one update well within a second.
+
+    If inotify is unavailable or the watch limit (max_user_watches) is reached,
+    all watches are dropped and `on_fallback(reason)` is called so the caller
+    can switch to periodic incremental rescans. A kernel queue overflow only
+    costs one rescan of the whole scan directory.
+    """
+    DIR_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+    GIT_MASK = IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_ONLYDIR
+    # Files in .git whose change can alter a repository's branch, commits or status
+    GIT_FILES = {"HEAD", "index", "packed-refs", "FETCH_HEAD", "ORIG_HEAD", "MERGE_HEAD"}
+    REF_DIRS = ("refs/heads", "refs/remotes")
+
+    def __init__(self, get_config, store_subtree, refresh_repositories, known_repositories,
+                 on_fallback=None, debounce=0.2):
+        """
+        Args:
+            get_config (function): Returns the application config.
+            store_subtree (function): Called as store_subtree(path, git_repos, non_git_dirs) with the
+                                      result of walking `path`; an empty walk means it was removed.
+            refresh_repositories (function): Called with a list of repository paths to re-read.
+            known_repositories (function): Returns the paths of the inventoried repositories.
+            on_fallback (function, optional): Called with a reason once watching is abandoned.
+        """
+        self.get_config = get_config
+        self.store_subtree = store_subtree
+        self.refresh_repositories = refresh_repositories
+        self.known_repositories = known_repositories
+        self.on_fallback = on_fallback
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self._inotify = None
+        self._watches = {}
+        self._wd_by_path = {}
+        self._limit_reached = False
+        self._pending_paths = set()
+        self._pending_repos = {}
+        self._deadline = None
+        self._signatures = {}
+        self._root = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self.mode = "stopped"
+        self.fallback_reason = None
+        self._stats = {"events": 0, "subtree_rescans": 0, "repository_refreshes": 0, "overflows": 0}
+
+    # Watch bookkeeping
+
+    def _add(self, path, mask, kind, repo=None):
+        """Register a watch; returns False (and flags the limit) once max_user_watches is reached"""
+        if self._limit_reached:
+            return False
+        try:
+            wd = self._inotify.add_watch(path, mask)
+        except WatchLimitReached:
+            self._limit_reached = True
+            return False
+        except OSError as e:
+            # Removed between listing and watching, or unreadable
+            logger.debug(f"Cannot watch {path}: {e}")
+            return True
+        with self._lock:
+            self._watches[wd] = (kind, str(path), repo)
+            self._wd_by_path[str(path)] = wd
+        return True
+
+    def _watch_directory(self, dir_path):
+        self._add(dir_path, self.DIR_MASK, "dir")
+
+    def _watch_refs(self, refs_dir, repo):
+        self._add(refs_dir, self.GIT_MASK, "refs", repo)
+        try:
+            with os.scandir(refs_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        self._watch_refs(entry.path, repo)
+        except OSError:
+            pass
+
+    def _watch_repository(self, repo_path):
+        repo_path = str(repo_path)
+        git_dir = os.path.join(repo_path, ".git")
+        self._add(git_dir, self.GIT_MASK, "git", repo_path)
+        for ref_dir in self.REF_DIRS:
+            path = os.path.join(git_dir, ref_dir)
+            if os.path.isdir(path):
+                self._watch_refs(path, repo_path)
+        self._signatures[repo_path] = self._signature(repo_path)
+
+    def _unwatch_under(self, path):
+        """Drop every watch at or below `path` (after it was moved away or deleted)"""
+        with self._lock:
+            stale = [wd for watched, wd in self._wd_by_path.items() if _is_under(watched, path)]
+            for wd in stale:
+                _, watched, _ = self._watches.pop(wd, (None, None, None))
+                self._wd_by_path.pop(watched, None)
+        for wd in stale:
+            try:
+                self._inotify.rm_watch(wd)
+            except Exception:
+                pass
+        for repo in [repo for repo in self._signatures if _is_under(repo, path)]:
+            del self._signatures[repo]
+
+    @staticmethod
+    def _signature(repo_path):
+        """Stat of the files whose change matters; lets the watcher ignore its own git reads"""
+        return git_signature(repo_path)
+
+    # Walking
+
+    def _walk(self, path, config):
+        """Walk `path` like a scan, watching every directory and repository it finds"""
+        scanner = RepositoryScanner(config)
+        depth = len(Path(path).relative_to(self._root).parts) if _is_under(path, self._root) else 0
+        git_repos, non_git_dirs = scanner.scan_directory(
+            Path(path),
+            max_depth=config.get("max_depth", 10),
+            current_depth=depth,
+            should_stop=lambda: self._limit_reached or self._stopped.is_set(),
+            on_directory=self._watch_directory
+        )
+        for repo in git_repos:
+            self._watch_repository(repo)
+        return git_repos, non_git_dirs
+
+    def _initial_walk(self, config):
+        """Watch the whole scan directory and queue anything the inventory is missing or has stale"""
+        git_repos, _ = self._walk(self._root, config)
+        if self._limit_reached or self._stopped.is_set():
+            return
+        found = {str(repo) for repo in git_repos}
+        known = {path for path in self.known_repositories() if _is_under(path, self._root)}
+        for path in found.symmetric_difference(known):
+            self._pending_paths.add(path)
+        if self._pending_paths:
+            self._deadline = time.monotonic()
+
+    # Events
+
+    def _queue_path(self, path):
+        self._pending_paths.add(path)
+        self._deadline = self._deadline or time.monotonic() + self.debounce
+
+    def _queue_repo(self, repo, force):
+        self._pending_repos[repo] = self._pending_repos.get(repo, False) or force
+        self._deadline = self._deadline or time.monotonic() + self.debounce
+
+    def _handle(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost; the whole tree has to be re-read
+            self._stats["overflows"] += 1
+            self._queue_path(self._root)
+            return
+        with self._lock:
+            watch = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                if watch:
+                    self._watches.pop(wd, None)
+                    self._wd_by_path.pop(watch[1], None)
+                return
+        if watch is None:
+            return
+        kind, path, repo = watch
+
+        if kind == "dir":
+            if not (mask & IN_ISDIR) or not name:
+                return
+            if name == ".git":
+                # The directory became (or stopped being) a repository
+                self._queue_path(path)
+                return
+            target = os.path.join(path, name)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._unwatch_under(target)
+            self._queue_path(target)
+        elif kind == "git":
+            if mask & IN_DELETE_SELF:
+                self._unwatch_under(repo)
+                self._queue_path(repo)
+            elif name in self.GIT_FILES:
+                self._queue_repo(repo, force=False)
+            elif name == "refs" and mask & IN_ISDIR:
+                self._queue_repo(repo, force=True)
+        elif kind == "refs":
+            if not name or name.endswith(".lock"):
+                return
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_refs(os.path.join(path, name), repo)
+            self._queue_repo(repo, force=True)
+
+    def _flush(self, config):
+        """Apply the debounced subtree rescans and repository refreshes"""
+        paths, self._pending_paths = self._pending_paths, set()
+        repos, self._pending_repos = self._pending_repos, {}
+        self._deadline = None
+
+        # A rescan of a parent covers everything below it
+        for path in sorted(paths, key=len):
+            if any(_is_under(path, other) for other in paths if other != path and len(other) < len(path)):
+                continue
+            if os.path.isdir(path):
+                git_repos, non_git_dirs = self._walk(path, config)
+            else:
+                git_repos, non_git_dirs = [], []
+            if self._limit_reached:
+                return
+            try:
+                self.store_subtree(path, git_repos, non_git_dirs)
+                self._stats["subtree_rescans"] += 1
+            except Exception as e:
+                logger.error(f"Error storing watched subtree {path}: {e}")
+
+        refresh = []
+        for repo, force in repos.items():
+            if any(_is_under(repo, path) for path in paths):
+                continue
+            signature = self._signature(repo)
+            if force or signature != self._signatures.get(repo):
+                refresh.append(repo)
+        if refresh:
+            try:
+                self.refresh_repositories(refresh)
+                self._stats["repository_refreshes"] += len(refresh)
+            except Exception as e:
+                logger.error(f"Error refreshing watched repositories: {e}")
+            # Reading git state can rewrite the index; remember the state after our own read
+            for repo in refresh:
+                self._signatures[repo] = self._signature(repo)
+
+    # Lifecycle
+
+    def _fall_back(self, reason):
+        logger.warning(f"Filesystem watching disabled: {reason}")
+        self._close()
+        self.mode = "fallback"
+        self.fallback_reason = reason
+        if self.on_fallback:
+            try:
+                self.on_fallback(reason)
+            except Exception as e:
+                logger.error(f"Error starting watch fallback: {e}")
+
+    def _close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        with self._lock:
+            self._watches.clear()
+            self._wd_by_path.clear()
+        self._signatures.clear()
+
+    def _run(self):
+        config = self.get_config()
+        self._root = os.path.abspath(config.get("scan_directory", ""))
+        self._limit_reached = False
+        try:
+            self._inotify = Inotify()
+        except OSError as e:
+            self._fall_back(str(e))
+            return
+
+        self.mode = "starting"
+        self._initial_walk(config)
+        if self._limit_reached:
+            self._fall_back(f"inotify watch limit reached (max_user_watches={max_user_watches()})")
+            return
+        self.mode = "watching"
+        logger.info(f"Watching {len(self._watches)} directories under {self._root}")
+
+        while not self._stopped.is_set():
+            timeout = 0.5 if self._deadline is None else max(0.0, self._deadline - time.monotonic())
+            try:
+                events = self._inotify.read_events(timeout)
+            except OSError as e:
+                self._fall_back(f"error reading inotify events: {e}")
+                return
+            self._stats["events"] += len(events)
+            for wd, mask, name in events:
+                self._handle(wd, mask, name)
+            if self._deadline is not None and time.monotonic() >= self._deadline:
+                self._flush(self.get_config())
+                if self._limit_reached:
+                    self._fall_back(f"inotify watch limit reached (max_user_watches={max_user_watches()})")
+                    return
+        self._close()
+        self.mode = "stopped"
+
+    def start(self):
+        """Start watching in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="fs-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching and release all watches"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        """Watch mode, watch counts and event statistics"""
+        with self._lock:
+            watches = len(self._watches)
+        return {
+            "mode": self.mode,
+            "fallback_reason": self.fallback_reason,
+            "watches": watches,
+            "max_user_watches": max_user_watches(),
+            **self._stats
+        }
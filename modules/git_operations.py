@@ -1,17 +1,67 @@
 import os
 import logging
+import functools
 from pathlib import Path
-import git
-from git import Repo
 from datetime import datetime
 
+from . import metrics, tracing
+
 logger = logging.getLogger(__name__)
 
+# Seconds a background fetch may run before its git process is killed
+FETCH_TIMEOUT = 120
+
+def _git_subcommand(command):
+    """The git subcommand of an argument list, skipping global options like `-c key=value`"""
+    if isinstance(command, str):
+        command = command.split()
+    args = iter(command[1:])
+    for arg in args:
+        if arg in ("-c", "-C"):
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return "git"
+
+def _git():
+    """GitPython, imported on first use: it is slow to import and startup never needs it"""
+    import git
+    return git
+
+@functools.lru_cache(maxsize=None)
+def _metered_repo_class():
+    """The git.Repo subclass every operation opens repositories with (see open_repo)"""
+    git = _git()
+
+    class MeteredGit(git.cmd.Git):
+        """
+        Git command wrapper that counts subprocesses per subcommand for /metrics
+        and records each one as a span of the current trace
+        """
+        def execute(self, command, *args, **kwargs):
+            if metrics.registry.enabled:
+                metrics.GIT_SUBPROCESSES.inc(command=_git_subcommand(command))
+            if tracing.active():
+                with tracing.span(f"git {_git_subcommand(command)}", cwd=self._working_dir):
+                    return super().execute(command, *args, **kwargs)
+            return super().execute(command, *args, **kwargs)
+
+    class MeteredRepo(git.Repo):
+        GitCommandWrapperType = MeteredGit
+
+    return MeteredRepo
+
+def open_repo(repo_path):
+    """Open a repository whose git commands are metered and traced"""
+    return _metered_repo_class()(repo_path)
+
 class GitOperations:
     """
     Handles Git operations for repositories.
     """
     
+    @metrics.timed(metrics.GIT_OPERATION, operation="info")
+    @tracing.traced("git_ops.info")
     def get_repository_info(self, repo_path):
         """
         Get detailed Git information about a repository
@@ -23,7 +73,7 @@ class GitOperations:
             dict: Repository information including branches, remotes, etc.
         """
         try:
-            repo = Repo(repo_path)
+            repo = open_repo(repo_path)
             
             # Get current branch
             try:
@@ -176,6 +226,8 @@ class GitOperations:
         else:
             return "Clean"
     
+    @metrics.timed(metrics.GIT_OPERATION, operation="status")
+    @tracing.traced("git_ops.status")
     def get_git_status(self, repo_path):
         """
         Get the output of 'git status --porcelain' for a repository.
@@ -187,7 +239,7 @@ class GitOperations:
             str: The output of 'git status --porcelain', or None if an error occurs.
         """
         try:
-            repo = Repo(repo_path)
+            repo = open_repo(repo_path)
             # Ensure it's a valid git repo and not bare
             if repo.bare:
                 logger.warning(f"Cannot get status for bare repository: {repo_path}")
@@ -198,13 +250,15 @@ class GitOperations:
             if not status_output: # If status is clean, porcelain output is empty
                 return "Clean"
             return status_output
-        except git.InvalidGitRepositoryError:
+        except _git().InvalidGitRepositoryError:
             logger.error(f"Not a git repository: {repo_path}")
             return None # Or a specific error message string
         except Exception as e:
             logger.error(f"Error getting git status for {repo_path}: {e}")
             return None # Or a specific error message string
 
+    @metrics.timed(metrics.GIT_OPERATION, operation="discard")
+    @tracing.traced("git_ops.discard")
     def discard_local_changes(self, repo_path):
         """
         Discard all local changes in the repository.
@@ -217,7 +271,7 @@ class GitOperations:
             tuple: (bool, str) indicating success status and a message.
         """
         try:
-            repo = Repo(repo_path)
+            repo = open_repo(repo_path)
             if repo.bare:
                 msg = "Cannot discard changes in a bare repository."
                 logger.warning(msg)
@@ -236,7 +290,7 @@ class GitOperations:
             msg = "Local changes discarded successfully."
             logger.info(msg + f" in {repo_path}")
             return True, msg
-        except git.InvalidGitRepositoryError:
+        except _git().InvalidGitRepositoryError:
             msg = f"Not a git repository: {repo_path}"
             logger.error(msg)
             return False, msg
@@ -245,6 +299,62 @@ class GitOperations:
             logger.error(msg)
             return False, msg
 
+    @metrics.timed(metrics.GIT_OPERATION, operation="fetch")
+    @tracing.traced("git_ops.fetch")
+    def fetch_tracking_refs(self, repo_path, timeout=FETCH_TIMEOUT):
+        """
+        Fetch the current branch's remote and recount ahead/behind against its upstream.
+        Only remote-tracking refs and objects change; the worktree and index are never touched.
+
+        Args:
+            repo_path (str): Path to the repository
+            timeout (float, optional): Seconds before a hanging fetch is killed
+
+        Returns:
+            dict: `success`, `updated` (whether any remote-tracking ref moved), `ahead`,
+                  `behind`, and a `message` on failure
+        """
+        try:
+            repo = open_repo(repo_path)
+            if not repo.remotes:
+                return {"success": False, "message": "Repository has no remotes"}
+
+            try:
+                tracking_branch = repo.active_branch.tracking_branch()
+            except TypeError:
+                # Detached HEAD state
+                tracking_branch = None
+            remote = repo.remote(tracking_branch.remote_name) if tracking_branch else repo.remotes[0]
+
+            # Never prompt for credentials from a background fetch
+            environment = {"GIT_TERMINAL_PROMPT": "0"}
+            if "GIT_SSH_COMMAND" not in os.environ:
+                environment["GIT_SSH_COMMAND"] = "ssh -o BatchMode=yes"
+            with repo.git.custom_environment(**environment):
+                fetch_info = remote.fetch(kill_after_timeout=timeout)
+            updated = any(not info.flags & info.HEAD_UPTODATE for info in fetch_info)
+
+            ahead = 0
+            behind = 0
+            if tracking_branch is not None and tracking_branch.is_valid():
+                counts = repo.git.rev_list('--left-right', '--count', f'HEAD...{tracking_branch.path}')
+                ahead, behind = (int(count) for count in counts.split())
+
+            return {
+                "success": True,
+                "updated": updated,
+                "ahead": ahead,
+                "behind": behind
+            }
+        except Exception as e:
+            logger.warning(f"Error fetching repository {repo_path}: {e}")
+            return {
+                "success": False,
+                "message": f"Error: {str(e)}"
+            }
+
+    @metrics.timed(metrics.GIT_OPERATION, operation="pull")
+    @tracing.traced("git_ops.pull")
     def pull_repository(self, repo_path, progress_callback=None):
         """
         Pull the latest changes for a repository
@@ -260,7 +370,7 @@ class GitOperations:
             if progress_callback:
                 progress_callback({"message": f"Opening repository at {repo_path}"})
                 
-            repo = Repo(repo_path)
+            repo = open_repo(repo_path)
             
             # Check if repo has remotes
             if not repo.remotes:
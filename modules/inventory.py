@@ -0,0 +1,401 @@
+import os
+import threading
+import logging
+from .scan_diff import compute_scan_diff
+from . import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+# Detail fields of GitOperations.get_repository_info that are not stored: changed files
+# churn on every edit, and the detail route reads both fresh from git
+DETAIL_FIELDS = ("recent_commits", "changed_files")
+
+def stored_fields(info):
+    """
+    The part of a repository record (or of fields to merge into one) that the
+    inventory keeps. Recent commits are reduced to their subject lines, which the
+    search index matches against.
+    """
+    if not any(field in info for field in DETAIL_FIELDS):
+        return info
+    stored = {k: v for k, v in info.items() if k not in DETAIL_FIELDS}
+    if "recent_commits" in info:
+        stored["commit_subjects"] = [
+            (commit.get("message") or "").split("\n", 1)[0] for commit in info["recent_commits"] or []
+        ]
+    return stored
+
+def _is_under(path, prefixes):
+    """Check whether a path equals or lies below any of the given absolute prefixes"""
+    path = os.path.abspath(path)
+    for prefix in prefixes:
+        if path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+class InventoryStore:
+    """
+    Holds the repository inventory and tracks a monotonically increasing
+    generation number so clients can sync incrementally.
+
+    Every write (scan, enrichment, pull) bumps the generation. Each repository
+    record carries the generation at which it last changed, and removed
+    repositories leave a tombstone so clients can drop them on their side.
+    """
+    # Maximum number of tombstones kept before the oldest are discarded
+    MAX_TOMBSTONES = 10000
+    # Fields background services maintain that scans do not produce; a rescanned
+    # repository keeps them from its previous record
+    CARRIED_FIELDS = ("size", "size_details")
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self._lock = threading.RLock()
+        self._results = None
+        self._signature = None
+        self._follow_changes = False
+        self._loaded = threading.Event()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Register a callback invoked after every inventory write.
+
+        Args:
+            callback (function): Called as callback(updated, removed) with the list of
+                                 added or changed repository records and the list of
+                                 removed repository records (both may be empty, e.g.
+                                 when only the non-git directories changed).
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, updated, removed):
+        """
+        Call every registered listener, logging (not raising) their errors. Listeners
+        are called even when no record changed so they still see the new generation.
+        """
+        for callback in self._listeners:
+            try:
+                with tracing.span("persist.listener", listener=getattr(callback, "__qualname__", repr(callback))):
+                    callback(updated, removed)
+            except Exception as e:
+                logger.error(f"Inventory listener {callback} failed: {e}")
+
+    def follow_changes(self):
+        """
+        Reload the inventory whenever another process replaces the stored results.
+        For reader workers, which never write the inventory themselves (see modules.writer).
+        """
+        self._follow_changes = True
+
+    def _load(self):
+        """Load the stored scan results on first access (and after another process saved them)"""
+        if self._results is not None:
+            if not self._follow_changes:
+                return self._results
+            if self.config_manager.file_signature(self.config_manager.scan_results_file) == self._signature:
+                return self._results
+
+        self._signature = self.config_manager.file_signature(self.config_manager.scan_results_file)
+        results = self.config_manager.get_scan_results()
+        results.setdefault("git_repositories", [])
+        results.setdefault("non_git_directories", [])
+        results.setdefault("removed_repositories", [])
+        results.setdefault("tombstone_floor", 0)
+
+        # Results written before generations existed start at generation 1
+        generation = results.get("generation", 0)
+        if generation == 0 and results["git_repositories"]:
+            generation = 1
+        results["generation"] = generation
+        results["git_repositories"] = [stored_fields(repo) for repo in results["git_repositories"]]
+        for repo in results["git_repositories"]:
+            repo.setdefault("generation", generation)
+
+        self._results = results
+        self._loaded.set()
+        return self._results
+
+    def ready(self):
+        """Whether the stored inventory has been loaded, so reads no longer wait on parsing it"""
+        return self._loaded.is_set()
+
+    def _persist(self):
+        """Write the current inventory back to storage"""
+        with tracing.span("persist.save_scan_results"):
+            saved = self.config_manager.save_scan_results(self._results)
+        if not saved:
+            logger.error(f"Failed to persist inventory at generation {self._results['generation']}")
+
+    def _add_tombstone(self, repo, generation):
+        """Record a removed repository, trimming the oldest tombstones"""
+        tombstones = self._results["removed_repositories"]
+        tombstones.append({
+            "id": repo.get("id"),
+            "path": repo.get("path"),
+            "generation": generation
+        })
+        if len(tombstones) > self.MAX_TOMBSTONES:
+            dropped = tombstones[:len(tombstones) - self.MAX_TOMBSTONES]
+            del tombstones[:len(dropped)]
+            # Clients older than the newest dropped tombstone must do a full sync
+            self._results["tombstone_floor"] = dropped[-1]["generation"]
+
+    @staticmethod
+    def _same_record(old_repo, new_repo):
+        """Compare two repository records ignoring the generation stamp"""
+        old_fields = {k: v for k, v in old_repo.items() if k != "generation"}
+        new_fields = {k: v for k, v in new_repo.items() if k != "generation"}
+        return old_fields == new_fields
+
+    def get_results(self):
+        """Get the full scan results including generation metadata"""
+        with self._lock:
+            return self._load()
+
+    def get_generation(self):
+        """Get the current inventory generation"""
+        with self._lock:
+            return self._load()["generation"]
+
+    def get_repositories(self):
+        """Get all repositories in the inventory"""
+        with self._lock:
+            return list(self._load()["git_repositories"])
+
+    def get_snapshot(self):
+        """Get the current generation and all repositories, read together"""
+        with self._lock:
+            results = self._load()
+            return results["generation"], list(results["git_repositories"])
+
+    def get_repository(self, repo_id):
+        """Get a single repository by its ID, or None if not found"""
+        with self._lock:
+            repositories = self._load()["git_repositories"]
+            return next((repo for repo in repositories if repo.get("id") == repo_id), None)
+
+    def _apply_scan(self, new_repositories, replaced_repositories, metadata):
+        """
+        Swap a set of stored repositories for freshly scanned ones and bump the generation.
+        A scan that finds every record and non-git directory as stored changes nothing:
+        the generation stays, nothing is written and `unchanged` is set in the summary.
+
+        Args:
+            new_repositories (list): Repository records produced by the scan.
+            replaced_repositories (list): Stored records the scan covered (and therefore replaces).
+            metadata (dict): Top-level result fields to store alongside the repositories.
+
+        Returns:
+            dict: Summary with the new generation, counts of added, removed, moved and
+                  changed repositories, the scan diff (see compute_scan_diff) and whether
+                  the scan left the inventory unchanged.
+        """
+        results = self._results
+        generation = results["generation"] + 1
+        new_repositories = [stored_fields(repo) for repo in new_repositories]
+        diff = compute_scan_diff(replaced_repositories, new_repositories)
+        previous = {repo.get("id"): repo for repo in replaced_repositories}
+        replaced_ids = set(previous)
+        unchanged = len(new_repositories) == len(previous)
+
+        for repo in new_repositories:
+            old_repo = previous.pop(repo.get("id"), None)
+            if old_repo is not None:
+                for field in self.CARRIED_FIELDS:
+                    if field in old_repo and field not in repo:
+                        repo[field] = old_repo[field]
+            if old_repo is not None and self._same_record(old_repo, repo):
+                repo["generation"] = old_repo.get("generation", generation)
+            else:
+                repo["generation"] = generation
+                unchanged = False
+
+        non_git_dirs = metadata.get("non_git_directories", results["non_git_directories"])
+        if unchanged and not previous and non_git_dirs == results["non_git_directories"]:
+            return {
+                "generation": results["generation"],
+                "added": 0,
+                "removed": 0,
+                "moved": 0,
+                "changed": 0,
+                "diff": diff,
+                "unchanged": True
+            }
+
+        for old_repo in previous.values():
+            self._add_tombstone(old_repo, generation)
+
+        # A repository that comes back no longer needs its tombstone
+        new_ids = {repo.get("id") for repo in new_repositories}
+        results["removed_repositories"] = [
+            t for t in results["removed_repositories"] if t["id"] not in new_ids
+        ]
+
+        kept = [
+            repo for repo in results["git_repositories"]
+            if repo.get("id") not in replaced_ids and repo.get("id") not in new_ids
+        ]
+        results.update(metadata)
+        results["git_repositories"] = kept + new_repositories
+        results["generation"] = generation
+        self._persist()
+        self._notify(
+            [repo for repo in new_repositories if repo["generation"] == generation],
+            list(previous.values())
+        )
+
+        return {
+            "generation": generation,
+            "added": len(diff["added"]),
+            "removed": len(diff["removed"]),
+            "moved": len(diff["moved"]),
+            "changed": len(diff["changed"]),
+            "diff": diff,
+            "unchanged": False
+        }
+
+    def get_repositories_by_ids(self, repo_ids):
+        """Get repositories for a list of IDs, in the same order (unknown IDs are skipped)"""
+        with self._lock:
+            by_id = {repo.get("id"): repo for repo in self._load()["git_repositories"]}
+            return [by_id[repo_id] for repo_id in repo_ids if repo_id in by_id]
+
+    def replace_scan(self, result_data):
+        """
+        Replace the inventory with new scan results and bump the generation.
+
+        Args:
+            result_data (dict): Scan results as produced by a full scan.
+
+        Returns:
+            dict: Summary with the new generation, change counts and the scan diff.
+        """
+        with self._lock:
+            results = self._load()
+            metadata = {k: v for k, v in result_data.items() if k != "git_repositories"}
+            return self._apply_scan(
+                result_data.get("git_repositories", []),
+                results["git_repositories"],
+                metadata
+            )
+
+    def merge_scan(self, scan_paths, result_data):
+        """
+        Merge the results of a scoped scan into the inventory. Only repositories
+        (and non-git directories) under one of the scanned paths are replaced;
+        everything else is kept as is.
+
+        Args:
+            scan_paths (list): Paths that were scanned.
+            result_data (dict): Scan results for those paths.
+
+        Returns:
+            dict: Summary with the new generation, change counts and the scan diff.
+        """
+        prefixes = [os.path.abspath(p) for p in scan_paths]
+
+        with self._lock:
+            results = self._load()
+            replaced = [
+                repo for repo in results["git_repositories"]
+                if _is_under(repo.get("path", ""), prefixes)
+            ]
+
+            # Directories are keyed by path, so a plain filter + append is enough
+            new_dirs = result_data.get("non_git_directories", [])
+            new_dir_paths = {d.get("path") for d in new_dirs}
+            non_git_dirs = [
+                d for d in results["non_git_directories"]
+                if not _is_under(d.get("path", ""), prefixes) and d.get("path") not in new_dir_paths
+            ] + new_dirs
+
+            metadata = {
+                "non_git_directories": non_git_dirs,
+                "last_scoped_scan": {
+                    "scan_time": result_data.get("scan_time"),
+                    "scan_paths": prefixes
+                }
+            }
+            return self._apply_scan(result_data.get("git_repositories", []), replaced, metadata)
+
+    def update_repository(self, repo_id, fields):
+        """
+        Merge new fields into a repository record (e.g. after enrichment or a pull).
+        The generation is only bumped when something actually changed.
+
+        Args:
+            repo_id (str): ID of the repository to update.
+            fields (dict): Fields to merge into the record.
+
+        Returns:
+            dict or None: The updated record, or None if the repository is unknown.
+        """
+        return self.update_repositories({repo_id: fields}).get(repo_id)
+
+    def update_repositories(self, updates):
+        """
+        Merge new fields into several repository records with a single write.
+        All records that actually changed share one new generation.
+
+        Args:
+            updates (dict): Fields to merge, keyed by repository ID.
+
+        Returns:
+            dict: The resulting record of every known repository ID in `updates`.
+        """
+        with self._lock:
+            results = self._load()
+            repositories = results["git_repositories"]
+            records, changed = {}, []
+            for index, repo in enumerate(repositories):
+                fields = updates.get(repo.get("id"))
+                if fields is None:
+                    continue
+                updated = {**repo, **stored_fields(fields)}
+                if self._same_record(repo, updated):
+                    records[repo["id"]] = repo
+                else:
+                    changed.append((index, updated))
+
+            if changed:
+                results["generation"] += 1
+                for index, updated in changed:
+                    updated["generation"] = results["generation"]
+                    repositories[index] = updated
+                    records[updated["id"]] = updated
+                self._persist()
+                self._notify([updated for _, updated in changed], [])
+            return records
+
+    def changes_since(self, since):
+        """
+        Get the repositories added, changed or removed after a given generation.
+
+        Args:
+            since (int): Generation the client last synced to.
+
+        Returns:
+            dict: Current generation, changed records and tombstones. When the client
+                  is too far behind (or ahead), `full_sync` is set and every record is returned.
+        """
+        with self._lock:
+            results = self._load()
+            generation = results["generation"]
+            full_sync = since <= 0 or since < results["tombstone_floor"] or since > generation
+            metrics.CACHE_REQUESTS.inc(cache="inventory_delta", result="miss" if full_sync else "hit")
+
+            if full_sync:
+                changed = list(results["git_repositories"])
+                removed = []
+            else:
+                changed = [repo for repo in results["git_repositories"] if repo.get("generation", 0) > since]
+                removed = [t for t in results["removed_repositories"] if t["generation"] > since]
+
+            return {
+                "generation": generation,
+                "since": since,
+                "full_sync": full_sync,
+                "changed": changed,
+                "removed": removed
+            }
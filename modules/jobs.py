@@ -0,0 +1,285 @@
+import uuid
+import queue
+import itertools
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Allowed state transitions
+_TRANSITIONS = {
+    QUEUED: (RUNNING, CANCELLED),
+    RUNNING: (DONE, FAILED, CANCELLED),
+}
+
+# Lower numbers run first
+PRIORITY_HIGH = 0      # Interactive work a user is waiting on (pulls, status refreshes)
+PRIORITY_NORMAL = 5    # Scans
+PRIORITY_LOW = 10      # Background maintenance
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job has been cancelled"""
+
+class Job:
+    """
+    A unit of background work (scan, pull, status refresh) with its own id,
+    progress channel and state machine: queued -> running -> done/failed/cancelled.
+    """
+    def __init__(self, manager, kind, func, params=None, priority=PRIORITY_NORMAL, dedupe_key=None, topics=()):
+        self.manager = manager
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.func = func
+        self.params = params or {}
+        self.priority = priority
+        self.dedupe_key = dedupe_key
+        self.state = QUEUED
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {}
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.profile = None
+        self._cancel_event = threading.Event()
+        # Events go to the job's own topic plus any extra (legacy) topics
+        self.topic = f"job:{self.id}"
+        self.topics = (self.topic,) + tuple(topics)
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def raise_if_cancelled(self):
+        """Stop the job function at a safe point if cancellation was requested"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def publish(self, data, coalesce_key=None):
+        """Publish a progress event for this job on all of its topics"""
+        data = {**data, "job_id": self.id}
+        for topic in self.topics:
+            self.manager.event_hub.publish(topic, data, coalesce_key=coalesce_key)
+
+    def _transition(self, state):
+        if state not in _TRANSITIONS.get(self.state, ()):
+            raise ValueError(f"Invalid job transition {self.state} -> {state}")
+        self.state = state
+        if state == RUNNING:
+            self.started_at = datetime.now().isoformat()
+        else:
+            self.finished_at = datetime.now().isoformat()
+
+    def to_dict(self, include_result=False):
+        info = {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "priority": self.priority,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": dict(self.progress),
+            "message": self.message,
+            "error": self.error,
+            "progress_url": f"/api/jobs/{self.id}/progress"
+        }
+        if include_result:
+            info["result"] = self.result
+        if self.profile is not None:
+            info["profile"] = self.profile
+        return info
+
+class JobManager:
+    """
+    Registry and bounded executor for background jobs.
+
+    Jobs wait in a priority queue and run on at most `max_workers` threads
+    (an int, or a function returning one that is read when the first job is submitted).
+    Jobs submitted with a dedupe key are coalesced with an active job that has
+    the same key (e.g. two pulls of the same repository). Finished jobs are
+    kept for inspection until `history_size` newer jobs have finished.
+    """
+    def __init__(self, event_hub, max_workers=4, history_size=500):
+        self.event_hub = event_hub
+        self.max_workers = max_workers
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._active_keys = {}
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._workers = []
+
+    def _ensure_workers(self):
+        """Start the worker threads on first use"""
+        if self._workers:
+            return
+        if callable(self.max_workers):
+            self.max_workers = max(int(self.max_workers()), 1)
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, kind, func, params=None, priority=PRIORITY_NORMAL, dedupe_key=None, topics=()):
+        """
+        Queue a job.
+
+        Args:
+            kind (str): Job type, e.g. "scan", "pull" or "refresh".
+            func (function): Called as func(job) on a worker thread; its return value is the job result.
+            params (dict, optional): Parameters shown when the job is listed.
+            priority (int, optional): Lower runs first.
+            dedupe_key (str, optional): If an active job has the same key, it is returned instead.
+            topics (iterable, optional): Extra event hub topics the job's events are published to.
+
+        Returns:
+            tuple: (job, created) where created is False if an active duplicate was returned.
+        """
+        with self._lock:
+            if dedupe_key is not None:
+                existing = self._active_keys.get(dedupe_key)
+                if existing is not None:
+                    return existing, False
+
+            job = Job(self, kind, func, params, priority, dedupe_key, topics)
+            self._jobs[job.id] = job
+            if dedupe_key is not None:
+                self._active_keys[dedupe_key] = job
+            self._ensure_workers()
+            self._queue.put((priority, next(self._sequence), job))
+
+        self._publish_state(job)
+        return job, True
+
+    def _publish_state(self, job):
+        """Announce a state change on the job's topic and on the shared "jobs" topic"""
+        event = {"status": "job", "job": job.to_dict()}
+        self.event_hub.publish(job.topic, event)
+        self.event_hub.publish("jobs", event)
+        if job.state not in ACTIVE_STATES:
+            # Nothing more is published on a finished job's own topic
+            self.event_hub.release(job.topic)
+
+    def _announce_cancelled(self, job):
+        """Tell progress listeners (on every topic of the job) that it was cancelled"""
+        job.publish({
+            "status": "cancelled",
+            "progress": dict(job.progress),
+            "message": f"{job.kind.capitalize()} cancelled"
+        })
+
+    def _finish_locked(self, job, state, result=None, error=None):
+        job.result = result
+        job.error = error
+        job._transition(state)
+        if job.dedupe_key is not None and self._active_keys.get(job.dedupe_key) is job:
+            del self._active_keys[job.dedupe_key]
+        self._trim_history()
+
+    def _finish(self, job, state, result=None, error=None):
+        with self._lock:
+            self._finish_locked(job, state, result, error)
+        self._publish_state(job)
+
+    def _trim_history(self):
+        """Drop the oldest finished jobs beyond the history size"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.state not in ACTIVE_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def _worker_loop(self):
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Unexpected error running job {job.id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        with self._lock:
+            if job.state != QUEUED:
+                # Cancelled while waiting in the queue
+                return
+            job._transition(RUNNING)
+        self._publish_state(job)
+
+        try:
+            # Traced jobs can be inspected at /api/debug/trace/<job_id>
+            with tracing.tracer.trace(job.id, f"{job.kind} job"):
+                result = job.func(job)
+        except JobCancelled:
+            self._announce_cancelled(job)
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            self._finish(job, FAILED, error=str(e))
+        else:
+            self._finish(job, DONE, result=result)
+
+    def get(self, job_id):
+        """Get a job by id, or None if unknown"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind=None, state=None):
+        """List known jobs (newest first), optionally filtered by kind and state"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [
+            job for job in reversed(jobs)
+            if (kind is None or job.kind == kind) and (state is None or job.state == state)
+        ]
+
+    def get_active(self, dedupe_key):
+        """Get the queued or running job submitted with a dedupe key, or None"""
+        with self._lock:
+            return self._active_keys.get(dedupe_key)
+
+    def active(self, kind=None):
+        """List queued or running jobs, optionally of one kind"""
+        return [job for job in self.list(kind=kind) if job.state in ACTIVE_STATES]
+
+    def cancel(self, job_id):
+        """
+        Request cancellation. Queued jobs are cancelled immediately; running jobs
+        stop at their next cancellation check.
+
+        Returns:
+            Job or None: The job, or None if unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job._cancel_event.set()
+            if job.state != QUEUED:
+                return job
+            # Workers skip jobs that are no longer queued
+            self._finish_locked(job, CANCELLED)
+        self._announce_cancelled(job)
+        self._publish_state(job)
+        return job
+
+    def queue_depth(self):
+        """Number of jobs waiting for a worker"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.state == QUEUED)
@@ -0,0 +1,232 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Every instrumented call site checks `registry.enabled` first, so with metrics
+turned off the cost is one attribute lookup per call.
+"""
+import time
+import bisect
+import functools
+import threading
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MICRO_BUCKETS = (0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+SCAN_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def total(self):
+        """Sum over every label combination"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def collect(self):
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down. Either set explicitly, or computed at scrape
+    time by `callback`, which returns a list of (labels dict, value) pairs.
+    """
+    type_name = "gauge"
+
+    def __init__(self, *args, callback=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.callback = callback
+        self._values = {}
+
+    def set(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def collect(self):
+        if self.callback is not None:
+            values = {self._key(labels): value for labels, value in self.callback()}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets"""
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets=LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the wall time of its block"""
+        return _Timer(self, labels)
+
+    def collect(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = None
+
+    def __enter__(self):
+        if self.histogram.registry.enabled:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.started is not None:
+            self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+class MetricsRegistry:
+    """Holds all metrics and renders them for a scrape"""
+    def __init__(self):
+        self.enabled = False
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self._register(Gauge(self, name, documentation, labelnames, callback=callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets=buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+def timed(histogram, **labels):
+    """Decorator observing each call's wall time in `histogram`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not histogram.registry.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+registry = MetricsRegistry()
+
+SCAN_DURATION = registry.histogram(
+    "sentinel_scan_duration_seconds", "Wall time of completed scans", ("mode",), buckets=SCAN_BUCKETS
+)
+SCAN_DIRECTORIES = registry.counter(
+    "sentinel_scan_directories_total", "Directories entered by scans in this process"
+)
+SCAN_RATE = registry.gauge(
+    "sentinel_scan_directories_per_second", "Directories per second of the last completed thread-mode scan"
+)
+GITIGNORE_MATCH = registry.histogram(
+    "sentinel_gitignore_match_seconds", "Time to check one directory against exclusions and .gitignore rules",
+    buckets=MICRO_BUCKETS
+)
+GITIGNORE_PARSE = registry.histogram(
+    "sentinel_gitignore_parse_seconds", "Time to parse one .gitignore file", buckets=MICRO_BUCKETS
+)
+GIT_OPERATION = registry.histogram(
+    "sentinel_git_operation_seconds", "Latency of GitOperations methods", ("operation",)
+)
+GIT_SUBPROCESSES = registry.counter(
+    "sentinel_git_subprocesses_total", "git subprocesses started, by git subcommand", ("command",)
+)
+HTTP_REQUEST = registry.histogram(
+    "sentinel_http_request_seconds", "Latency of HTTP requests (progress streams excluded)", ("method", "endpoint")
+)
+CACHE_REQUESTS = registry.counter(
+    "sentinel_cache_requests_total", "Cache lookups, by cache and result (hit or miss)", ("cache", "result")
+)
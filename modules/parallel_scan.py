@@ -0,0 +1,176 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+import concurrent.futures
+from pathlib import Path
+
+from .scanner import RepositoryScanner
+
+logger = logging.getLogger(__name__)
+
+# Repositories enriched per chunk
+ENRICH_CHUNK_SIZE = 25
+
+def plan_scan(scan_path, config, max_depth):
+    """
+    Split a scan path into shards: its immediate subdirectories, each walked independently.
+
+    The scan path itself is handled here exactly as RepositoryScanner handles the
+    root of a walk, so merged shard results match a single-threaded scan.
+
+    Returns:
+        tuple: (repository paths found at the root, root non-git directory infos, shard paths)
+    """
+    scanner = RepositoryScanner(config)
+    root = Path(scan_path)
+    scan_directory = Path(config.get("scan_directory", ""))
+
+    if (root / ".git").is_dir():
+        return [str(root)], [], []
+
+    non_git_dirs = []
+    if root.parent == scan_directory and root.name not in config.get("high_level_dirs", []):
+        non_git_dirs = scanner.get_directories_info([root])
+    if max_depth < 1:
+        return [], non_git_dirs, []
+
+    root_matcher = scanner.get_gitignore_matcher(root)
+    try:
+        shards = [
+            str(item) for item in root.iterdir()
+            if item.is_dir() and not scanner.is_ignored(item, None, root_matcher)
+        ]
+    except OSError as e:
+        logger.warning(f"Cannot list {root}: {e}")
+        shards = []
+    return [], non_git_dirs, shards
+
+def scan_shard(path, config, max_depth, ignore_root=None):
+    """
+    Walk one shard (a subdirectory of a scan path) for git repositories.
+
+    Returns:
+        list: Paths of the repositories found.
+    """
+    scanner = RepositoryScanner(config)
+    parent_matcher = scanner.get_gitignore_matcher(Path(ignore_root)) if ignore_root else None
+    # Like a local scan, only the scan path's own non-git directory entry is kept
+    git_repos, _ = scanner.scan_directory(
+        Path(path), max_depth=max_depth, current_depth=1, parent_gitignore_matcher=parent_matcher
+    )
+    return [str(repo) for repo in git_repos]
+
+def enrich_chunk(paths, config, enrich=True):
+    """Read the full repository record (git state, remotes, commits) of each path, or only its basic fields"""
+    return RepositoryScanner(config).get_repositories_info(paths, enrich)
+
+def chunked(items, size=ENRICH_CHUNK_SIZE):
+    return [items[index:index + size] for index in range(0, len(items), size)]
+
+def dedupe_scan_paths(scan_paths):
+    """Normalize scan paths and drop any that are nested inside another requested path"""
+    normalized = sorted({os.path.abspath(p) for p in scan_paths})
+    result = []
+    for path in normalized:
+        if not any(path.startswith(parent.rstrip(os.sep) + os.sep) for parent in result):
+            result.append(path)
+    return result
+
+def pool_context():
+    """
+    Multiprocessing context for scan worker pools. Forking a process that runs threads
+    can copy held locks into the child; forkserver (or spawn where unavailable) starts
+    workers from a clean process.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+class ProcessPoolScanner:
+    """
+    Scans with a pool of processes instead of threads, so gitignore matching,
+    path handling, id hashing and GitPython parsing run on several cores.
+
+    Shards are walked in the pool, and each shard's repositories are enriched in
+    chunks of ENRICH_CHUNK_SIZE as soon as its walk returns. Results are merged
+    in the calling process. The pool is started on first use and reused.
+    """
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self, processes):
+        with self._lock:
+            if self._executor is not None and processes != self.processes:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._executor is None:
+                self.processes = processes
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=processes, mp_context=pool_context()
+                )
+            return self._executor
+
+    def scan(self, scan_path, config, max_depth, processes=None, progress_callback=None, should_stop=None):
+        """
+        Scan one path in the process pool.
+
+        Progress is reported like RepositoryScanner.scan_directory does: one update
+        per finished shard and one `git_repo` update per repository found.
+
+        Returns:
+            tuple: (repository records, non-git directory info dicts); partial if stopped.
+        """
+        executor = self._get_executor(processes or self.processes)
+        root_repos, non_git_dirs, shards = plan_scan(scan_path, config, max_depth)
+
+        def report(update):
+            if progress_callback:
+                progress_callback(update)
+
+        walks = {executor.submit(scan_shard, shard, config, max_depth, str(scan_path)): shard for shard in shards}
+        enrichments = []
+
+        def enrich(paths):
+            for path in paths:
+                report({"message": f"Found Git repository: {path}", "path": path, "type": "git_repo"})
+            for chunk in chunked(paths):
+                enrichments.append(executor.submit(enrich_chunk, chunk, config))
+
+        enrich(root_repos)
+        pending = set(walks)
+        while pending:
+            if should_stop and should_stop():
+                for future in list(walks) + enrichments:
+                    future.cancel()
+                return [], non_git_dirs
+            done, pending = concurrent.futures.wait(pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                shard = walks[future]
+                try:
+                    enrich(future.result())
+                except Exception as e:
+                    logger.error(f"Scan shard {shard} failed: {e}")
+                    report({"message": f"Error scanning {shard}: {e}", "path": shard, "type": "error"})
+                    continue
+                report({"message": f"Scanned: {shard}", "path": shard})
+
+        repositories = []
+        for future in enrichments:
+            while not future.done():
+                if should_stop and should_stop():
+                    for other in enrichments:
+                        other.cancel()
+                    return repositories, non_git_dirs
+                time.sleep(0.05)
+            repositories.extend(future.result())
+        return repositories, non_git_dirs
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,257 @@
+"""
+On-demand CPU profiling of single requests and jobs.
+
+Two modes are supported:
+
+- `cprofile`: deterministic profiling with cProfile. Exact call counts, but
+  only the calling thread is profiled and every call pays the profiler's cost.
+- `sample`: a background thread records stacks at `rate` samples per second.
+  Overhead is bounded by the rate, so it is the mode to use against live load.
+
+Profiles are written to data/profiles/ (a `.prof` file for cProfile, readable
+with pstats or snakeviz, and collapsed stacks for sampling, readable with
+speedscope or flamegraph.pl). Each returns a summary of the hottest functions.
+"""
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from collections import Counter
+
+from .config import data_dir
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cprofile", "sample")
+
+# Sampling rates are clamped to this range (samples per second)
+MIN_RATE = 1
+MAX_RATE = 1000
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while the maximum number are already running"""
+
+def _function_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """
+    Records the stacks of the given threads `rate` times per second from a
+    background thread. With `follow_new_threads`, threads started while the
+    profiler runs (e.g. a scan's walker pools) are sampled too.
+    """
+    def __init__(self, rate=100, thread_ids=(), follow_new_threads=False):
+        self.interval = 1.0 / max(MIN_RATE, min(MAX_RATE, rate))
+        self.thread_ids = set(thread_ids)
+        self.follow_new_threads = follow_new_threads
+        self.stacks = Counter()
+        self.samples = 0
+        self._existing = set()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or thread_id not in self.thread_ids and (
+                    not self.follow_new_threads or thread_id in self._existing):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            # Root first, like collapsed stack files
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._existing = set(sys._current_frames())
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def save(self, path):
+        """Write collapsed stacks (`root;caller;leaf count` per line)"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(";".join(_function_label(code) for code in stack) + f" {count}\n")
+
+    def top(self, limit):
+        """Functions with the most samples at the top of the stack (self) and anywhere on it (total)"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for code in set(stack):
+                total[code] += count
+        samples = max(self.samples, 1)
+        return [
+            {
+                "function": _function_label(code),
+                "self_samples": own_count,
+                "self_percent": round(100.0 * own_count / samples, 1),
+                "total_percent": round(100.0 * total[code] / samples, 1)
+            }
+            for code, own_count in own.most_common(limit)
+        ]
+
+class DeterministicProfiler:
+    """cProfile around the calling thread"""
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(str(path))
+
+    def top(self, limit):
+        """Functions with the most time spent in their own code"""
+        stats = pstats.Stats(self.profile).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            {
+                "function": f"{name} ({os.path.basename(filename)}:{lineno})",
+                "calls": calls,
+                "self_seconds": round(own_time, 6),
+                "total_seconds": round(cumulative_time, 6)
+            }
+            for (filename, lineno, name), (_, calls, own_time, cumulative_time, _) in ranked
+        ]
+
+class ProfileSession:
+    """
+    Context manager profiling its block on the thread that created it. After
+    it exits, `summary` holds the saved file name, duration and the top functions.
+    """
+    def __init__(self, manager, mode, label, rate, follow_new_threads, top):
+        self.manager = manager
+        self.mode = mode
+        self.label = label
+        self.top = top
+        if mode == "sample":
+            self.profiler = SamplingProfiler(rate, [threading.get_ident()], follow_new_threads)
+        else:
+            self.profiler = DeterministicProfiler()
+        self.summary = None
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self.profiler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.profiler.stop()
+            duration = time.perf_counter() - self._started
+            path = self.manager._output_path(self.label, "prof" if self.mode == "cprofile" else "folded")
+            try:
+                self.profiler.save(path)
+            except OSError as e:
+                logger.error(f"Could not save profile to {path}: {e}")
+                path = None
+            self.summary = {
+                "mode": self.mode,
+                "label": self.label,
+                "file": path.name if path else None,
+                "duration": round(duration, 3),
+                "top": self.profiler.top(self.top)
+            }
+            if self.mode == "sample":
+                self.summary["samples"] = self.profiler.samples
+                self.summary["rate"] = round(1.0 / self.profiler.interval)
+        finally:
+            self.manager._release()
+        return False
+
+class ProfileManager:
+    """
+    Hands out profile sessions, at most `max_concurrent` at a time, and keeps
+    the newest `max_profiles` files in `directory`.
+    """
+    def __init__(self, directory=None, max_concurrent=1, max_profiles=50):
+        self.directory = Path(directory) if directory else data_dir() / "profiles"
+        self.max_concurrent = max_concurrent
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def session(self, mode, label, rate=100, follow_new_threads=False, top=20):
+        """
+        Reserve a profile session for the calling thread. It must be entered
+        (used as a context manager) to release the reservation.
+
+        Args:
+            mode (str): "cprofile" or "sample".
+            label (str): Names the output file, e.g. "scan-<job_id>".
+            rate (int): Samples per second in sample mode.
+            follow_new_threads (bool): Also sample threads started during the session.
+            top (int): Number of functions in the summary.
+
+        Raises:
+            ProfilerBusy: If max_concurrent sessions are already reserved.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (expected one of {', '.join(MODES)})")
+        self._acquire()
+        return ProfileSession(self, mode, label, rate, follow_new_threads, top)
+
+    def _acquire(self):
+        with self._lock:
+            if self._running >= self.max_concurrent:
+                raise ProfilerBusy(f"{self._running} profile(s) already running")
+            self._running += 1
+
+    def _release(self):
+        with self._lock:
+            self._running -= 1
+
+    def _output_path(self, label, extension):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)
+        path = self.directory / f"{stamp}-{safe_label}.{extension}"
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Remove the oldest profiles beyond max_profiles (leaving room for one more)"""
+        files = sorted(self.list(), key=lambda info: info["modified"])
+        for info in files[:max(0, len(files) - self.max_profiles + 1)]:
+            try:
+                os.remove(self.directory / info["name"])
+            except OSError:
+                pass
+
+    def list(self):
+        """Saved profiles, newest first"""
+        if not self.directory.is_dir():
+            return []
+        profiles = []
+        for path in self.directory.iterdir():
+            if path.suffix in (".prof", ".folded"):
+                stat = path.stat()
+                profiles.append({"name": path.name, "size": stat.st_size, "modified": stat.st_mtime})
+        return sorted(profiles, key=lambda info: info["modified"], reverse=True)
+
+    def path_for(self, name):
+        """Path of a saved profile by file name, or None if there is no such profile"""
+        path = self.directory / os.path.basename(name)
+        return path if path.is_file() and path.suffix in (".prof", ".folded") else None
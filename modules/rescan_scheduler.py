@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import random
+import threading
+import logging
+from collections import deque
+from pathlib import Path
+
+from .config import data_dir
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+
+class ActivityTracker:
+    """
+    Counts in-flight interactive requests so background work can yield to them.
+    The tracker stays busy for `quiet_period` seconds after the last request ends.
+    """
+    def __init__(self, quiet_period=2.0):
+        self.quiet_period = quiet_period
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._last_end = 0.0
+
+    def begin(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def end(self):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._last_end = time.monotonic()
+
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+    def busy(self):
+        with self._lock:
+            return self._in_flight > 0 or time.monotonic() - self._last_end < self.quiet_period
+
+class _Subtree:
+    """Rescan state of one top-level directory under the scan directory"""
+    __slots__ = ("path", "interval", "due", "last_scan", "last_cost", "change_rate", "scans", "changes")
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.due = 0.0
+        self.last_scan = None
+        self.last_cost = None
+        self.change_rate = 0.0
+        self.scans = 0
+        self.changes = 0
+
+class RescanScheduler:
+    """
+    Rescans each top-level subtree of the scan directory on its own schedule.
+
+    - A subtree's interval halves (down to `min_interval`) after a rescan that
+      found changes, and grows by half (up to `max_interval`) after one that
+      found none. Hot trees are revisited often and static trees rarely.
+    - The cost of a rescan is the number of directories it visited. Rescans
+      stop once the last hour's cost reaches `budget_per_hour`; a subtree's
+      previous cost is its estimate for the next run.
+    - While `is_busy()` is true (interactive requests or user-started jobs are
+      in flight) no rescan starts, and a running one pauses between directories.
+
+    Per-subtree intervals and change rates are persisted so they survive restarts.
+    """
+    # Weight of the latest rescan in the change-rate moving average
+    CHANGE_RATE_WEIGHT = 0.3
+    # Cost assumed for a subtree that has never been rescanned
+    DEFAULT_COST = 1000
+
+    def __init__(self, scan_subtree, get_config, is_busy=None, state_file=None, interval=HOUR,
+                 min_interval=300, max_interval=24 * HOUR, budget_per_hour=20000, jitter=0.2):
+        """
+        Args:
+            scan_subtree (function): Called as scan_subtree(path, max_depth, should_stop); rescans one
+                                     subtree into the inventory and returns the scan summary, or None
+                                     if the walk was stopped before finishing.
+            get_config (function): Returns the application config.
+            is_busy (function, optional): True while background work should yield.
+        """
+        self.scan_subtree = scan_subtree
+        self.get_config = get_config
+        self.is_busy = is_busy or (lambda: False)
+        self.state_file = Path(state_file) if state_file else data_dir() / "rescan_state.json"
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_per_hour = budget_per_hour
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._subtrees = {}
+        self._spent = deque()
+        self._saved_state = None
+        self._waiting = 0
+        self._pause_started = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self._stats = {"rescans": 0, "paused_seconds": 0.0, "last_run": None}
+
+    def configure(self, config):
+        """Apply `rescan_*` settings from the application config"""
+        self.interval = config.get("rescan_interval", self.interval)
+        self.min_interval = config.get("rescan_min_interval", self.min_interval)
+        self.max_interval = config.get("rescan_max_interval", self.max_interval)
+        self.budget_per_hour = config.get("rescan_budget_per_hour", self.budget_per_hour)
+
+    def _load_state(self):
+        """Load persisted per-subtree state on first use"""
+        if self._saved_state is None:
+            self._saved_state = {}
+            try:
+                if os.path.exists(self.state_file):
+                    with open(self.state_file, 'r') as f:
+                        self._saved_state = json.load(f).get("subtrees", {})
+            except Exception as e:
+                logger.error(f"Error loading rescan state: {e}")
+        return self._saved_state
+
+    def _save_state(self):
+        """Write per-subtree state atomically"""
+        with self._lock:
+            state = {
+                path: {
+                    "interval": subtree.interval,
+                    "change_rate": subtree.change_rate,
+                    "last_cost": subtree.last_cost,
+                    "last_scan": subtree.last_scan,
+                    "scans": subtree.scans,
+                    "changes": subtree.changes
+                }
+                for path, subtree in self._subtrees.items()
+            }
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({"subtrees": state}, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            logger.error(f"Error saving rescan state: {e}")
+
+    def _top_level_dirs(self, config):
+        """List the top-level directories of the scan directory that the scanner would enter"""
+        root = config.get("scan_directory")
+        excluded = set(config.get("excluded_dirs", []))
+        try:
+            with os.scandir(root) as entries:
+                return [
+                    os.path.abspath(entry.path) for entry in entries
+                    if entry.is_dir(follow_symlinks=False) and entry.name not in excluded
+                ]
+        except OSError as e:
+            logger.warning(f"Cannot list scan directory {root}: {e}")
+            return []
+
+    def _reconcile(self, config, now):
+        """Track new top-level directories and forget removed ones"""
+        saved = self._load_state()
+        paths = set(self._top_level_dirs(config))
+        with self._lock:
+            for path in list(self._subtrees):
+                if path not in paths:
+                    del self._subtrees[path]
+            for path in paths - set(self._subtrees):
+                subtree = _Subtree(path, self.interval)
+                previous = saved.get(path)
+                if previous:
+                    subtree.interval = previous.get("interval", self.interval)
+                    subtree.change_rate = previous.get("change_rate", 0.0)
+                    subtree.last_cost = previous.get("last_cost")
+                    subtree.last_scan = previous.get("last_scan")
+                    subtree.scans = previous.get("scans", 0)
+                    subtree.changes = previous.get("changes", 0)
+                # Spread first rescans over one interval instead of running them all at once
+                subtree.due = now + random.uniform(0, subtree.interval)
+                self._subtrees[path] = subtree
+
+    def _spent_last_hour(self, now):
+        """Directories visited by rescans in the last hour; prunes older entries, so call with _lock held"""
+        while self._spent and self._spent[0][0] < now - HOUR:
+            self._spent.popleft()
+        return sum(cost for _, cost in self._spent)
+
+    def _next_due(self, now):
+        with self._lock:
+            due = [subtree for subtree in self._subtrees.values() if subtree.due <= now]
+        return min(due, key=lambda subtree: subtree.due) if due else None
+
+    def _wait_while_busy(self):
+        """Block until interactive work is done (or the scheduler stops)"""
+        if not self.is_busy():
+            return
+        # Scanner threads pause together; count the wall time once
+        with self._lock:
+            self._waiting += 1
+            if self._waiting == 1:
+                self._pause_started = time.monotonic()
+        while self.is_busy() and not self._stopped.is_set():
+            self._stopped.wait(0.1)
+        with self._lock:
+            self._waiting -= 1
+            if self._waiting == 0:
+                paused = time.monotonic() - self._pause_started
+                self._stats["paused_seconds"] = round(self._stats["paused_seconds"] + paused, 3)
+
+    def run_once(self):
+        """
+        Rescan the most overdue subtree if the I/O budget and interactive load allow it.
+
+        Returns:
+            dict or None: The rescanned subtree's summary, or None if nothing was rescanned.
+        """
+        config = self.get_config()
+        now = time.monotonic()
+        self._reconcile(config, now)
+
+        subtree = self._next_due(now)
+        if subtree is None or self.is_busy():
+            return None
+
+        with self._lock:
+            spent = self._spent_last_hour(now)
+        estimate = subtree.last_cost or self.DEFAULT_COST
+        if spent and spent + estimate > self.budget_per_hour:
+            return None
+
+        visited = [0]
+        visited_lock = threading.Lock()
+
+        def should_stop():
+            # Called once per directory the scanner enters, from several scanner threads
+            with visited_lock:
+                visited[0] += 1
+            self._wait_while_busy()
+            return self._stopped.is_set()
+
+        max_depth = max(int(config.get("max_depth", 10)) - 1, 0)
+        try:
+            summary = self.scan_subtree(subtree.path, max_depth, should_stop)
+        except Exception as e:
+            logger.error(f"Error rescanning {subtree.path}: {e}")
+            summary = {"error": str(e)}
+        finished = time.monotonic()
+        with self._lock:
+            self._spent.append((finished, visited[0]))
+
+        if summary is None:
+            # Stopped mid-walk; run it first next time
+            return None
+
+        changes = sum(summary.get(key, 0) for key in ("added", "removed", "moved", "changed"))
+        with self._lock:
+            subtree.scans += 1
+            subtree.last_cost = visited[0]
+            subtree.last_scan = time.time()
+            changed = 1.0 if changes else 0.0
+            subtree.change_rate = round(
+                (1 - self.CHANGE_RATE_WEIGHT) * subtree.change_rate + self.CHANGE_RATE_WEIGHT * changed, 4
+            )
+            if changes:
+                subtree.changes += 1
+                subtree.interval = max(self.min_interval, subtree.interval / 2)
+            else:
+                subtree.interval = min(self.max_interval, subtree.interval * 1.5)
+            subtree.due = finished + subtree.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._stats["rescans"] += 1
+            self._stats["last_run"] = time.time()
+        self._save_state()
+        return {"path": subtree.path, "cost": visited[0], **summary}
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error in rescan scheduler: {e}")
+            self._stopped.wait(1.0)
+
+    def start(self):
+        """Start rescanning in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="rescan-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Rescan scheduler started (budget {self.budget_per_hour} directories/hour)")
+
+    def stop(self):
+        """Stop the scheduler thread; a rescan in progress is abandoned without storing it"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        """Budget usage and the schedule of every subtree"""
+        now = time.monotonic()
+        with self._lock:
+            subtrees = sorted(self._subtrees.values(), key=lambda subtree: subtree.due)
+            return {
+                "running": self._thread is not None,
+                "paused": self.is_busy(),
+                "budget_per_hour": self.budget_per_hour,
+                "spent_last_hour": self._spent_last_hour(now),
+                **self._stats,
+                "subtrees": [
+                    {
+                        "path": subtree.path,
+                        "interval": round(subtree.interval),
+                        "next_scan_in": round(max(0.0, subtree.due - now), 1),
+                        "last_scan": subtree.last_scan,
+                        "last_cost": subtree.last_cost,
+                        "change_rate": subtree.change_rate,
+                        "scans": subtree.scans,
+                        "changes": subtree.changes
+                    }
+                    for subtree in subtrees
+                ]
+            }
@@ -0,0 +1,208 @@
+import os
+import json
+import threading
+import logging
+from pathlib import Path
+
+from .config import data_dir
+
+logger = logging.getLogger(__name__)
+
+# Fields whose change between two scans is reported as a status change
+STATUS_FIELDS = ("status", "current_branch", "ahead", "behind", "has_changes")
+
+def _inode_key(repo):
+    """Get the (device, inode) identity of a repository record, or None if unknown"""
+    inode = repo.get("inode")
+    if not inode:
+        return None
+    return (repo.get("device"), inode)
+
+def compute_scan_diff(previous_repos, current_repos):
+    """
+    Compute which repositories appeared, disappeared, moved or changed status
+    between two scans. Runs in time linear in the number of repositories.
+
+    Repositories are matched by `id` first. A repository whose id disappeared but
+    whose (device, inode) shows up under a new id is reported as moved rather
+    than as a removal plus an addition.
+
+    Args:
+        previous_repos (list): Repository records from the previous scan.
+        current_repos (list): Repository records from the new scan.
+
+    Returns:
+        dict: Lists of `added` and `removed` records, `moved` entries
+              (old_id, new_id, from_path, to_path) and `changed` entries
+              (id, path, fields) where fields maps each changed field to [old, new].
+    """
+    previous_by_id = {repo.get("id"): repo for repo in previous_repos}
+    current_ids = set()
+
+    added = []
+    changed = []
+    for repo in current_repos:
+        repo_id = repo.get("id")
+        current_ids.add(repo_id)
+        old_repo = previous_by_id.get(repo_id)
+        if old_repo is None:
+            added.append(repo)
+            continue
+
+        fields = {
+            field: [old_repo.get(field), repo.get(field)]
+            for field in STATUS_FIELDS
+            if old_repo.get(field) != repo.get(field)
+        }
+        if fields:
+            changed.append({"id": repo_id, "path": repo.get("path"), "fields": fields})
+
+    removed = [repo for repo_id, repo in previous_by_id.items() if repo_id not in current_ids]
+
+    # Pair removals with additions that share an inode: those are moves
+    removed_by_inode = {}
+    for repo in removed:
+        key = _inode_key(repo)
+        if key is not None:
+            removed_by_inode[key] = repo
+
+    moved = []
+    moved_old_ids = set()
+    still_added = []
+    for repo in added:
+        key = _inode_key(repo)
+        old_repo = removed_by_inode.pop(key, None) if key is not None else None
+        if old_repo is None:
+            still_added.append(repo)
+            continue
+        moved_old_ids.add(old_repo.get("id"))
+        moved.append({
+            "old_id": old_repo.get("id"),
+            "new_id": repo.get("id"),
+            "from_path": old_repo.get("path"),
+            "to_path": repo.get("path")
+        })
+
+    return {
+        "added": still_added,
+        "removed": [repo for repo in removed if repo.get("id") not in moved_old_ids],
+        "moved": moved,
+        "changed": changed
+    }
+
+def compact_diff(diff, generation, scan_time):
+    """Reduce a scan diff to ids and changed fields for storage"""
+    return {
+        "generation": generation,
+        "scan_time": scan_time,
+        "added": [repo.get("id") for repo in diff["added"]],
+        "removed": [repo.get("id") for repo in diff["removed"]],
+        "moved": [[m["old_id"], m["new_id"]] for m in diff["moved"]],
+        "changed": {c["id"]: c["fields"] for c in diff["changed"]}
+    }
+
+def diff_events(diff):
+    """
+    Turn a scan diff into `added`/`removed`/`changed` progress events for SSE clients.
+    Moves are sent as `changed` events carrying the old and new path.
+    """
+    for repo in diff["added"]:
+        yield {
+            "status": "added",
+            "message": f"Repository added: {repo.get('path')}",
+            "repository": repo
+        }
+    for repo in diff["removed"]:
+        yield {
+            "status": "removed",
+            "message": f"Repository removed: {repo.get('path')}",
+            "repository": {"id": repo.get("id"), "path": repo.get("path")}
+        }
+    for move in diff["moved"]:
+        yield {
+            "status": "changed",
+            "message": f"Repository moved: {move['from_path']} -> {move['to_path']}",
+            "repository": {"id": move["new_id"], "path": move["to_path"]},
+            "moved_from": {"id": move["old_id"], "path": move["from_path"]}
+        }
+    for change in diff["changed"]:
+        yield {
+            "status": "changed",
+            "message": f"Repository changed: {change['path']} ({', '.join(change['fields'])})",
+            "repository": {"id": change["id"], "path": change["path"]},
+            "fields": change["fields"]
+        }
+
+class ScanChangeLog:
+    """
+    Append-only log of compact scan diffs stored as JSON lines.
+    The log is trimmed to the most recent MAX_RECORDS entries once it holds twice
+    as many, so appends only rewrite the file once every MAX_RECORDS records.
+    """
+    MAX_RECORDS = 500
+
+    def __init__(self, log_file=None):
+        self.log_file = Path(log_file) if log_file else data_dir() / "scan_changes.jsonl"
+        self._lock = threading.Lock()
+        # Lines in the log file, counted on the first append
+        self._lines = None
+
+    def append(self, record):
+        """Append a compact diff record, trimming the log when it grows past twice the limit"""
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+                if self._lines is None:
+                    self._lines = self._count_lines()
+                with open(self.log_file, 'a') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + "\n")
+                self._lines += 1
+                if self._lines > self.MAX_RECORDS * 2:
+                    self._trim()
+            except Exception as e:
+                self._lines = None
+                logger.error(f"Error writing scan change record: {e}")
+
+    def _count_lines(self):
+        if not os.path.exists(self.log_file):
+            return 0
+        with open(self.log_file, 'rb') as f:
+            return sum(1 for _ in f)
+
+    def _trim(self):
+        """Keep only the newest MAX_RECORDS lines"""
+        with open(self.log_file, 'r') as f:
+            lines = f.readlines()
+        tmp_file = f"{self.log_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.writelines(lines[-self.MAX_RECORDS:])
+        os.replace(tmp_file, self.log_file)
+        self._lines = min(len(lines), self.MAX_RECORDS)
+
+    def get_records(self, since=0, limit=None):
+        """
+        Get stored change records newer than a generation.
+
+        Args:
+            since (int): Only return records with a greater generation.
+            limit (int, optional): Return at most this many of the newest records.
+
+        Returns:
+            list: Compact diff records, oldest first.
+        """
+        with self._lock:
+            if not os.path.exists(self.log_file):
+                return []
+            records = []
+            try:
+                with open(self.log_file, 'r') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        if record.get("generation", 0) > since:
+                            records.append(record)
+            except Exception as e:
+                logger.error(f"Error reading scan change records: {e}")
+            return records[-limit:] if limit else records
@@ -4,11 +4,42 @@ from pathlib import Path
 from datetime import datetime
 import hashlib
 import concurrent.futures
-import gitignore_parser
 from .git_operations import GitOperations # Ensure GitOperations is imported
+from . import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
+# Files under .git whose stat changes with the repository's git state
+GIT_STATE_FILES = ("HEAD", "index", "packed-refs", "FETCH_HEAD")
+
+def git_signature(repo_path):
+    """
+    Fingerprint of a repository's git state: the stat of GIT_STATE_FILES and of
+    the branch ref HEAD points to. Commits, checkouts, staging, fetches and pulls
+    change it; working tree edits that were never staged do not.
+
+    Returns:
+        str: Hex digest, equal for two reads of an unchanged repository.
+    """
+    git_dir = os.path.join(repo_path, ".git")
+    names = list(GIT_STATE_FILES)
+    try:
+        with open(os.path.join(git_dir, "HEAD"), 'r', encoding='utf-8', errors='ignore') as f:
+            head = f.readline().strip()
+        if head.startswith("ref: "):
+            names.append(head[len("ref: "):])
+    except OSError:
+        pass
+
+    parts = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(git_dir, name))
+            parts.append(f"{st.st_ino}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append("-")
+    return hashlib.md5("|".join(parts).encode('utf-8')).hexdigest()
+
 class RepositoryScanner:
     """
     Handles scanning directories for git repositories.
@@ -23,11 +54,15 @@ class RepositoryScanner:
         gitignore_path = Path(directory) / ".gitignore"
         if gitignore_path.is_file():
             try:
-                return gitignore_parser.parse_gitignore(gitignore_path)
+                # Imported here so that starting the app does not pay for it
+                from gitignore_parser import parse_gitignore
+                with metrics.GITIGNORE_PARSE.time():
+                    return parse_gitignore(gitignore_path)
             except Exception as e:
                 logger.warning(f"Could not parse .gitignore file at {gitignore_path}: {e}")
         return None
     
+    @metrics.timed(metrics.GITIGNORE_MATCH)
     def is_ignored(self, path_to_check, parent_gitignore_matcher, current_gitignore_matcher):
         """Check if a path should be ignored based on gitignore and exclusions"""
         path_obj = Path(path_to_check) if isinstance(path_to_check, str) else path_to_check
@@ -44,7 +79,7 @@ class RepositoryScanner:
             
         return False
     
-    def scan_directory(self, dir_path, max_depth=None, current_depth=0, parent_gitignore_matcher=None, progress_callback=None):
+    def scan_directory(self, dir_path, max_depth=None, current_depth=0, parent_gitignore_matcher=None, progress_callback=None, should_stop=None, on_directory=None):
         """
         Scan a directory and its subdirectories for git repositories.
         
@@ -54,10 +89,26 @@ class RepositoryScanner:
             current_depth (int, optional): Current scan depth. Defaults to 0.
             parent_gitignore_matcher (function, optional): Parent directory's gitignore matcher.
             progress_callback (function, optional): Callback function to report progress.
+            should_stop (function, optional): Checked before each directory; the walk stops
+                                              early (returning partial results) once it returns True.
+            on_directory (function, optional): Called with each non-repository directory the walk
+                                               lists (e.g. to watch it for new clones).
             
         Returns:
             tuple: Lists of (git_repos_found, non_git_dirs_found)
         """
+        if tracing.active():
+            with tracing.span("scan.directory", path=str(dir_path), depth=current_depth):
+                return self._scan_directory(
+                    dir_path, max_depth, current_depth, parent_gitignore_matcher,
+                    progress_callback, should_stop, on_directory
+                )
+        return self._scan_directory(
+            dir_path, max_depth, current_depth, parent_gitignore_matcher,
+            progress_callback, should_stop, on_directory
+        )
+    
+    def _scan_directory(self, dir_path, max_depth, current_depth, parent_gitignore_matcher, progress_callback, should_stop, on_directory):
         # Use max_depth from parameters or config
         if max_depth is None:
             max_depth = self.config.get("max_depth", 10)
@@ -72,10 +123,15 @@ class RepositoryScanner:
                 "depth": current_depth
             })
         
+        # Stop early if the caller cancelled the scan
+        if should_stop and should_stop():
+            return [], []
+        
         # Check max depth
         if current_depth > max_depth:
             logger.info(f"Max depth reached for {dir_path}")
             return [], []
+        metrics.SCAN_DIRECTORIES.inc()
         
         git_repos_found = []
         non_git_dirs_found = []
@@ -131,6 +187,9 @@ class RepositoryScanner:
             else:
                 logger.debug(f"Skipping high-level directory: {dir_path}")
         
+        if on_directory:
+            on_directory(dir_path)
+        
         # Collect subdirectories to scan
         subdirs_to_scan = []
         try:
@@ -155,12 +214,14 @@ class RepositoryScanner:
         with concurrent.futures.ThreadPoolExecutor() as executor:
             future_to_subdir = {
                 executor.submit(
-                    self.scan_directory, 
+                    tracing.bind(self.scan_directory), 
                     subdir, 
                     max_depth, 
                     current_depth + 1, 
                     effective_matcher,
-                    progress_callback  # Pass the progress callback to child scans
+                    progress_callback,  # Pass the progress callback to child scans
+                    should_stop,
+                    on_directory
                 ): subdir
                 for subdir in subdirs_to_scan
             }
@@ -205,12 +266,14 @@ class RepositoryScanner:
             logger.warning(f"Could not read .git/description for {repo_path_obj}: {e}")
         return None
 
-    def _extract_basic_repo_info(self, repo_path_obj: Path):
+    def _extract_basic_repo_info(self, repo_path_obj: Path, enrich=True):
         """
         Extract basic and detailed information about a Git repository.
         
         Args:
             repo_path_obj (Path): Path object to the repository.
+            enrich (bool, optional): Read the git state (branch, remotes, commits, changes).
+                                     Without it only the basic fields are returned.
             
         Returns:
             dict: Dictionary containing repository information.
@@ -234,6 +297,13 @@ class RepositoryScanner:
         
         last_modified_iso = datetime.fromtimestamp(last_modified_timestamp).isoformat()
 
+        # Device and inode identify the repository across moves and renames
+        try:
+            repo_stat = repo_path_obj.stat()
+            device, inode = repo_stat.st_dev, repo_stat.st_ino
+        except OSError:
+            device, inode = None, None
+
         # Basic info
         basic_info = {
             "id": repo_id,
@@ -241,9 +311,15 @@ class RepositoryScanner:
             "path": repo_path_str,
             "description": self._get_repo_description(repo_path_obj),
             "last_modified": last_modified_iso,
+            "device": device,
+            "inode": inode,
             "type": "git_repository" 
         }
 
+        if not enrich:
+            basic_info["git_signature"] = git_signature(repo_path_str)
+            return basic_info
+
         # Get detailed Git information using GitOperations
         git_ops = GitOperations()
         detailed_git_info = git_ops.get_repository_info(repo_path_str)
@@ -259,12 +335,36 @@ class RepositoryScanner:
         else:
             combined_info['remotes'] = [] # Ensure remotes key exists
 
+        # Taken after reading the git state, which can rewrite the index
+        combined_info["git_signature"] = git_signature(repo_path_str)
         return combined_info
 
-    def get_repositories_info(self, repos):
-        """Get information for a list of repositories"""
+    def get_repositories_info(self, repos, enrich=True):
+        """Get information for a list of repositories (basic fields only unless enrich)"""
         # Changed to use _extract_basic_repo_info to get detailed data
-        return [self._extract_basic_repo_info(Path(repo)) for repo in repos]
+        if not tracing.active():
+            return [self._extract_basic_repo_info(Path(repo), enrich) for repo in repos]
+        with tracing.span("scan.enrich", repositories=len(repos)):
+            infos = []
+            for repo in repos:
+                with tracing.span("scan.repository", path=str(repo)):
+                    infos.append(self._extract_basic_repo_info(Path(repo), enrich))
+            return infos
+    
+    def get_dir_info(self, dir_path):
+        """Get basic information about a non-git directory"""
+        path_obj = Path(dir_path)
+        try:
+            last_modified_iso = datetime.fromtimestamp(path_obj.stat().st_mtime).isoformat()
+        except OSError as e:
+            logger.warning(f"Could not get stats for {dir_path}: {e}")
+            last_modified_iso = "N/A"
+        
+        return {
+            "path": str(path_obj.resolve()),
+            "name": path_obj.name,
+            "last_modified": last_modified_iso
+        }
     
     def get_directories_info(self, dirs):
         """Get information for a list of directories"""
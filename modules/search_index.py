@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+
+from .config import data_dir
+
+logger = logging.getLogger(__name__)
+
+# Indexed columns and their bm25 weights (higher ranks matches in that column first)
+INDEXED_COLUMNS = [
+    ("name", 10.0),
+    ("path", 3.0),
+    ("remotes", 4.0),
+    ("description", 2.0),
+    ("branch", 2.0),
+    ("commits", 1.0),
+]
+
+# The trigram tokenizer cannot match terms shorter than this
+MIN_TRIGRAM_TERM = 3
+
+def _document(repo):
+    """Flatten a repository record into the indexed text columns"""
+    remotes = " ".join(
+        " ".join(filter(None, [r.get("name"), r.get("fetch_url"), r.get("push_url")]))
+        for r in repo.get("remotes", []) or []
+    )
+    commits = "\n".join(repo.get("commit_subjects") or [c.get("message", "") for c in repo.get("recent_commits", []) or []])
+    return (
+        repo.get("name") or "",
+        repo.get("path") or "",
+        remotes,
+        repo.get("description") or "",
+        repo.get("current_branch") or "",
+        commits,
+    )
+
+class SearchIndex:
+    """
+    Full-text search over repositories backed by an SQLite FTS5 trigram index.
+
+    The index covers name, path, remote URLs, description, current branch and
+    the subject lines of recent commits. It is kept up to date incrementally through an
+    InventoryStore listener and rebuilt from the inventory when it is missing
+    or out of sync.
+    """
+    def __init__(self, index_file=None):
+        self.index_file = Path(index_file) if index_file else data_dir() / "search_index.db"
+        self._lock = threading.Lock()
+        self._conn = None
+        self._inventory = None
+
+    def _connect(self):
+        """Open the database and create the schema on first use"""
+        if self._conn is not None:
+            return self._conn
+
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        conn = sqlite3.connect(str(self.index_file), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(name for name, _ in INDEXED_COLUMNS)
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS repo_fts USING fts5("
+            f"repo_id UNINDEXED, {columns}, tokenize='trigram')"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.commit()
+        self._conn = conn
+        return conn
+
+    def _get_meta(self, key, default=None):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._connect().execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
+
+    def _upsert(self, conn, repos):
+        ids = [(repo.get("id"),) for repo in repos]
+        conn.executemany("DELETE FROM repo_fts WHERE repo_id = ?", ids)
+        conn.executemany(
+            f"INSERT INTO repo_fts (repo_id, {', '.join(n for n, _ in INDEXED_COLUMNS)}) "
+            f"VALUES (?{', ?' * len(INDEXED_COLUMNS)})",
+            [(repo.get("id"), *_document(repo)) for repo in repos]
+        )
+
+    def attach(self, inventory):
+        """Keep this index in sync with an InventoryStore"""
+        self._inventory = inventory
+        inventory.add_listener(self.on_inventory_change)
+
+    def on_inventory_change(self, updated, removed):
+        """InventoryStore listener: index updated repositories and drop removed ones"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                if removed:
+                    conn.executemany("DELETE FROM repo_fts WHERE repo_id = ?", [(r.get("id"),) for r in removed])
+                if updated:
+                    self._upsert(conn, updated)
+                if self._inventory is not None:
+                    self._set_meta("generation", self._inventory.get_generation())
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error updating search index: {e}")
+
+    def rebuild(self, repositories, generation=None):
+        """Replace the whole index with the given repository records"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM repo_fts")
+                self._upsert(conn, repositories)
+                if generation is not None:
+                    self._set_meta("generation", generation)
+                conn.commit()
+                logger.info(f"Rebuilt search index with {len(repositories)} repositories")
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error rebuilding search index: {e}")
+
+    def ensure_current(self):
+        """Rebuild from the attached inventory if the index lags behind it"""
+        if self._inventory is None:
+            return
+        generation = self._inventory.get_generation()
+        with self._lock:
+            indexed = self._get_meta("generation")
+        if indexed != str(generation):
+            self.rebuild(self._inventory.get_repositories(), generation)
+
+    @staticmethod
+    def _build_query(query):
+        """
+        Split a user query into an FTS5 MATCH expression for terms long enough for
+        the trigram index, and plain substring terms for the rest.
+        """
+        match_terms, like_terms = [], []
+        for term in query.split():
+            if len(term) >= MIN_TRIGRAM_TERM:
+                match_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                like_terms.append(term)
+        return " AND ".join(match_terms), like_terms
+
+    def search(self, query, page=1, per_page=20):
+        """
+        Search repositories. Every whitespace-separated term must match (case-insensitive
+        substring) in at least one indexed column. Results are ranked with bm25.
+
+        Args:
+            query (str): Search text.
+            page (int): 1-based page number.
+            per_page (int): Results per page.
+
+        Returns:
+            dict: Total number of matches and the requested page of (id, score) results.
+        """
+        self.ensure_current()
+        match_expr, like_terms = self._build_query(query)
+        if not match_expr and not like_terms:
+            return {"total": 0, "results": []}
+
+        columns = [name for name, _ in INDEXED_COLUMNS]
+        where, params = [], []
+        if match_expr:
+            where.append("repo_fts MATCH ?")
+            params.append(match_expr)
+        for term in like_terms:
+            escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("(" + " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in columns) + ")")
+            params.extend([f"%{escaped}%"] * len(columns))
+        where_sql = " AND ".join(where)
+
+        # bm25 is only defined for full-text matches; pure substring queries rank by name.
+        # An exact (case-insensitive) name match always comes first.
+        if match_expr:
+            weights = ", ".join(str(w) for _, w in INDEXED_COLUMNS)
+            rank_sql, order_sql = f"bm25(repo_fts, 0, {weights})", "score"
+        else:
+            rank_sql, order_sql = "0", "name"
+
+        offset = (max(page, 1) - 1) * per_page
+        with self._lock:
+            conn = self._connect()
+            total = conn.execute(f"SELECT count(*) FROM repo_fts WHERE {where_sql}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT repo_id, {rank_sql} AS score FROM repo_fts WHERE {where_sql} "
+                f"ORDER BY lower(name) = lower(?) DESC, {order_sql} LIMIT ? OFFSET ?",
+                params + [query.strip(), per_page, offset]
+            ).fetchall()
+
+        return {
+            "total": total,
+            # bm25 scores are negative (lower is better); flip them so higher is better
+            "results": [{"id": repo_id, "score": round(-score, 4) if score else 0.0} for repo_id, score in rows]
+        }
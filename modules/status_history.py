@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import bisect
+import threading
+import logging
+from array import array
+from pathlib import Path
+
+from .config import data_dir
+
+logger = logging.getLogger(__name__)
+
+# Status strings are stored as small integer codes
+STATUS_CODES = ["Clean", "Changed", "Ahead", "Behind", "Diverged", "Error", "Removed", "Unknown"]
+_STATUS_INDEX = {name: code for code, name in enumerate(STATUS_CODES)}
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+class _Series:
+    """
+    Columnar time series of (timestamp, status code, ahead, behind) points
+    kept in parallel typed arrays, oldest first.
+    """
+    __slots__ = ("ts", "status", "ahead", "behind")
+
+    def __init__(self):
+        self.ts = array('q')
+        self.status = array('b')
+        self.ahead = array('i')
+        self.behind = array('i')
+
+    def __len__(self):
+        return len(self.ts)
+
+    def append(self, ts, status, ahead, behind):
+        self.ts.append(ts)
+        self.status.append(status)
+        self.ahead.append(ahead)
+        self.behind.append(behind)
+
+    def merge_point(self, point):
+        """Append a point, or overwrite the newest one if it has the same timestamp"""
+        if self.ts and self.ts[-1] == point[0]:
+            for column, value in zip((self.ts, self.status, self.ahead, self.behind), point):
+                column[-1] = value
+        else:
+            self.append(*point)
+
+    def last(self):
+        """Get the newest point as a tuple, or None if empty"""
+        if not self.ts:
+            return None
+        return (self.ts[-1], self.status[-1], self.ahead[-1], self.behind[-1])
+
+    def take_before(self, cutoff):
+        """Remove and return all points with a timestamp before the cutoff"""
+        index = bisect.bisect_left(self.ts, cutoff)
+        return self.take_first(index)
+
+    def take_first(self, count):
+        """Remove and return the oldest `count` points"""
+        points = list(zip(self.ts[:count], self.status[:count], self.ahead[:count], self.behind[:count]))
+        for column in (self.ts, self.status, self.ahead, self.behind):
+            del column[:count]
+        return points
+
+    def columns(self):
+        return (self.ts, self.status, self.ahead, self.behind)
+
+def _downsample(points, bucket_size):
+    """
+    Collapse points into one point per bucket, keeping the state at the end of
+    each bucket (the last transition inside it) stamped with the bucket start.
+    """
+    buckets = []
+    for ts, status, ahead, behind in points:
+        bucket_ts = ts - ts % bucket_size
+        if buckets and buckets[-1][0] == bucket_ts:
+            buckets[-1] = (bucket_ts, status, ahead, behind)
+        else:
+            buckets.append((bucket_ts, status, ahead, behind))
+    return buckets
+
+class _RepoHistory:
+    """Raw transitions plus hourly and daily downsampled tiers for one repository"""
+    __slots__ = ("raw", "hourly", "daily")
+
+    def __init__(self):
+        self.raw = _Series()
+        self.hourly = _Series()
+        self.daily = _Series()
+
+    def tiers(self):
+        return (self.raw, self.hourly, self.daily)
+
+    def last(self):
+        return self.raw.last() or self.hourly.last() or self.daily.last()
+
+class StatusHistory:
+    """
+    Records repository status transitions over time.
+
+    Only transitions are stored (a repeated status is a no-op). Recent transitions
+    are kept at full resolution; older ones are downsampled to one point per hour
+    and then one point per day, so the store stays bounded regardless of how often
+    repositories are scanned.
+    """
+    # Raw transitions are kept for this long (and at most RAW_CAPACITY per repository)
+    RAW_RETENTION = 2 * DAY
+    RAW_CAPACITY = 256
+    # Hourly points are kept for this long before being merged into daily points
+    HOURLY_RETENTION = 30 * DAY
+    # Daily points older than this are dropped
+    DAILY_RETENTION = 365 * DAY
+
+    def __init__(self, history_file=None):
+        self.history_file = Path(history_file) if history_file else data_dir() / "status_history.bin"
+        self._lock = threading.RLock()
+        self._repos = None
+
+    def _load(self):
+        """
+        Load the stored history on first access.
+
+        The file is one JSON header line listing each repository with its tier
+        lengths, followed by the raw bytes of every column array in the same order.
+        """
+        if self._repos is not None:
+            return self._repos
+
+        self._repos = {}
+        try:
+            if os.path.exists(self.history_file):
+                with open(self.history_file, 'rb') as f:
+                    header = json.loads(f.readline())
+                    blob = memoryview(f.read())
+                offset = 0
+                for repo_id, lengths in header.get("repositories", []):
+                    history = _RepoHistory()
+                    for tier, length in zip(history.tiers(), lengths):
+                        for column in tier.columns():
+                            size = length * column.itemsize
+                            column.frombytes(blob[offset:offset + size])
+                            offset += size
+                    self._repos[repo_id] = history
+        except Exception as e:
+            logger.error(f"Error loading status history: {e}")
+            self._repos = {}
+        return self._repos
+
+    def _persist(self):
+        """Write the history to disk atomically"""
+        try:
+            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+            header = {
+                "version": 1,
+                "status_codes": STATUS_CODES,
+                "repositories": [
+                    [repo_id, [len(tier) for tier in history.tiers()]]
+                    for repo_id, history in self._repos.items()
+                ]
+            }
+            tmp_file = f"{self.history_file}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(json.dumps(header, separators=(',', ':')).encode('utf-8') + b"\n")
+                for history in self._repos.values():
+                    for tier in history.tiers():
+                        for column in tier.columns():
+                            f.write(column.tobytes())
+            os.replace(tmp_file, self.history_file)
+        except Exception as e:
+            logger.error(f"Error saving status history: {e}")
+
+    def _compact(self, history, now):
+        """Move aged points down the tiers, downsampling them on the way"""
+        # Raw -> hourly: everything past the retention window, plus any overflow
+        aged = history.raw.take_before(now - self.RAW_RETENTION)
+        overflow = len(history.raw) - self.RAW_CAPACITY
+        if overflow > 0:
+            aged.extend(history.raw.take_first(overflow))
+        for point in _downsample(aged, HOUR):
+            history.hourly.merge_point(point)
+
+        # Hourly -> daily
+        aged = history.hourly.take_before(now - self.HOURLY_RETENTION)
+        for point in _downsample(aged, DAY):
+            history.daily.merge_point(point)
+
+        # Drop expired daily points (the raw tier always holds the newest state)
+        history.daily.take_before(now - self.DAILY_RETENTION)
+
+    def _record(self, repo_id, status, ahead, behind, now):
+        """Record one repository's state; returns True if it was a transition"""
+        code = _STATUS_INDEX.get(status, _STATUS_INDEX["Unknown"])
+        ahead = int(ahead or 0)
+        behind = int(behind or 0)
+
+        history = self._repos.setdefault(repo_id, _RepoHistory())
+        last = history.last()
+        if last and last[1:] == (code, ahead, behind):
+            return False
+
+        history.raw.append(now, code, ahead, behind)
+        self._compact(history, now)
+        return True
+
+    def record(self, repositories, removed=(), timestamp=None):
+        """
+        Record the current status of repositories. Only transitions are stored.
+
+        Args:
+            repositories (list): Repository records with `id`, `status`, `ahead` and `behind`.
+            removed (list, optional): Repository records that left the inventory.
+            timestamp (float, optional): Time of the observation. Defaults to now.
+
+        Returns:
+            int: Number of transitions recorded.
+        """
+        now = int(timestamp if timestamp is not None else time.time())
+        with self._lock:
+            self._load()
+            transitions = 0
+            for repo in repositories:
+                if self._record(repo.get("id"), repo.get("status"), repo.get("ahead"), repo.get("behind"), now):
+                    transitions += 1
+            for repo in removed:
+                if self._record(repo.get("id"), "Removed", 0, 0, now):
+                    transitions += 1
+            if transitions:
+                self._persist()
+            return transitions
+
+    def on_inventory_change(self, updated, removed):
+        """InventoryStore listener: record transitions for updated and removed repositories"""
+        self.record(updated, removed)
+
+    def query(self, since=None, until=None, repo_ids=None):
+        """
+        Get status series for all (or selected) repositories over a time window.
+
+        Each series starts with the state carried in from before the window (clamped
+        to `since`) followed by every stored point inside the window, coarsest tier first.
+
+        Args:
+            since (float, optional): Window start as a Unix timestamp. Defaults to 30 days ago.
+            until (float, optional): Window end as a Unix timestamp. Defaults to now.
+            repo_ids (iterable, optional): Restrict the result to these repositories.
+
+        Returns:
+            dict: Window bounds, the status code table and a columnar series per repository.
+        """
+        until = int(until if until is not None else time.time())
+        since = int(since if since is not None else until - 30 * DAY)
+
+        with self._lock:
+            repos = self._load()
+            selected = repo_ids if repo_ids is not None else repos.keys()
+            series = {}
+            for repo_id in selected:
+                history = repos.get(repo_id)
+                if history is None:
+                    continue
+
+                ts, status, ahead, behind = [], [], [], []
+                carried = None
+                for tier in (history.daily, history.hourly, history.raw):
+                    start = bisect.bisect_left(tier.ts, since)
+                    end = bisect.bisect_right(tier.ts, until)
+                    if start > 0:
+                        carried = (since, tier.status[start - 1], tier.ahead[start - 1], tier.behind[start - 1])
+                    ts.extend(tier.ts[start:end])
+                    status.extend(tier.status[start:end])
+                    ahead.extend(tier.ahead[start:end])
+                    behind.extend(tier.behind[start:end])
+
+                if carried and (not ts or ts[0] > since):
+                    ts.insert(0, carried[0])
+                    status.insert(0, carried[1])
+                    ahead.insert(0, carried[2])
+                    behind.insert(0, carried[3])
+                if ts:
+                    series[repo_id] = {"ts": ts, "status": status, "ahead": ahead, "behind": behind}
+
+            return {
+                "since": since,
+                "until": until,
+                "status_codes": STATUS_CODES,
+                "repositories": series
+            }
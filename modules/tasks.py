@@ -0,0 +1,192 @@
+"""
+Celery tasks for running scans, enrichment and pulls on worker processes.
+
+The web process stays the single writer of the inventory: it enqueues tasks,
+streams their progress and stores their results. Workers only read the
+filesystem and run git, so they need the repositories mounted at the same
+paths as the web process.
+
+Start a worker with:
+
+    celery -A modules.tasks worker --loglevel=info
+
+The broker and result backend come from CELERY_BROKER_URL and
+CELERY_RESULT_BACKEND (defaulting to the local Redis). For a single-process
+test setup use `memory://` and `cache+memory://` with an in-process worker,
+or set CELERY_TASK_ALWAYS_EAGER=1 to run tasks inline.
+"""
+import os
+import time
+import logging
+
+from celery import Celery
+
+from . import parallel_scan
+from .git_operations import GitOperations
+
+logger = logging.getLogger(__name__)
+
+celery = Celery(
+    "sentinel",
+    broker=os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0"),
+    backend=os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/1")
+)
+celery.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    # A task is only acknowledged once it finished, so a crashed worker's task is redelivered
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    result_expires=3600,
+    task_always_eager=os.environ.get("CELERY_TASK_ALWAYS_EAGER", "").lower() in ("1", "true", "yes")
+)
+
+# Seconds between result polls while waiting on tasks
+POLL_INTERVAL = 0.05
+
+@celery.task(name="sentinel.scan_shard")
+def scan_shard(path, config, max_depth, ignore_root=None):
+    """Walk one shard (a subdirectory of a scan path); returns the repository paths found"""
+    return parallel_scan.scan_shard(path, config, max_depth, ignore_root)
+
+@celery.task(name="sentinel.enrich_repositories")
+def enrich_repositories(paths, config):
+    """Read the full repository record (git state, remotes, commits) of each path"""
+    return parallel_scan.enrich_chunk(paths, config)
+
+@celery.task(name="sentinel.repository_info")
+def repository_info(path):
+    """Read one repository's git state"""
+    return GitOperations().get_repository_info(path)
+
+@celery.task(bind=True, name="sentinel.pull_repository")
+def pull_repository(self, path):
+    """Pull one repository, reporting each progress update as task state"""
+    sequence = [0]
+
+    def progress_callback(update_info):
+        sequence[0] += 1
+        self.update_state(state="PROGRESS", meta={"sequence": sequence[0], "update": update_info})
+
+    return GitOperations().pull_repository(path, progress_callback=progress_callback)
+
+def wait_for(result, timeout, on_progress=None, should_stop=None):
+    """
+    Block until a task finishes and return its value.
+
+    Args:
+        result (AsyncResult): The task to wait for.
+        timeout (float): Seconds to wait before giving up.
+        on_progress (function, optional): Called with each new PROGRESS update.
+        should_stop (function, optional): Revokes the task and returns None once it returns True.
+
+    Raises:
+        TimeoutError: If the task did not finish in time.
+    """
+    deadline = time.monotonic() + timeout
+    last_sequence = 0
+    while not result.ready():
+        if should_stop and should_stop():
+            result.revoke()
+            return None
+        if on_progress and result.state == "PROGRESS":
+            meta = result.info or {}
+            if meta.get("sequence", 0) > last_sequence:
+                last_sequence = meta["sequence"]
+                on_progress(meta["update"])
+        if time.monotonic() > deadline:
+            result.revoke()
+            raise TimeoutError(f"Task {result.id} did not finish within {timeout}s")
+        time.sleep(POLL_INTERVAL)
+    return result.get(propagate=True)
+
+class RemoteGitOperations:
+    """
+    Stands in for GitOperations in jobs: each call runs as a task on a worker
+    and blocks until its result is back.
+    """
+    def __init__(self, timeout=600):
+        self.timeout = timeout
+
+    def pull_repository(self, repo_path, progress_callback=None):
+        return wait_for(pull_repository.delay(repo_path), self.timeout, on_progress=progress_callback)
+
+    def get_repository_info(self, repo_path):
+        return wait_for(repository_info.delay(repo_path), self.timeout)
+
+def distributed_scan(scan_path, config, max_depth, progress_callback=None, should_stop=None, timeout=600):
+    """
+    Scan a path on the workers: one walk task per top-level subdirectory, and
+    enrichment in chunks of parallel_scan.ENRICH_CHUNK_SIZE repositories, dispatched as soon
+    as each walk finishes.
+
+    Progress is reported like RepositoryScanner.scan_directory does: one update
+    per finished shard and one `git_repo` update per repository found.
+
+    Returns:
+        tuple: (repository records, non-git directory info dicts); partial if stopped.
+
+    Raises:
+        TimeoutError: If the scan did not finish in time; its outstanding tasks are revoked.
+    """
+    root_repos, non_git_dirs, shards = parallel_scan.plan_scan(scan_path, config, max_depth)
+    walks = {scan_shard.delay(shard, config, max_depth, str(scan_path)): shard for shard in shards}
+    enrichments = []
+
+    def report(update):
+        if progress_callback:
+            progress_callback(update)
+
+    def enrich(paths):
+        for path in paths:
+            report({"message": f"Found Git repository: {path}", "path": path, "type": "git_repo"})
+        for chunk in parallel_scan.chunked(paths):
+            enrichments.append(enrich_repositories.delay(chunk, config))
+
+    def revoke_outstanding():
+        # Workers would otherwise keep walking and reading for a scan nobody waits for
+        for result in list(walks) + enrichments:
+            if not result.ready():
+                result.revoke()
+
+    enrich(root_repos)
+
+    deadline = time.monotonic() + timeout
+    stopped = False
+    while walks:
+        if should_stop and should_stop():
+            stopped = True
+            break
+        if time.monotonic() > deadline:
+            revoke_outstanding()
+            raise TimeoutError(f"Scan of {scan_path} did not finish within {timeout}s")
+        for result in [result for result in walks if result.ready()]:
+            shard = walks.pop(result)
+            try:
+                shard_repos = result.get(propagate=True)
+            except Exception as e:
+                logger.error(f"Scan shard {shard} failed: {e}")
+                report({"message": f"Error scanning {shard}: {e}", "path": shard, "type": "error"})
+                continue
+            enrich(shard_repos)
+            report({"message": f"Scanned: {shard}", "path": shard})
+        time.sleep(POLL_INTERVAL)
+
+    repositories = []
+    for result in enrichments:
+        if stopped:
+            result.revoke()
+            continue
+        try:
+            chunk = wait_for(result, max(1.0, deadline - time.monotonic()), should_stop=should_stop)
+        except TimeoutError:
+            revoke_outstanding()
+            raise
+        if chunk is None:
+            stopped = True
+            continue
+        repositories.extend(chunk)
+    for result in walks:
+        result.revoke()
+    return repositories, non_git_dirs
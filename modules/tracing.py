@@ -0,0 +1,184 @@
+"""
+Per-job tracing: nested, timed spans recorded in a bounded in-memory buffer
+and exported in the Chrome trace-event format (chrome://tracing, Perfetto).
+
+A trace is opened around a job; `span()` blocks inside it nest under the
+enclosing span, including on scanner threads started through `bind()`.
+Outside a trace, `span()` costs one context variable lookup.
+"""
+import os
+import time
+import functools
+import threading
+import contextvars
+from collections import OrderedDict
+
+# (trace, id of the enclosing span) for the code running in this context
+_current = contextvars.ContextVar("sentinel_trace", default=None)
+
+class Trace:
+    """Spans recorded for one job, capped at `max_spans` (later spans are counted as dropped)"""
+    def __init__(self, trace_id, name, max_spans):
+        self.id = trace_id
+        self.name = name
+        self.max_spans = max_spans
+        self.started = time.perf_counter_ns()
+        self.spans = []
+        self.dropped = 0
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def _next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _record(self, span):
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def to_chrome(self):
+        """The trace as a Chrome trace-event JSON object, with times in microseconds"""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+            dropped = self.dropped
+        events = []
+        threads = {}
+        for span_id, parent_id, name, start, end, thread_id, thread_name, args in spans:
+            threads[thread_id] = thread_name
+            events.append({
+                "name": name,
+                "cat": name.split(".", 1)[0].split(" ", 1)[0],
+                "ph": "X",
+                "ts": (start - self.started) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": pid,
+                "tid": thread_id,
+                "args": {**args, "span_id": span_id, "parent_id": parent_id}
+            })
+        events.sort(key=lambda event: event["ts"])
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+            for thread_id, thread_name in threads.items()
+        ]
+        metadata.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"sentinel {self.name}"}})
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {"trace_id": self.id, "name": self.name, "spans": len(spans), "dropped_spans": dropped}
+        }
+
+class _Span:
+    __slots__ = ("name", "args", "trace", "span_id", "parent_id", "started", "token")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.trace = None
+
+    def __enter__(self):
+        current = _current.get()
+        if current is not None:
+            self.trace, self.parent_id = current
+            self.span_id = self.trace._next_id()
+            self.token = _current.set((self.trace, self.span_id))
+            self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.trace is not None:
+            ended = time.perf_counter_ns()
+            _current.reset(self.token)
+            if exc_info[0] is not None:
+                self.args["error"] = repr(exc_info[1])
+            thread = threading.current_thread()
+            self.trace._record((
+                self.span_id, self.parent_id, self.name, self.started, ended,
+                thread.ident, thread.name, self.args
+            ))
+        return False
+
+class Tracer:
+    """Keeps the traces of the last `max_traces` traced jobs"""
+    def __init__(self, max_traces=20, max_spans=50000):
+        self.enabled = False
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._traces = OrderedDict()
+
+    def trace(self, trace_id, name):
+        """Context manager recording the spans of its block under `trace_id` (a no-op while disabled)"""
+        return _TraceScope(self, trace_id, name)
+
+    def _open(self, trace_id, name):
+        trace = Trace(trace_id, name, self.max_spans)
+        with self._lock:
+            self._traces[trace_id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        return trace
+
+    def get(self, trace_id):
+        """A recorded trace, or None if unknown or already evicted"""
+        with self._lock:
+            return self._traces.get(trace_id)
+
+class _TraceScope:
+    __slots__ = ("tracer", "trace_id", "name", "span", "token")
+
+    def __init__(self, tracer, trace_id, name):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.name = name
+        self.span = None
+        self.token = None
+
+    def __enter__(self):
+        if self.tracer.enabled:
+            trace = self.tracer._open(self.trace_id, self.name)
+            self.token = _current.set((trace, 0))
+            self.span = _Span(self.name, {"trace_id": self.trace_id}).__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.token is not None:
+            self.span.__exit__(*exc_info)
+            _current.reset(self.token)
+        return False
+
+def span(name, **args):
+    """Context manager timing its block as a span of the current trace, if any"""
+    return _Span(name, args)
+
+def traced(name):
+    """Decorator recording each call as a span of the current trace, if any"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def bind(func):
+    """
+    Carry the current trace into a function that runs on another thread.
+    Returns `func` unchanged when no trace is active.
+    """
+    if _current.get() is None:
+        return func
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+def active():
+    """Whether the calling code runs inside a trace"""
+    return _current.get() is not None
+
+tracer = Tracer()
@@ -0,0 +1,129 @@
+"""
+One writer, many readers across server worker processes.
+
+Under a multi-process server (see gunicorn.conf.py) exactly one worker is the
+writer: it holds an exclusive lock on a file in the data directory, runs the
+background services, jobs and progress streams, and is the only process that
+writes the inventory. Every other worker is a reader. Readers answer read-only
+routes from the inventory file the writer keeps up to date. They forward every
+other request to the writer over a unix socket served by a thread in the writer.
+
+When the writer exits, the OS releases its lock and the replacement worker
+the server forks becomes the writer.
+"""
+import os
+import fcntl
+import socket
+import logging
+import threading
+import http.client
+from urllib.parse import quote
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+logger = logging.getLogger(__name__)
+
+# Roles of a server process
+SINGLE = "single"    # The only process (app.py, asgi.py): serves everything itself
+WRITER = "writer"
+READER = "reader"
+
+# Connection-level headers that must not be passed through a proxy (RFC 9110, section 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade"
+}
+
+class WriterLock:
+    """Non-blocking exclusive lock on a file, held until release() or process exit"""
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """Take the lock if no other process holds it; returns whether this process holds it"""
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection to a server listening on a unix socket"""
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    # Forwarded requests were already logged by the worker that received them
+    def log_request(self, *args, **kwargs):
+        pass
+
+def serve_writer(app, socket_path):
+    """
+    Serve `app` on a unix socket from a background thread, for requests forwarded by readers.
+
+    Returns:
+        BaseWSGIServer: The running server (call shutdown() to stop it).
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = make_server(f"unix://{socket_path}", 0, app, threaded=True, request_handler=_QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, name="writer-server", daemon=True).start()
+    logger.info(f"Serving forwarded requests on {socket_path}")
+    return server
+
+def forward(request, response_class, socket_path):
+    """
+    Forward a Flask request to the writer and stream its response back, so
+    progress streams relay events as the writer sends them.
+
+    Returns:
+        Response: The writer's response, or a 502 when the writer cannot be reached.
+    """
+    target = quote(request.path)
+    if request.query_string:
+        target += "?" + request.query_string.decode("latin-1")
+    headers = {name: value for name, value in request.headers.items()
+               if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != "host"}
+
+    connection = _UnixHTTPConnection(socket_path)
+    try:
+        connection.request(request.method, target, body=request.get_data(), headers=headers)
+        upstream = connection.getresponse()
+    except OSError as e:
+        connection.close()
+        logger.error(f"Could not forward {request.method} {request.path} to the writer: {e}")
+        return response_class('{"error": "Writer process unavailable, try again shortly"}\n',
+                              status=502, mimetype="application/json")
+
+    def body():
+        try:
+            while True:
+                chunk = upstream.read1(65536)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            connection.close()
+
+    # The receiving worker's server sets its own Date and Server headers
+    response_headers = [(name, value) for name, value in upstream.getheaders()
+                        if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in ("date", "server")]
+    return response_class(body(), status=upstream.status, headers=response_headers, direct_passthrough=True)
@@ -1,336 +1,340 @@
 #!/usr/bin/env python3
+"""
+Headless repository scan for cron jobs and pipelines.
+
+Walks the scan paths with the web app's engine (modules.scanner), reads the git
+state of each repository and streams one record per repository to stdout as
+soon as it is ready:
+
+    python scan_git_repos.py                          # the configured scan_directory, as NDJSON
+    python scan_git_repos.py ~/code ~/work --format csv > repositories.csv
+    python scan_git_repos.py --incremental --previous last.ndjson > next.ndjson
+    python scan_git_repos.py --incremental --save     # update the app's inventory
+
+Logs and a one-line JSON summary go to stderr. Exit status: 0 when every scan
+path and repository was read, 1 when some were not, 2 on a usage or
+configuration error, 130 when interrupted.
+"""
 import os
+import sys
+import csv
 import json
-from datetime import datetime
-from pathlib import Path
+import time
 import logging
+import argparse
 import concurrent.futures
-import gitignore_parser # Correct import
-from tabulate import tabulate
-
-# --- Logging Setup ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-# --- Constants ---
-DATA_DIR = Path(__file__).parent / "data"
-CONFIG_FILE = DATA_DIR / "config.json"
-SCAN_RESULTS_FILE = DATA_DIR / "git_repos_scan.json"
-GITIGNORE_PATTERNS_FILE = DATA_DIR / "gitignore_patterns.json" # Keep for potential future use or reference
-
-# --- Configuration Loading ---
-def load_config():
-    """Load configuration from JSON file or create default if not exists"""
-    DATA_DIR.mkdir(exist_ok=True) # Ensure data directory exists
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                logger.info(f"Loaded configuration from {CONFIG_FILE}")
-                # Ensure essential keys exist
-                config.setdefault("scan_directory", os.path.expanduser("~/code"))
-                config.setdefault("max_depth", 10)
-                config.setdefault("verbose", False)
-                config.setdefault("excluded_dirs", [
-                    "node_modules", ".git", "venv", "__pycache__", "dist", "build",
-                    ".terraform", "modules", ".venv", "env" # Added common ones
-                ])
-                config.setdefault("high_level_dirs", []) # Keep if needed for other logic
-                return config
-        except json.JSONDecodeError:
-            logger.error(f"Error decoding JSON from {CONFIG_FILE}. Using default config.")
-        except Exception as e:
-            logger.error(f"Error loading config: {e}. Using default config.")
-
-    # Default configuration if file doesn't exist or is invalid
-    default_config = {
-        "scan_directory": os.path.expanduser("~/code"),
-        "max_depth": 10,
-        "verbose": False,
-        "excluded_dirs": [
-            "node_modules", ".git", "venv", "__pycache__", "dist", "build",
-            ".terraform", "modules", ".venv", "env"
-        ],
-        "high_level_dirs": [ # Example high-level dirs, adjust as needed
-             "Workshop", "AI-Workshop", "K8s-Workshop", "Writing-Workshop",
-             "Proposal-Shop", "Azure-Workshop", "AWS-Workshop", "Tech-Challenges",
-             "Misc-Workshop", "Orgs", "DevSecOps", "Personal-projects", "Google-Workshop"
-        ]
-    }
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(default_config, f, indent=2)
-        logger.info(f"Created default configuration file at {CONFIG_FILE}")
-    except IOError as e:
-        logger.error(f"Could not write default config file: {e}")
-    return default_config
-
-# --- .gitignore Handling ---
-def get_gitignore_matcher(directory):
-    """Creates a gitignore_parser matcher for a given directory, if .gitignore exists."""
-    gitignore_path = Path(directory) / ".gitignore"
-    if gitignore_path.is_file():
-        try:
-            # Pass the path directly to parse_gitignore
-            return gitignore_parser.parse_gitignore(gitignore_path)
-        except Exception as e:
-            logger.warning(f"Could not parse .gitignore file at {gitignore_path}: {e}")
-    return None # No .gitignore or error parsing
+from datetime import datetime
+
+from modules.config import ConfigManager, data_dir, defaults
+from modules.scanner import git_signature
+from modules.parallel_scan import plan_scan, scan_shard, enrich_chunk, chunked, dedupe_scan_paths, pool_context
+
+logger = logging.getLogger("scan_git_repos")
+
+EXIT_OK = 0
+EXIT_ERRORS = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
 
-# --- Directory Scanning (Parallelized) ---
-def scan_directory(dir_path: Path, config, current_depth=0, parent_gitignore_matcher=None):
+# Columns of --format csv and table; nested fields (remotes, commits, changed files) are left out
+CSV_FIELDS = [
+    "id", "name", "path", "current_branch", "status", "has_changes", "ahead", "behind",
+    "remote_url", "last_modified", "description", "error"
+]
+
+# --- Scan ---
+
+def configure_logging(verbose):
     """
-    Scans a single directory. Returns lists of git repos and non-git dirs found within.
-    Handles depth limits, exclusions, and .gitignore.
+    Log to stderr: this script's errors, and with verbose everything the engine
+    logs too (visited directories, unreadable paths, remotes without a push URL)
     """
-    logger.info(f"Scanning directory: {dir_path} (depth: {current_depth})")
-    
-    if current_depth > config["max_depth"]:
-        logger.info(f"Max depth reached for {dir_path}")
-        return [], []
-
-    git_repos_found = []
-    non_git_dirs_found = [] # Only top-level non-git dirs relative to scan_directory
-
-    # --- .gitignore Logic ---
-    current_gitignore_matcher = get_gitignore_matcher(dir_path)
-    def is_ignored(path_to_check):
-        # Make sure path_to_check is a Path object
-        path_obj = Path(path_to_check) if isinstance(path_to_check, str) else path_to_check
-        # Check parent matcher first, then current directory's matcher
-        if parent_gitignore_matcher and parent_gitignore_matcher(str(path_obj)):
-            return True
-        if current_gitignore_matcher and current_gitignore_matcher(str(path_obj)):
-            return True
-        # Check config exclusions (simple basename check)
-        if path_obj.name in config.get("excluded_dirs", []):
-             return True
-        return False
-
-    # --- Check Current Directory ---
-    is_git_repo = (Path(dir_path) / ".git").is_dir()
-    parent_scan_dir = Path(config["scan_directory"])
-    is_top_level_scan = dir_path.parent == parent_scan_dir
-
-    # Check if directory exists and is accessible
-    try:
-        if not dir_path.exists():
-            logger.warning(f"Directory does not exist: {dir_path}")
-            return [], []
-        if not dir_path.is_dir():
-            logger.warning(f"Not a directory: {dir_path}")
-            return [], []
-    except Exception as e:
-        logger.error(f"Error checking directory {dir_path}: {e}")
-        return [], []
-
-    if is_git_repo:
-        logger.debug(f"Found Git repository: {dir_path}")
-        git_repos_found.append(dir_path)
-        # Don't scan further into a git repo
-        return git_repos_found, non_git_dirs_found
-    elif is_top_level_scan and dir_path != config["scan_directory"]:
-         # Only add non-git dirs directly under the main scan_directory
-         # Exclude high_level_dirs if specified
-         if Path(dir_path).name not in config.get("high_level_dirs", []):
-             logger.debug(f"Found non-Git directory: {dir_path}")
-             non_git_dirs_found.append(dir_path)
-         else:
-             logger.debug(f"Skipping high-level directory: {dir_path}")
-
-
-
-    # --- Scan Subdirectories ---
-    subdirs_to_scan = []
-    try:
-        for item in dir_path.iterdir():
-            if item.is_dir():
-                # Check if this subdir should be ignored
-                if is_ignored(item):
-                    logger.debug(f"Ignoring directory due to exclusion or .gitignore: {item}")
-                    continue
-                subdirs_to_scan.append(item)
-    except PermissionError:
-        logger.warning(f"Permission denied accessing: {dir_path}")
-        return git_repos_found, non_git_dirs_found # Return what we have so far
-    except FileNotFoundError:
-        logger.warning(f"Directory not found (possibly removed during scan): {dir_path}")
-        return git_repos_found, non_git_dirs_found
-
-    # --- Parallel Subdirectory Scanning ---
-    # Pass the combined matcher (parent + current) to children
-    effective_matcher = current_gitignore_matcher or parent_gitignore_matcher # TODO: Refine combining logic if needed
-
-    # Use ThreadPoolExecutor for I/O-bound tasks like scanning directories
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        # Map scan_directory function to subdirs
-        future_to_subdir = {
-            executor.submit(scan_directory, subdir, config, current_depth + 1, effective_matcher): subdir
-            for subdir in subdirs_to_scan
-        }
-        for future in concurrent.futures.as_completed(future_to_subdir):
-            subdir = future_to_subdir[future]
-            try:
-                sub_git_repos, sub_non_git_dirs = future.result()
-                git_repos_found.extend(sub_git_repos)
-                non_git_dirs_found.extend(sub_non_git_dirs)
-            except Exception as exc:
-                logger.error(f"Subdirectory scan {subdir} generated an exception: {exc}")
-
-    return git_repos_found, non_git_dirs_found
-
-
-# --- Data Aggregation ---
-def get_repo_info(repo_path):
-    """Get basic information about a git repository (no size)"""
-    path_obj = Path(repo_path)
-    try:
-        last_modified_time = path_obj.stat().st_mtime
-        last_modified_iso = datetime.fromtimestamp(last_modified_time).isoformat()
-    except OSError as e:
-        logger.warning(f"Could not get stats for {repo_path}: {e}")
-        last_modified_iso = "N/A"
-
-    info = {
-        "path": str(path_obj.resolve()), # Store absolute path
-        "name": path_obj.name,
-        "last_modified": last_modified_iso,
-        # "size_mb": round(get_dir_size(repo_path) / (1024 * 1024), 2) # Removed
-    }
-    return info
+    logging.basicConfig(stream=sys.stderr, format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=logging.INFO if verbose else logging.WARNING)
+    logging.getLogger("modules").setLevel(logging.INFO if verbose else logging.ERROR)
 
-def get_dir_info(dir_path):
-    """Get basic information about a non-git directory (no size)"""
-    path_obj = Path(dir_path)
-    try:
-        last_modified_time = path_obj.stat().st_mtime
-        last_modified_iso = datetime.fromtimestamp(last_modified_time).isoformat()
-    except OSError as e:
-        logger.warning(f"Could not get stats for {dir_path}: {e}")
-        last_modified_iso = "N/A"
-
-    info = {
-        "path": str(path_obj.resolve()), # Store absolute path
-        "name": path_obj.name,
-        "last_modified": last_modified_iso,
-        # "size_mb": round(get_dir_size(dir_path) / (1024 * 1024), 2) # Removed
-    }
-    return info
-
-# --- Output Formatting ---
-def print_table(data, title):
-    """Print data in a table format (no size column)"""
-    if not data:
-        print(f"\nNo {title} found.")
-        return
-
-    # headers = ["Name", "Path", "Last Modified", "Size (MB)"] # Original
-    headers = ["Name", "Path", "Last Modified"] # Updated
-    table_data = []
-
-    for item in data:
-        # Format date for better readability if not N/A
-        formatted_date = "N/A"
-        if item["last_modified"] != "N/A":
-            try:
-                date_obj = datetime.fromisoformat(item["last_modified"])
-                formatted_date = date_obj.strftime("%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                 formatted_date = item["last_modified"] # Keep as is if format is unexpected
-
-        table_data.append([
-            item["name"],
-            item["path"],
-            formatted_date,
-            # item["size_mb"] # Removed
-        ])
-
-    print(f"\n{title}:")
-    # Sort by name for consistent output
-    table_data.sort(key=lambda x: x[0])
-    print(tabulate(table_data, headers=headers, tablefmt="grid"))
-
-# --- Main Execution ---
-if __name__ == "__main__":
-    import argparse
-    
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description='Scan for git repositories in specified directories')
-    parser.add_argument('--force-scan', action='store_true',
-                      help='Force a fresh scan even if results exist')
-    args = parser.parse_args()
-    
-    # Load configuration
-    config = load_config()
-
-    # Set logging level based on config
-    if config.get("verbose", False):
-        logger.setLevel(logging.DEBUG)
-        logger.info("Verbose logging enabled.")
+def load_config(save):
+    """
+    The app's configuration. Only a --save run creates the config file; any other
+    run falls back to the defaults without writing anything.
+    """
+    config_manager = ConfigManager()
+    if save:
+        return config_manager.init_config()
+    if not os.path.exists(config_manager.config_file):
+        return defaults()
+    return config_manager.get_config()
+
+def load_previous(path):
+    """
+    Repository records of an earlier scan, by path: an NDJSON file written by this
+    script, or the app's stored inventory when path is None.
+    """
+    if path is None:
+        repositories = ConfigManager().get_scan_results().get("git_repositories", [])
     else:
-        logger.setLevel(logging.INFO)
+        with open(path, 'r') as f:
+            repositories = [json.loads(line) for line in f if line.strip()]
+    return {repo["path"]: repo for repo in repositories if repo.get("path")}
 
+class HeadlessScan:
+    """
+    Scans paths in a pool of `jobs` worker processes (one thread when jobs is 1).
 
-    scan_start_time = datetime.now()
-    logger.info(f"Starting scan of '{config['scan_directory']}'...")
-    logger.info(f"Max depth: {config['max_depth']}")
-    logger.info(f"Excluded directory names: {config.get('excluded_dirs', [])}")
-    logger.info(f"High-level directories to skip scanning into: {config.get('high_level_dirs', [])}")
+    Each top-level subdirectory of a scan path is walked as one task, and the
+    repositories it finds are read in chunks as soon as its walk returns, as in
+    ProcessPoolScanner. With `previous` records, a repository whose git state is
+    unchanged since (same git_signature) is not read again: its record is reused.
+    """
+    def __init__(self, config, max_depth, jobs=1, enrich=True, previous=None, verbose=False):
+        self.config = config
+        self.max_depth = max_depth
+        self.jobs = jobs
+        self.enrich = enrich
+        self.previous = previous or {}
+        self.verbose = verbose
+        self.directories = []
+        self.stats = {"repositories": 0, "read": 0, "reused": 0, "errors": 0}
+        self._tasks = {}
+
+    def _reusable(self, path):
+        previous = self.previous.get(path)
+        if previous is None or "error" in previous:
+            return None
+        # An unenriched record cannot stand in for an enriched one
+        if self.enrich and "status" not in previous:
+            return None
+        return previous if previous.get("git_signature") == git_signature(path) else None
+
+    def _submit(self, executor, kind, label, func, *args):
+        future = executor.submit(func, *args)
+        self._tasks[future] = (kind, label)
+        return future
+
+    def _read(self, executor, paths, emit):
+        """Emit the reusable records of `paths` and submit the others to be read"""
+        self.stats["repositories"] += len(paths)
+        unchanged, to_read = [], []
+        for path in paths:
+            previous = self._reusable(path)
+            if previous is not None:
+                unchanged.append(previous)
+            else:
+                to_read.append(path)
+        self.stats["reused"] += len(unchanged)
+        emit(unchanged)
+        return {
+            self._submit(executor, "read", chunk[0], enrich_chunk, chunk, self.config, self.enrich)
+            for chunk in chunked(to_read)
+        }
 
+    def run(self, scan_paths, emit):
+        """
+        Scan every path, calling emit(records) with each batch of records as it completes.
+
+        Returns:
+            dict: Counts of repositories found, read, reused and errors.
+        """
+        if self.jobs > 1:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.jobs, mp_context=pool_context(),
+                initializer=configure_logging, initargs=(self.verbose,)
+            )
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        try:
+            pending = set()
+            for scan_path in scan_paths:
+                if not os.path.isdir(scan_path):
+                    logger.error(f"Not a directory: {scan_path}")
+                    self.stats["errors"] += 1
+                    continue
+                root_repos, non_git_dirs, shards = plan_scan(scan_path, self.config, self.max_depth)
+                self.directories.extend(non_git_dirs)
+                pending |= self._read(executor, root_repos, emit)
+                for shard in shards:
+                    pending.add(self._submit(executor, "walk", shard, scan_shard, shard, self.config, self.max_depth, scan_path))
+
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    kind, label = self._tasks.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Scan task for {label} failed: {e}")
+                        self.stats["errors"] += 1
+                        continue
+                    if kind == "walk":
+                        pending |= self._read(executor, result, emit)
+                        continue
+                    self.stats["read"] += len(result)
+                    self.stats["errors"] += sum(1 for record in result if "error" in record)
+                    emit(result)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        return self.stats
+
+# --- Output ---
+
+def _csv_row(record):
+    remotes = record.get("remotes") or []
+    return {**record, "remote_url": remotes[0].get("fetch_url", "") if remotes else ""}
+
+class NdjsonOutput:
+    """One JSON record per line, flushed per batch so a pipe sees records as they complete"""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, records):
+        if records:
+            self.stream.write("".join(json.dumps(record) + "\n" for record in records))
+            self.stream.flush()
+
+    def close(self):
+        pass
+
+class CsvOutput(NdjsonOutput):
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, records):
+        if records:
+            self.writer.writerows(_csv_row(record) for record in records)
+            self.stream.flush()
+
+class TableOutput(NdjsonOutput):
+    """A table sorted by name, printed once the scan is done"""
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.rows = []
+
+    def write(self, records):
+        self.rows.extend(_csv_row(record) for record in records)
+
+    def close(self):
+        from tabulate import tabulate
+        columns = ["name", "path", "current_branch", "status", "last_modified"]
+        rows = sorted(([row.get(column, "") for column in columns] for row in self.rows), key=lambda row: row[0])
+        self.stream.write(tabulate(rows, headers=columns) + "\n")
+
+OUTPUTS = {"ndjson": NdjsonOutput, "csv": CsvOutput, "table": TableOutput}
+
+# --- Inventory ---
+
+def save_to_inventory(scan_paths, config, repositories, directories):
+    """
+    Store the scan in the app's inventory like a scan job does. Refused while a
+    server's writer process holds the inventory (see modules/writer.py).
 
-    # --- Perform Scan ---
-    # The initial call to scan_directory handles the parallel execution within it
+    Returns:
+        int: The inventory generation after the save.
+    """
+    from modules import writer
+    from modules.inventory import InventoryStore
+
+    lock = writer.WriterLock(str(data_dir() / "writer.lock"))
+    if not lock.acquire():
+        raise RuntimeError("A running server owns the inventory; start the scan through its API instead")
     try:
-        # Convert the scan_directory string to a Path object
-        scan_dir_path = Path(config["scan_directory"])
-        git_repos, non_git_repos = scan_directory(
-            scan_dir_path,
-            config,
-            current_depth=0,
-            parent_gitignore_matcher=None # No parent matcher at the top level
-        )
-    except Exception as e:
-        logger.critical(f"An unexpected error occurred during the main scan: {e}", exc_info=True)
-        git_repos, non_git_repos = [], [] # Ensure lists are initialized
-
-    scan_end_time = datetime.now()
-    scan_duration = scan_end_time - scan_start_time
-    logger.info(f"Scan completed in {scan_duration}")
-
-
-    # --- Process Results ---
-    logger.info("Processing scan results...")
-    result_data = {
-        "scan_time": datetime.now().isoformat(),
-        "scan_duration_seconds": scan_duration.total_seconds(),
-        "scan_directory": config["scan_directory"],
-        "git_repositories": sorted([get_repo_info(repo) for repo in git_repos], key=lambda x: x['name']),
-        "non_git_directories": sorted([get_dir_info(repo) for repo in non_git_repos], key=lambda x: x['name']),
-        "config_used": config # Include config for reference
-    }
+        inventory = InventoryStore(ConfigManager())
+        result_data = {
+            "scan_time": datetime.now().isoformat(),
+            "scan_directory": ", ".join(scan_paths),
+            "git_repositories": repositories,
+            "non_git_directories": directories,
+        }
+        if scan_paths == [os.path.abspath(config.get("scan_directory", ""))]:
+            summary = inventory.replace_scan(result_data)
+        else:
+            summary = inventory.merge_scan(scan_paths, result_data)
+        return summary["generation"]
+    finally:
+        lock.release()
+
+# --- Main ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scan directories for git repositories and stream one record per repository")
+    parser.add_argument("paths", nargs="*", help="Directories to scan (default: scan_directory from the config)")
+    parser.add_argument("--depth", type=int, help="Maximum directory depth (default: max_depth from the config)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes walking and reading repositories; 1 scans in this process (default: CPU count)")
+    parser.add_argument("--enrich", action=argparse.BooleanOptionalAction, default=True,
+                        help="Read each repository's git state: branch, remotes, commits, changes (default: on)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse the previous record of repositories whose git state is unchanged")
+    parser.add_argument("--previous", metavar="FILE",
+                        help="NDJSON output of an earlier run to reuse records from (default: the app's inventory)")
+    parser.add_argument("--format", choices=sorted(OUTPUTS), default="ndjson", help="Output on stdout (default: ndjson)")
+    parser.add_argument("--save", action="store_true", help="Also store the results in the app's inventory")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log progress to stderr")
+    # Accepted for existing cron entries; every run scans
+    parser.add_argument("--force-scan", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.save and not args.enrich:
+        parser.error("--save needs enriched records; drop --no-enrich")
+    if args.previous and not args.incremental:
+        parser.error("--previous only applies with --incremental")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging(args.verbose)
 
-    # --- Save Results ---
     try:
-        with open(SCAN_RESULTS_FILE, 'w') as f:
-            json.dump(result_data, f, indent=2)
-        logger.info(f"Results saved to {SCAN_RESULTS_FILE}")
-    except IOError as e:
-        logger.error(f"Could not write results file: {e}")
-    except TypeError as e:
-         logger.error(f"Could not serialize results to JSON: {e}")
-
-
-    # --- Print Summary ---
-    print(f"\n--- Scan Summary ---")
-    print(f"Scan Directory: {config['scan_directory']}")
-    print(f"Scan Duration: {scan_duration}")
-    print(f"Found {len(result_data['git_repositories'])} Git-tracked repositories")
-    print(f"Found {len(result_data['non_git_directories'])} top-level non-Git directories")
-    print(f"Results saved to: {SCAN_RESULTS_FILE}")
-
-    # Print tables if verbose mode is enabled
-    if config.get("verbose", False):
-        print_table(result_data["git_repositories"], "Git Repositories")
-        print_table(result_data["non_git_directories"], "Non-Git Directories (Top-Level)")
-
-    logger.info("Script finished.")
\ No newline at end of file
+        config = load_config(args.save)
+        previous = load_previous(args.previous) if args.incremental else None
+    except (OSError, ValueError) as e:
+        logger.error(f"Cannot load the configuration or previous results: {e}")
+        return EXIT_USAGE
+
+    scan_paths = dedupe_scan_paths(args.paths or [config.get("scan_directory", os.path.expanduser("~/code"))])
+    max_depth = args.depth if args.depth is not None else config.get("max_depth", 10)
+    output = OUTPUTS[args.format](sys.stdout)
+    repositories = []
+
+    def emit(records):
+        if args.save:
+            repositories.extend(records)
+        output.write(records)
+
+    started = time.perf_counter()
+    scan = HeadlessScan(config, max_depth, jobs=args.jobs, enrich=args.enrich, previous=previous,
+                        verbose=args.verbose)
+    try:
+        stats = scan.run(scan_paths, emit)
+        output.close()
+    except KeyboardInterrupt:
+        logger.error("Interrupted")
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); keep Python from complaining at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_ERRORS
+
+    summary = {
+        "scan_paths": scan_paths,
+        **stats,
+        "directories": len(scan.directories),
+        "enriched": args.enrich,
+        "jobs": args.jobs,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if args.save:
+        try:
+            summary["generation"] = save_to_inventory(scan_paths, config, repositories, scan.directories)
+        except Exception as e:
+            logger.error(f"Could not save the results: {e}")
+            summary["errors"] += 1
+    print(json.dumps(summary), file=sys.stderr)
+    return EXIT_ERRORS if summary["errors"] else EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,6 +21,19 @@
         return date.toLocaleDateString();
     }
 
+    // Helper: Format a byte count (disk usage)
+    function formatBytes(bytes) {
+        if (bytes === undefined || bytes === null) return 'Not measured yet';
+        const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+        let value = bytes;
+        let unit = 0;
+        while (value >= 1024 && unit < units.length - 1) {
+            value /= 1024;
+            unit += 1;
+        }
+        return `${value.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
+    }
+
     // Component: ThemeToggleButton
     function ThemeToggleButton({ theme, toggleTheme }) {
         return e(
@@ -206,7 +219,8 @@
                         },
                         e('option', { value: 'name' }, 'Name'),
                         e('option', { value: 'last_modified' }, 'Last Modified'),
-                        e('option', { value: 'status' }, 'Status')
+                        e('option', { value: 'status' }, 'Status'),
+                        e('option', { value: 'size' }, 'Size')
                     )
                 )
             )
@@ -478,6 +492,18 @@
                                 'Last Modified'
                             ),
                             e('p', { className: 'text-sm text-gray-300' }, new Date(selectedRepo.last_modified).toLocaleString())
+                        ),
+                        e(
+                            'div',
+                            null,
+                            e('h3', { className: 'text-lg font-semibold mb-1 flex items-center' }, 
+                                e(Icon, {name: 'hard-drive', className: 'mr-2 text-teal-400'}), 
+                                'Disk Usage'
+                            ),
+                            e('p', { className: 'text-sm text-gray-300' }, 
+                                formatBytes(selectedRepo.size),
+                                selectedRepo.size_details && ` (.git ${formatBytes(selectedRepo.size_details.git)})`
+                            )
                         )
                     ),
                     // Action Buttons
@@ -782,8 +808,10 @@
         const [pullInProgress, setPullInProgress] = React.useState(false);
         const [eventSource, setEventSource] = React.useState(null);
         const [searchQuery, setSearchQuery] = React.useState('');
+        const [searchRanking, setSearchRanking] = React.useState(null); // Server-side ranked ids, or null
         const [sortBy, setSortBy] = React.useState('name');
         const [loadingStates, setLoadingStates] = React.useState({});
+        const [bulkPull, setBulkPull] = React.useState(null); // { running, message } for "Pull shown"
         const [theme, setTheme] = React.useState(localStorage.getItem('theme') || 'dark');
         // New state variables for Git Status
         const [repoStatusOutput, setRepoStatusOutput] = React.useState(null);
@@ -818,7 +846,39 @@
             setTheme(prevTheme => prevTheme === 'light' ? 'dark' : 'light');
         };
 
+        // Queries of 3+ characters go to the server-side index (remotes, descriptions,
+        // branches and commit messages); shorter ones fall back to a local name/path filter
+        React.useEffect(() => {
+            const query = searchQuery.trim();
+            if (query.length < 3) {
+                setSearchRanking(null);
+                return;
+            }
+            const controller = new AbortController();
+            const timer = setTimeout(async () => {
+                try {
+                    const response = await fetch(`/api/search?q=${encodeURIComponent(query)}&per_page=500`, { signal: controller.signal });
+                    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                    const data = await response.json();
+                    setSearchRanking(data.results.map(repo => repo.id));
+                } catch (error) {
+                    if (error.name !== 'AbortError') {
+                        console.error("Error searching repositories:", error);
+                        setSearchRanking(null);
+                    }
+                }
+            }, 200);
+            return () => {
+                clearTimeout(timer);
+                controller.abort();
+            };
+        }, [searchQuery]);
+
         const filteredRepositories = React.useMemo(() => {
+            if (searchRanking) {
+                const byId = new Map(repositories.map(repo => [repo.id, repo]));
+                return searchRanking.map(id => byId.get(id)).filter(Boolean);
+            }
             return repositories.filter(repo => 
                 repo.name.toLowerCase().includes(searchQuery.toLowerCase()) ||
                 repo.path.toLowerCase().includes(searchQuery.toLowerCase())
@@ -826,9 +886,13 @@
                 if (sortBy === 'modified') {
                     return new Date(b.last_modified) - new Date(a.last_modified);
                 }
+                if (sortBy === 'size') {
+                    // Largest first; repositories not measured yet last
+                    return (b.size ?? -1) - (a.size ?? -1);
+                }
                 return a.name.localeCompare(b.name);
             });
-        }, [repositories, searchQuery, sortBy]);
+        }, [repositories, searchQuery, searchRanking, sortBy]);
 
         const closeRepoDetails = () => {
             if (eventSource) {
@@ -874,7 +938,7 @@
                 const data = JSON.parse(event.data);
                 if (data.status === "heartbeat") return;
 
-                if (data.status === "completed" || data.status === "error") {
+                if (data.status === "completed" || data.status === "error" || data.status === "cancelled") {
                     setPullInProgress(false);
                     setPullLogs(logs => [...logs, {
                         time: new Date().toLocaleTimeString(),
@@ -1051,7 +1115,7 @@
                         fetchRepositories(); // Refresh the main list
                         newScanEventSource.close();
                         setScanEventSource(null);
-                    } else if (data.status === 'error') {
+                    } else if (data.status === 'error' || data.status === 'cancelled') {
                         setIsScanning(false);
                         setScanError(data.message || 'An unknown error occurred during scan.');
                         newScanEventSource.close();
@@ -1074,6 +1138,40 @@
             }
         };
 
+        const pullShownRepositories = async () => {
+            setBulkPull({ running: true, message: 'Starting bulk pull...' });
+            try {
+                const response = await fetch('/api/repositories/pull', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ ids: filteredRepositories.map(repo => repo.id) })
+                });
+                const result = await response.json();
+                if (!result.job_id) throw new Error(result.error || 'Error starting bulk pull');
+
+                // Follow the aggregated progress of the bulk pull job
+                const jobEvents = new EventSource(`/api/jobs/${result.job_id}/progress`);
+                jobEvents.onmessage = (event) => {
+                    const data = JSON.parse(event.data);
+                    if (data.status === 'progress' && data.progress) {
+                        const p = data.progress;
+                        setBulkPull({ running: true, message: `Pulled ${p.pulled}, failed ${p.failed}, skipped ${p.skipped} of ${p.total}` });
+                    } else if (data.status === 'completed' || data.status === 'error' || data.status === 'cancelled') {
+                        setBulkPull({ running: false, message: data.message });
+                        jobEvents.close();
+                        fetchRepositories();
+                    }
+                };
+                jobEvents.onerror = () => {
+                    jobEvents.close();
+                    setBulkPull({ running: false, message: 'Lost connection to bulk pull progress' });
+                };
+            } catch (error) {
+                console.error('Error starting bulk pull:', error);
+                setBulkPull({ running: false, message: error.message });
+            }
+        };
+
         const fetchRepositories = async () => {
             setLoading(true); // For initial repo list load or re-fetch
             try {
@@ -1137,6 +1235,14 @@
                         'div',
                         { className: 'text-sm text-teal-200 bg-teal-500/20 px-3 py-1 rounded-full' }, // Updated color
                         `Showing ${filteredRepositories.length} of ${repositories.length} repositories`
+                    ),
+                    filteredRepositories.length > 0 && e('div', { className: 'flex items-center gap-3' },
+                        bulkPull && e('span', { className: 'text-sm text-gray-300' }, bulkPull.message),
+                        e('button', {
+                            className: `glass-button px-4 py-2 text-sm flex items-center ${bulkPull && bulkPull.running ? 'opacity-50 cursor-not-allowed' : ''}`,
+                            disabled: !!(bulkPull && bulkPull.running),
+                            onClick: pullShownRepositories
+                        }, e(Icon, { name: 'download', className: 'mr-2' }), 'Pull shown')
                     )
                 ),
                 
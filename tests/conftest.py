@@ -0,0 +1,34 @@
+import sys
+import subprocess
+from pathlib import Path
+
+import pytest
+
+# The modules package and app entry points live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Keep config, inventory and state files out of the real data/ directory"""
+    path = tmp_path / "data"
+    monkeypatch.setenv("SENTINEL_DATA_DIR", str(path))
+    return path
+
+def init_repo(path):
+    """A git repository at path with one commit"""
+    path.mkdir(parents=True)
+    (path / "README").write_text("readme\n")
+    git = ["git", "-C", str(path), "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.run(git + ["init", "-q"], check=True)
+    subprocess.run(git + ["add", "README"], check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "Initial commit"], check=True)
+    return path
+
+@pytest.fixture
+def git_tree(tmp_path):
+    """A scan root holding repositories at several depths and a plain directory"""
+    root = tmp_path / "code"
+    for name in ("alpha", "group/beta", "group/nested/gamma"):
+        init_repo(root / name)
+    (root / "notes").mkdir()
+    return root
@@ -0,0 +1,90 @@
+import json
+import asyncio
+import threading
+
+import pytest
+
+@pytest.fixture
+def asgi():
+    import asgi
+    return asgi
+
+def http_scope(path, method="GET", headers=()):
+    return {
+        "type": "http", "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": list(headers), "client": ("127.0.0.1", 5000), "server": ("127.0.0.1", 8080),
+    }
+
+async def request(application, path, method="GET", body=b""):
+    messages = []
+    received = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if received:
+            return received.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        messages.append(message)
+
+    headers = [(b"content-type", b"application/json")] if body else []
+    await application(http_scope(path, method, headers), receive, send)
+    status = messages[0]["status"]
+    return status, b"".join(m.get("body", b"") for m in messages[1:])
+
+def test_flask_routes_are_served(asgi):
+    status, body = asyncio.run(request(asgi.application, "/api/repositories"))
+
+    assert status == 200
+    assert isinstance(json.loads(body), list)
+
+def test_flask_requests_run_concurrently_off_the_event_loop(asgi):
+    both_running = threading.Barrier(2, timeout=5)
+    threads = []
+
+    def run_wsgi_app(environ, start_response):
+        threads.append(threading.get_ident())
+        both_running.wait()
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"ok"]
+
+    application = asgi._WsgiToAsgi(run_wsgi_app)
+
+    async def main():
+        return await asyncio.gather(request(application, "/a"), request(application, "/b"))
+
+    # Would deadlock on the barrier if requests shared one thread
+    assert asyncio.run(main()) == [(200, b"ok"), (200, b"ok")]
+    assert len(set(threads)) == 2
+
+def test_scan_progress_streams_published_events(asgi):
+    messages = []
+    disconnect = asyncio.Event()
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if b'"status": "added"' in message.get("body", b""):
+            disconnect.set()
+
+    async def main():
+        stream = asyncio.create_task(asgi.application(http_scope("/api/scan/progress"), receive, send))
+        while len(messages) < 2:
+            await asyncio.sleep(0.01)
+        asgi.event_hub.publish("scan", {"status": "added", "message": "Repository added"})
+        await asyncio.wait_for(stream, 5)
+
+    asyncio.run(main())
+
+    assert messages[0]["status"] == 200
+    assert dict(messages[0]["headers"])[b"content-type"] == b"text/event-stream"
+    frames = b"".join(m.get("body", b"") for m in messages[1:]).decode()
+    initial, event = frames.strip().split("\n\n")[:2]
+    assert json.loads(initial[len("data: "):]) == {"status": "idle"}
+    assert event.startswith("id: ")
+    assert json.loads(event.split("data: ", 1)[1]) == {"status": "added", "message": "Repository added"}
+    assert asgi.event_hub.subscriber_count("scan") == 0
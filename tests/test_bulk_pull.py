@@ -0,0 +1,136 @@
+import time
+import threading
+
+from modules.bulk_pull import BulkPull, HostLimitedRunner, select_repositories
+
+def repo(name, host="github.com", **fields):
+    record = {"id": name, "path": f"/work/{name}", "name": name, "status": "Clean"}
+    if host:
+        record["remotes"] = [{"name": "origin", "fetch_url": f"git@{host}:team/{name}.git"}]
+    record.update(fields)
+    return record
+
+def test_path_filter_matches_whole_directories():
+    repositories = [repo("app"), repo("app/lib"), repo("app-old"), repo("apple")]
+
+    selected = select_repositories(repositories, filters={"path": "/work/app"})
+
+    assert [r["id"] for r in selected] == ["app", "app/lib"]
+
+class ConcurrencyProbe:
+    """A task that records how many tasks run at once, overall and per host"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+        self.peak_total = 0
+        self.order = []
+
+    def __call__(self, item):
+        host, _ = item
+        with self.lock:
+            self.order.append(item)
+            self.running[host] = self.running.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.running[host])
+            self.peak_total = max(self.peak_total, sum(self.running.values()))
+        time.sleep(0.02)
+        with self.lock:
+            self.running[host] -= 1
+        return item
+
+def host_of(item):
+    return item[0]
+
+def test_runner_respects_global_and_per_host_limits():
+    items = [(host, n) for host in ("a", "b", "c") for n in range(6)]
+    probe = ConcurrencyProbe()
+    done = []
+
+    not_started = HostLimitedRunner(concurrency=4, per_host=2).run(
+        items, host_of, probe, on_done=lambda item, result, error: done.append(result))
+
+    assert not_started == []
+    assert sorted(done) == items
+    assert max(probe.peak.values()) == 2
+    assert probe.peak_total <= 4
+
+def test_runner_serves_hosts_round_robin():
+    items = [("a", n) for n in range(3)] + [("b", n) for n in range(3)]
+    probe = ConcurrencyProbe()
+
+    HostLimitedRunner(concurrency=1, per_host=1).run(items, host_of, probe)
+
+    assert [host for host, _ in probe.order] == ["a", "b", "a", "b", "a", "b"]
+
+def test_runner_returns_items_never_started_after_a_stop():
+    items = [("a", n) for n in range(5)]
+    probe = ConcurrencyProbe()
+
+    not_started = HostLimitedRunner(concurrency=1, per_host=1).run(
+        items, host_of, probe, should_stop=lambda: len(probe.order) >= 2)
+
+    assert len(probe.order) == 2
+    assert not_started == items[2:]
+
+def test_runner_reports_task_errors():
+    errors = []
+
+    def task(item):
+        raise RuntimeError("boom")
+
+    HostLimitedRunner().run([("a", 1)], host_of, task, on_done=lambda item, result, error: errors.append(error))
+
+    assert [str(e) for e in errors] == ["boom"]
+
+class FakeGit:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.pulled = []
+
+    def pull_repository(self, path):
+        self.pulled.append(path)
+        if path in self.failing:
+            return {"success": False, "message": "merge conflict"}
+        return {"success": True, "message": "Already up to date."}
+
+    def get_repository_info(self, path):
+        return {"path": path, "status": "Clean", "behind": 0}
+
+class FakeInventory:
+    def __init__(self):
+        self.batches = []
+
+    def update_repositories(self, updates):
+        self.batches.append(sorted(updates))
+
+def test_bulk_pull_skips_unsafe_repositories_and_batches_updates(monkeypatch):
+    monkeypatch.setattr(BulkPull, "FLUSH_COUNT", 2)
+    monkeypatch.setattr(BulkPull, "FLUSH_INTERVAL", 3600)
+    inventory = FakeInventory()
+    git = FakeGit(failing={"/work/broken"})
+    repositories = [
+        repo("a"), repo("b", host="gitlab.com"), repo("c"), repo("broken"),
+        repo("dirty", has_changes=True), repo("orphan", host=None),
+    ]
+
+    summary = BulkPull(inventory, concurrency=2, per_host=1, git_ops=git).run(repositories)
+
+    assert summary["pulled"] == 3
+    assert summary["failed"] == 1
+    assert summary["failures"][0]["message"] == "merge conflict"
+    assert {s["id"]: s["reason"] for s in summary["skipped_repositories"]} == {"dirty": "local changes", "orphan": "no remote"}
+    assert sorted(git.pulled) == ["/work/a", "/work/b", "/work/broken", "/work/c"]
+    assert {host: (s["pulled"], s["failed"]) for host, s in summary["hosts"].items()} == {
+        "github.com": (2, 1), "gitlab.com": (1, 0)}
+    # A batch of FLUSH_COUNT records, then the rest when the run ends
+    assert sorted(repo_id for batch in inventory.batches for repo_id in batch) == ["a", "b", "c"]
+    assert len(inventory.batches) == 2
+
+def test_bulk_pull_stops_starting_pulls():
+    git = FakeGit()
+
+    summary = BulkPull(FakeInventory(), concurrency=1, git_ops=git).run(
+        [repo("a"), repo("b"), repo("c")], should_stop=lambda: len(git.pulled) >= 1)
+
+    assert summary["pulled"] == 1
+    assert summary["not_started"] == 2
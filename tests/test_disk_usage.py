@@ -0,0 +1,146 @@
+import os
+
+import pytest
+
+from modules import disk_usage
+from modules.disk_usage import HOUR, DirectoryCache, DiskUsageScheduler
+
+class Clock:
+    """Stands in for the time module inside disk_usage only (pool threads keep the real clock)"""
+    def __init__(self, now=10000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(disk_usage, "time", clock)
+    return clock
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "project"
+    (root / "src").mkdir(parents=True)
+    (root / "README").write_text("x" * 5000)
+    (root / "src" / "main.py").write_text("print()\n")
+    return root
+
+def listing(cache, path):
+    return cache.list_directory(str(path), os.stat(path, follow_symlinks=False))
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = DirectoryCache(tmp_path / "cache.json", max_age=HOUR)
+    cache.load()
+    return cache
+
+def test_unchanged_directory_is_not_listed_again(cache, tree):
+    first = listing(cache, tree)
+
+    assert listing(cache, tree) == first
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert first[1] == 1 and first[3] == ["src"]
+
+def test_changed_mtime_lists_the_directory_again(cache, tree):
+    listing(cache, tree)
+    (tree / "NEWS").write_text("news\n")
+    st = os.stat(tree)
+    os.utime(tree, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    _, files, _, _ = listing(cache, tree)
+
+    assert files == 2
+    assert cache.stats()["misses"] == 2
+
+def test_entries_expire_after_max_age(cache, tree, clock):
+    listing(cache, tree)
+
+    clock.now += HOUR - 1
+    listing(cache, tree)
+    clock.now += 2
+    listing(cache, tree)
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+def test_complete_pass_forgets_unvisited_directories_and_persists(cache, tree, tmp_path, clock):
+    listing(cache, tree)
+    listing(cache, tree / "src")
+    cache.finish_pass(complete=True)
+
+    listing(cache, tree)
+    cache.finish_pass(complete=True)
+
+    reloaded = DirectoryCache(tmp_path / "cache.json", max_age=HOUR)
+    reloaded.load()
+    assert reloaded.stats()["directories"] == 1
+    listing(reloaded, tree)
+    assert reloaded.stats()["hits"] == 1
+
+class FakeInventory:
+    def __init__(self, paths):
+        self.repositories = [{"id": os.path.basename(path), "path": str(path)} for path in paths]
+        self.batches = []
+
+    def get_repositories(self):
+        return self.repositories
+
+    def update_repositories(self, updates):
+        self.batches.append(sorted(updates))
+        return updates
+
+@pytest.fixture
+def repositories(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / "code" / name
+        (path / ".git" / "objects" / "pack").mkdir(parents=True)
+        (path / ".git" / "objects" / "pack" / "pack-1.pack").write_bytes(b"p" * 8192)
+        (path / "file.txt").write_text(name * 100)
+        paths.append(path)
+    return paths
+
+@pytest.fixture
+def scheduler(tmp_path, repositories, clock):
+    scheduler = DiskUsageScheduler(FakeInventory(repositories), cache_file=tmp_path / "cache.json", threads=2)
+    yield scheduler
+    scheduler.stop()
+
+def test_measure_splits_worktree_and_git(scheduler, repositories):
+    fields = scheduler.measure(str(repositories[0]))
+
+    details = fields["size_details"]
+    assert details["pack"] >= 8192
+    assert details["worktree"] > 0
+    assert fields["size"] == details["worktree"] + details["git"]
+
+def test_long_passes_flush_sizes_every_flush_interval(scheduler, clock, monkeypatch):
+    measure = scheduler.measure
+
+    def slow_measure(path):
+        clock.now += DiskUsageScheduler.FLUSH_INTERVAL * 2 / 3
+        return measure(path)
+    monkeypatch.setattr(scheduler, "measure", slow_measure)
+
+    summary = scheduler.run_once()
+
+    assert summary == {"measured": 3, "changed": 3, "complete": True, "seconds": pytest.approx(600)}
+    # a and b have waited past FLUSH_INTERVAL by the time b is measured; c is written at the end
+    assert scheduler.inventory.batches == [["a", "b"], ["c"]]
+
+def test_unchanged_sizes_are_not_written(scheduler):
+    scheduler.run_once()
+    for repo in scheduler.inventory.repositories:
+        repo.update(scheduler.measure(repo["path"]))
+    scheduler.inventory.batches.clear()
+
+    summary = scheduler.run_once()
+
+    assert summary["changed"] == 0
+    assert scheduler.inventory.batches == []
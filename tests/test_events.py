@@ -0,0 +1,104 @@
+from modules.events import EventHub, format_sse
+
+def data(events):
+    return [event["data"] for event in events]
+
+def test_events_fan_out_to_every_subscriber_of_the_topic():
+    hub = EventHub()
+    first, second, other = hub.subscribe("scan"), hub.subscribe("scan"), hub.subscribe("pull:a")
+
+    hub.publish("scan", {"n": 1})
+
+    assert data(first.drain(10)) == [{"n": 1}]
+    assert data(second.drain(10)) == [{"n": 1}]
+    assert other.drain(10) == []
+
+def test_reconnect_replays_events_after_last_event_id():
+    hub = EventHub()
+    ids = [hub.publish("scan", {"n": n}) for n in range(4)]
+
+    subscription = hub.subscribe("scan", last_event_id=ids[1])
+
+    assert data(subscription.drain(10)) == [{"n": 2}, {"n": 3}]
+    assert not hub.replay_gap("scan", ids[1])
+
+def test_replay_gap_once_events_left_the_buffer():
+    hub = EventHub(replay_size=2)
+    ids = [hub.publish("scan", {"n": n}) for n in range(4)]
+
+    assert hub.replay_gap("scan", ids[0])
+    assert not hub.replay_gap("scan", ids[1])
+    # The client resyncs from a snapshot; the buffer still yields what it has
+    assert data(hub.subscribe("scan", last_event_id=ids[0]).drain(10)) == [{"n": 2}, {"n": 3}]
+
+def test_undelivered_events_with_a_coalesce_key_are_replaced():
+    hub = EventHub()
+    subscription = hub.subscribe("scan")
+
+    hub.publish("scan", {"progress": 1}, coalesce_key="progress")
+    hub.publish("scan", {"status": "added"})
+    hub.publish("scan", {"progress": 2}, coalesce_key="progress")
+
+    assert data(subscription.drain(10)) == [{"progress": 2}, {"status": "added"}]
+
+    hub.publish("scan", {"progress": 3}, coalesce_key="progress")
+    assert data(subscription.drain(10)) == [{"progress": 3}]
+
+def test_slow_subscriber_is_closed_on_overflow():
+    hub = EventHub(max_pending=2)
+    slow, fast = hub.subscribe("scan"), hub.subscribe("scan")
+
+    for n in range(3):
+        hub.publish("scan", {"n": n})
+        fast.drain(10)
+
+    assert slow.overflowed and slow.closed
+    assert slow.get(timeout=0) is None
+    assert not fast.closed
+    assert hub.subscriber_count("scan") == 1
+
+def test_get_returns_none_once_closed():
+    hub = EventHub()
+    subscription = hub.subscribe("scan")
+
+    subscription.close()
+
+    assert subscription.get(timeout=1) is None
+    assert hub.subscriber_count() == 0
+
+def test_release_drops_the_buffer_after_the_last_subscriber_leaves():
+    hub = EventHub()
+    event_id = hub.publish("job:1", {"status": "running"})
+    subscription = hub.subscribe("job:1")
+
+    hub.release("job:1")
+    assert not hub.replay_gap("job:1", event_id)
+
+    subscription.close()
+    assert hub.replay_gap("job:1", event_id)
+
+def test_release_without_subscribers_drops_the_buffer_now():
+    hub = EventHub()
+    event_id = hub.publish("job:1", {"status": "completed"})
+
+    hub.release("job:1")
+
+    assert hub.replay_gap("job:1", event_id)
+    assert hub.subscribe("job:1", last_event_id=event_id - 1).drain(10) == []
+
+def test_max_topics_evicts_the_least_recent_idle_topic():
+    hub = EventHub(max_topics=2)
+    watched = hub.subscribe("job:1")
+    first = hub.publish("job:1", {"n": 1})
+    second = hub.publish("job:2", {"n": 2})
+    hub.publish("job:1", {"n": 3})
+
+    hub.publish("job:3", {"n": 4})
+
+    assert hub.replay_gap("job:2", second - 1)
+    # Topics with subscribers keep their buffer
+    assert not hub.replay_gap("job:1", first)
+    assert data(watched.drain(10)) == [{"n": 1}, {"n": 3}]
+
+def test_format_sse_carries_the_event_id():
+    assert format_sse({"id": 7, "data": {"status": "idle"}}) == 'id: 7\ndata: {"status": "idle"}\n\n'
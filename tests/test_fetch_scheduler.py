@@ -0,0 +1,138 @@
+import pytest
+
+from modules import fetch_scheduler
+from modules.fetch_scheduler import FetchScheduler, TokenBucket, status_from_counts
+
+class Clock:
+    """Stands in for the time module inside fetch_scheduler only (threads keep the real clock)"""
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fetch_scheduler, "time", clock)
+    return clock
+
+class FakeInventory:
+    def __init__(self, repositories):
+        self.repositories = {repo["id"]: repo for repo in repositories}
+        self.updates = []
+
+    def get_repositories(self):
+        return list(self.repositories.values())
+
+    def get_repositories_by_ids(self, repo_ids):
+        return [self.repositories[repo_id] for repo_id in repo_ids]
+
+    def update_repositories(self, updates):
+        self.updates.append(updates)
+
+class FakeGit:
+    def __init__(self, results):
+        self.results = results
+        self.fetched = []
+
+    def fetch_tracking_refs(self, path):
+        self.fetched.append(path)
+        return self.results[path]
+
+def repo(repo_id, url="https://example.com/x.git"):
+    return {"id": repo_id, "path": f"/work/{repo_id}", "has_changes": False, "remotes": [{"fetch_url": url}]}
+
+def test_token_bucket_allows_a_burst_then_refills_at_the_rate(clock):
+    bucket = TokenBucket(60, burst=5)
+
+    assert bucket.take(10) == 5
+    assert bucket.available() == 0
+
+    clock.now += 2
+    assert bucket.available() == 2
+    clock.now += 60
+    assert bucket.take(10) == 5
+
+def test_token_bucket_default_burst_is_a_tenth_of_a_minute(clock):
+    assert TokenBucket(30).available() == 5
+    assert TokenBucket(3).available() == 1
+
+@pytest.fixture
+def scheduler(clock):
+    scheduler = FetchScheduler(FakeInventory([repo("a")]), git_ops=FakeGit({}),
+                               interval=800, min_interval=300, max_interval=2000, max_backoff=5000, jitter=0)
+    scheduler._reconcile(clock.now)
+    return scheduler
+
+def record(scheduler, clock, result):
+    scheduler._record_result({"id": "a"}, result, clock.now)
+    state = scheduler._states["a"]
+    return state.interval, state.due - clock.now
+
+def test_interval_halves_on_new_commits_and_grows_when_quiet(scheduler, clock):
+    assert record(scheduler, clock, {"success": True, "updated": True}) == (400, 400)
+    assert record(scheduler, clock, {"success": True, "updated": True}) == (300, 300)
+    assert record(scheduler, clock, {"success": True, "updated": False}) == (450, 450)
+
+    for _ in range(5):
+        interval, _ = record(scheduler, clock, {"success": True, "updated": False})
+    assert interval == 2000
+
+def test_failures_back_off_exponentially_up_to_the_limit(scheduler, clock):
+    delays = [record(scheduler, clock, {"success": False, "message": "timeout"})[1] for _ in range(4)]
+
+    assert delays == [1600, 3200, 5000, 5000]
+    state = scheduler._states["a"]
+    assert state.failures == 4
+    assert state.last_error == "timeout"
+    assert scheduler.status()["failing"][0]["id"] == "a"
+
+    record(scheduler, clock, {"success": True, "updated": False})
+    assert state.failures == 0
+    assert scheduler.status()["failing"] == []
+
+def due_now(scheduler, clock):
+    """Track the inventory's repositories with every fetch due immediately"""
+    scheduler._reconcile(clock.now)
+    scheduler._heap = []
+    for repo_id, state in scheduler._states.items():
+        scheduler._schedule(repo_id, state, 0, clock.now)
+
+def test_run_once_fetches_due_repositories_and_writes_their_counts(clock):
+    inventory = FakeInventory([repo("a"), repo("b"), repo("local", url=None)])
+    git_ops = FakeGit({
+        "/work/a": {"success": True, "updated": True, "ahead": 1, "behind": 2},
+        "/work/b": {"success": False, "message": "unreachable"},
+    })
+    scheduler = FetchScheduler(inventory, git_ops=git_ops, rate_per_minute=60, jitter=0)
+    due_now(scheduler, clock)
+
+    assert scheduler.run_once() == 3
+    assert sorted(git_ops.fetched) == ["/work/a", "/work/b"]
+    assert inventory.updates == [{"a": {"ahead": 1, "behind": 2, "status": "Diverged"}}]
+    status = scheduler.status()
+    assert (status["fetched"], status["failed"], status["changed"]) == (1, 1, 1)
+
+def test_run_once_stays_within_the_rate_limit(clock):
+    results = {f"/work/{name}": {"success": True, "updated": False, "ahead": 0, "behind": 0} for name in "abc"}
+    git_ops = FakeGit(results)
+    scheduler = FetchScheduler(FakeInventory([repo(name) for name in "abc"]), git_ops=git_ops,
+                               rate_per_minute=6, jitter=0)
+    due_now(scheduler, clock)
+
+    assert scheduler.run_once() == 1
+    assert scheduler.run_once() == 0
+    clock.now += 10
+    assert scheduler.run_once() == 1
+    assert len(set(git_ops.fetched)) == 2
+
+def test_status_from_counts():
+    assert status_from_counts(True, 1, 1) == "Changed"
+    assert status_from_counts(False, 1, 1) == "Diverged"
+    assert status_from_counts(False, 1, 0) == "Ahead"
+    assert status_from_counts(False, 0, 1) == "Behind"
+    assert status_from_counts(False, 0, 0) == "Clean"
@@ -0,0 +1,143 @@
+import os
+import errno
+import threading
+
+import pytest
+
+from conftest import init_repo
+from modules import fs_watcher
+from modules.config import defaults
+from modules.fs_watcher import (
+    FilesystemWatcher, WatchLimitReached, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_ISDIR, IN_MOVED_TO,
+    IN_Q_OVERFLOW
+)
+
+class FakeInotify:
+    """Stands in for the inotify binding: hands out watch descriptors until `limit` is reached"""
+    limit = None
+
+    def __init__(self):
+        self.watches = {}
+        self.events = []
+
+    def add_watch(self, path, mask):
+        if self.limit is not None and len(self.watches) >= self.limit:
+            raise WatchLimitReached(errno.ENOSPC, "inotify watch limit reached", str(path))
+        wd = len(self.watches) + 1
+        self.watches[wd] = str(path)
+        return wd
+
+    def rm_watch(self, wd):
+        self.watches.pop(wd, None)
+
+    def read_events(self, timeout):
+        events, self.events = self.events, []
+        return events
+
+    def close(self):
+        pass
+
+    def wd(self, path):
+        return next(wd for wd, watched in self.watches.items() if watched == str(path))
+
+class Recorder:
+    def __init__(self):
+        self.subtrees = []
+        self.refreshed = []
+        self.fallbacks = []
+
+    def store_subtree(self, path, git_repos, non_git_dirs):
+        self.subtrees.append((path, sorted(str(repo) for repo in git_repos)))
+
+    def refresh(self, paths):
+        self.refreshed.extend(paths)
+
+@pytest.fixture
+def watched(git_tree, monkeypatch):
+    """A watcher over git_tree that has done its initial walk, driven by hand"""
+    monkeypatch.setattr(fs_watcher, "Inotify", FakeInotify)
+    config = dict(defaults(), scan_directory=str(git_tree))
+    recorder = Recorder()
+    repos = [str(git_tree / name) for name in ("alpha", "group/beta", "group/nested/gamma")]
+    watcher = FilesystemWatcher(lambda: config, recorder.store_subtree, recorder.refresh, lambda: repos,
+                                on_fallback=recorder.fallbacks.append)
+    watcher._root = str(git_tree)
+    watcher._inotify = FakeInotify()
+    watcher._initial_walk(config)
+    return watcher, recorder, config
+
+def test_new_clone_rescans_only_its_subtree(watched, git_tree):
+    watcher, recorder, config = watched
+    init_repo(git_tree / "group" / "delta")
+
+    watcher._handle(watcher._inotify.wd(git_tree / "group"), IN_CREATE | IN_ISDIR, "delta")
+    watcher._flush(config)
+
+    assert recorder.subtrees == [(str(git_tree / "group" / "delta"), [str(git_tree / "group" / "delta")])]
+    assert recorder.refreshed == []
+
+def test_removed_directory_is_stored_as_an_empty_subtree(watched, git_tree):
+    watcher, recorder, config = watched
+    removed = git_tree / "alpha"
+    for root, dirs, files in os.walk(removed, topdown=False):
+        for name in files:
+            os.unlink(os.path.join(root, name))
+        for name in dirs:
+            os.rmdir(os.path.join(root, name))
+    removed.rmdir()
+
+    watcher._handle(watcher._inotify.wd(git_tree), IN_DELETE | IN_ISDIR, "alpha")
+    watcher._flush(config)
+
+    assert recorder.subtrees == [(str(removed), [])]
+    assert not any(path.startswith(str(removed)) for path in watcher._wd_by_path)
+
+def test_commits_and_ref_updates_refresh_the_repository(watched, git_tree):
+    watcher, recorder, config = watched
+    alpha, beta = str(git_tree / "alpha"), str(git_tree / "group" / "beta")
+    (git_tree / "alpha" / ".git" / "index").write_bytes(b"changed")
+
+    watcher._handle(watcher._inotify.wd(os.path.join(alpha, ".git")), IN_CLOSE_WRITE, "index")
+    watcher._handle(watcher._inotify.wd(os.path.join(beta, ".git", "refs", "heads")), IN_MOVED_TO, "main")
+    watcher._flush(config)
+
+    assert sorted(recorder.refreshed) == [alpha, beta]
+    assert recorder.subtrees == []
+
+def test_git_reads_that_change_nothing_are_ignored(watched, git_tree):
+    watcher, recorder, config = watched
+    alpha = str(git_tree / "alpha")
+
+    watcher._handle(watcher._inotify.wd(os.path.join(alpha, ".git")), IN_CLOSE_WRITE, "index")
+    watcher._handle(watcher._inotify.wd(os.path.join(alpha, ".git", "refs", "heads")), IN_CREATE, "main.lock")
+    watcher._flush(config)
+
+    assert recorder.refreshed == []
+
+def test_queue_overflow_rescans_the_whole_tree(watched, git_tree):
+    watcher, recorder, config = watched
+
+    watcher._handle(-1, IN_Q_OVERFLOW, "")
+    watcher._flush(config)
+
+    assert [path for path, _ in recorder.subtrees] == [str(git_tree)]
+    assert watcher.status()["overflows"] == 1
+
+def test_watch_limit_falls_back_to_scheduled_rescans(git_tree, monkeypatch):
+    import app
+    monkeypatch.setattr(FakeInotify, "limit", 3)
+    monkeypatch.setattr(fs_watcher, "Inotify", FakeInotify)
+    started = threading.Event()
+    monkeypatch.setattr(app.rescan_scheduler, "start", started.set)
+    config = dict(defaults(), scan_directory=str(git_tree))
+    watcher = FilesystemWatcher(lambda: config, Recorder().store_subtree, Recorder().refresh, lambda: [],
+                                on_fallback=app.start_rescan_scheduler)
+
+    watcher.start()
+    assert started.wait(5)
+    watcher.stop()
+
+    status = watcher.status()
+    assert status["mode"] == "fallback"
+    assert "watch limit" in status["fallback_reason"]
+    assert status["watches"] == 0
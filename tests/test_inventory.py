@@ -0,0 +1,119 @@
+import pytest
+
+from modules.config import ConfigManager
+from modules.inventory import InventoryStore
+
+def repo(name, root="/work", **fields):
+    record = {"id": name, "path": f"{root}/{name}", "name": name, "status": "Clean"}
+    record.update(fields)
+    return record
+
+def scan(*repositories, directory="/work"):
+    return {
+        "scan_time": "2024-01-01T00:00:00",
+        "scan_directory": directory,
+        "git_repositories": [dict(r) for r in repositories],
+        "non_git_directories": [],
+    }
+
+@pytest.fixture
+def store():
+    return InventoryStore(ConfigManager())
+
+def test_scans_bump_generation_and_stamp_changed_records(store):
+    assert store.replace_scan(scan(repo("a"), repo("b")))["generation"] == 1
+
+    summary = store.replace_scan(scan(repo("a"), repo("b", status="Changed")))
+
+    assert summary["generation"] == 2
+    assert summary["changed"] == 1
+    records = {r["id"]: r for r in store.get_repositories()}
+    assert records["a"]["generation"] == 1
+    assert records["b"]["generation"] == 2
+
+def test_identical_scan_changes_nothing(store):
+    store.replace_scan(scan(repo("a")))
+
+    summary = store.replace_scan(scan(repo("a")))
+
+    assert summary["unchanged"]
+    assert summary["generation"] == 1
+    assert store.get_generation() == 1
+
+def test_inventory_survives_reload(store):
+    store.replace_scan(scan(repo("a")))
+
+    reloaded = InventoryStore(ConfigManager())
+
+    assert reloaded.get_generation() == 1
+    assert [r["id"] for r in reloaded.get_repositories()] == ["a"]
+
+def test_changes_since_returns_changed_records_and_tombstones(store):
+    store.replace_scan(scan(repo("a"), repo("b")))
+    store.replace_scan(scan(repo("a", status="Ahead")))
+
+    changes = store.changes_since(1)
+
+    assert not changes["full_sync"]
+    assert changes["generation"] == 2
+    assert [r["id"] for r in changes["changed"]] == ["a"]
+    assert [t["id"] for t in changes["removed"]] == ["b"]
+    assert store.changes_since(2)["changed"] == []
+
+@pytest.mark.parametrize("since", [0, 5])
+def test_changes_since_falls_back_to_full_sync(store, since):
+    store.replace_scan(scan(repo("a"), repo("b")))
+
+    changes = store.changes_since(since)
+
+    assert changes["full_sync"]
+    assert sorted(r["id"] for r in changes["changed"]) == ["a", "b"]
+
+def test_tombstone_floor_forces_full_sync_for_old_clients(store, monkeypatch):
+    monkeypatch.setattr(InventoryStore, "MAX_TOMBSTONES", 1)
+    store.replace_scan(scan(repo("a"), repo("b"), repo("c")))
+    store.replace_scan(scan(repo("b"), repo("c")))
+    store.replace_scan(scan(repo("c")))
+
+    results = store.get_results()
+    assert [t["id"] for t in results["removed_repositories"]] == ["b"]
+    assert results["tombstone_floor"] == 2
+    assert store.changes_since(1)["full_sync"]
+    assert not store.changes_since(2)["full_sync"]
+
+def test_returning_repository_drops_its_tombstone(store):
+    store.replace_scan(scan(repo("a"), repo("b")))
+    store.replace_scan(scan(repo("a")))
+    store.replace_scan(scan(repo("a"), repo("b")))
+
+    assert store.get_results()["removed_repositories"] == []
+
+def test_merge_scan_only_replaces_repositories_under_scanned_paths(store):
+    store.replace_scan(scan(repo("a", root="/work/x"), repo("b", root="/work/y"), repo("c", root="/work/xy")))
+
+    summary = store.merge_scan(["/work/x"], scan(repo("d", root="/work/x"), directory="/work/x"))
+
+    assert summary["added"] == 1
+    assert summary["removed"] == 1
+    assert sorted(r["id"] for r in store.get_repositories()) == ["b", "c", "d"]
+    assert [t["id"] for t in store.get_results()["removed_repositories"]] == ["a"]
+
+def test_rescan_keeps_fields_maintained_by_background_services(store):
+    store.replace_scan(scan(repo("a")))
+    store.update_repository("a", {"size": 1024})
+
+    store.replace_scan(scan(repo("a")))
+
+    assert store.get_repository("a")["size"] == 1024
+
+def test_detail_fields_are_not_stored(store):
+    commits = [{"hash": "abc", "message": "Fix parser\n\nLonger body"}]
+    store.replace_scan(scan(repo("a", recent_commits=commits, changed_files=["x.py"])))
+
+    record = store.get_repository("a")
+    assert "recent_commits" not in record and "changed_files" not in record
+    assert record["commit_subjects"] == ["Fix parser"]
+
+    generation = store.get_generation()
+    store.update_repository("a", {"recent_commits": commits, "changed_files": ["y.py"]})
+    assert store.get_generation() == generation
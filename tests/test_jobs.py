@@ -0,0 +1,142 @@
+import time
+import threading
+
+import pytest
+
+from modules.events import EventHub
+from modules.jobs import (
+    CANCELLED, DONE, FAILED, RUNNING,
+    PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL,
+    JobManager,
+)
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.005)
+
+@pytest.fixture
+def hub():
+    return EventHub()
+
+@pytest.fixture
+def manager(hub):
+    return JobManager(hub, max_workers=1, history_size=3)
+
+@pytest.fixture
+def gate(manager):
+    """A running job that holds the only worker until the gate is set"""
+    gate = threading.Event()
+    blocker, _ = manager.submit("block", lambda job: gate.wait(5))
+    wait_until(lambda: blocker.state == RUNNING)
+    yield gate
+    gate.set()
+
+def test_job_runs_to_done_with_its_result(manager):
+    job, created = manager.submit("scan", lambda job: 42)
+
+    wait_until(lambda: job.state == DONE)
+    assert created
+    assert job.result == 42
+    assert job.started_at and job.finished_at
+
+def test_failing_job_records_the_error(manager):
+    def fail(job):
+        raise RuntimeError("boom")
+
+    job, _ = manager.submit("scan", fail)
+
+    wait_until(lambda: job.state == FAILED)
+    assert job.error == "boom"
+
+def test_state_changes_are_published_on_the_job_topic(manager, hub, gate):
+    job, _ = manager.submit("scan", lambda job: None)
+    subscription = hub.subscribe(job.topic)
+
+    gate.set()
+    wait_until(lambda: job.state == DONE)
+    states = [event["data"]["job"]["state"] for event in subscription.drain(10)]
+    assert states == [RUNNING, DONE]
+
+def test_invalid_transition_is_rejected(manager):
+    job, _ = manager.submit("scan", lambda job: None)
+    wait_until(lambda: job.state == DONE)
+
+    with pytest.raises(ValueError):
+        job._transition(RUNNING)
+
+def test_dedupe_key_returns_the_active_job(manager, gate):
+    first, created = manager.submit("pull", lambda job: None, dedupe_key="pull:a")
+    second, duplicate_created = manager.submit("pull", lambda job: None, dedupe_key="pull:a")
+    other, other_created = manager.submit("pull", lambda job: None, dedupe_key="pull:b")
+
+    assert created and other_created
+    assert second is first and not duplicate_created
+    assert other is not first
+    assert manager.get_active("pull:a") is first
+
+    gate.set()
+    wait_until(lambda: first.state == DONE)
+    assert manager.get_active("pull:a") is None
+    again, created = manager.submit("pull", lambda job: None, dedupe_key="pull:a")
+    assert created and again is not first
+
+def test_queued_jobs_run_by_priority_then_submission_order(manager, gate):
+    order = []
+    jobs = [
+        manager.submit(name, lambda job: order.append(job.kind), priority=priority)[0]
+        for name, priority in [
+            ("low", PRIORITY_LOW), ("normal-1", PRIORITY_NORMAL),
+            ("high", PRIORITY_HIGH), ("normal-2", PRIORITY_NORMAL),
+        ]
+    ]
+    assert manager.queue_depth() == 4
+
+    gate.set()
+    wait_until(lambda: all(job.state == DONE for job in jobs))
+    assert order == ["high", "normal-1", "normal-2", "low"]
+
+def test_cancelling_a_queued_job_skips_it(manager, hub, gate):
+    ran = threading.Event()
+    job, _ = manager.submit("scan", lambda job: ran.set(), dedupe_key="scan")
+    subscription = hub.subscribe(job.topic)
+
+    assert manager.cancel(job.id) is job
+    assert job.state == CANCELLED
+    assert manager.get_active("scan") is None
+    assert [event["data"]["status"] for event in subscription.drain(10)] == ["cancelled", "job"]
+
+    gate.set()
+    wait_until(lambda: manager.queue_depth() == 0 and not manager.active())
+    assert not ran.is_set()
+
+def test_cancelling_a_running_job_stops_it_at_its_next_check(manager):
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while True:
+            job.raise_if_cancelled()
+            time.sleep(0.005)
+
+    job, _ = manager.submit("scan", work)
+    started.wait(5)
+    manager.cancel(job.id)
+
+    wait_until(lambda: job.state == CANCELLED)
+    assert manager.cancel("unknown") is None
+
+def test_finished_jobs_beyond_the_history_size_are_dropped(manager):
+    jobs = [manager.submit("scan", lambda job: None)[0] for _ in range(5)]
+    wait_until(lambda: all(job.state == DONE for job in jobs))
+
+    assert [job.id for job in manager.list()] == [job.id for job in reversed(jobs[2:])]
+
+def test_finished_job_topic_releases_its_replay_buffer(manager, hub):
+    job, _ = manager.submit("scan", lambda job: job.publish({"status": "progress"}))
+    wait_until(lambda: job.state == DONE)
+
+    assert hub.replay_gap(job.topic, 0)
+    assert "job:" + job.id not in hub.subscriber_counts()
@@ -0,0 +1,46 @@
+import multiprocessing
+
+import pytest
+
+from conftest import init_repo
+from modules.config import defaults
+from modules.parallel_scan import ProcessPoolScanner, chunked, dedupe_scan_paths, pool_context
+from modules.scanner import RepositoryScanner
+
+def test_dedupe_scan_paths_drops_nested_and_duplicate_paths():
+    assert dedupe_scan_paths(["/code/a/b", "/code/a", "/code/a/", "/code/ab", "/work"]) == ["/code/a", "/code/ab", "/work"]
+
+def test_dedupe_scan_paths_makes_paths_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert dedupe_scan_paths(["src", "src/lib"]) == [str(tmp_path / "src")]
+
+def test_chunked_splits_in_order():
+    assert chunked(list(range(5)), 2) == [[0, 1], [2, 3], [4]]
+
+def test_pool_context_never_forks():
+    assert pool_context().get_start_method() in ("forkserver", "spawn")
+    assert pool_context().get_start_method() in multiprocessing.get_all_start_methods()
+
+@pytest.fixture
+def pool():
+    scanner = ProcessPoolScanner(processes=2)
+    yield scanner
+    scanner.shutdown()
+
+def test_process_pool_finds_the_same_repositories_as_a_local_scan(git_tree, pool):
+    (git_tree / ".gitignore").write_text("ignored/\n")
+    init_repo(git_tree / "ignored" / "delta")
+    init_repo(git_tree / "group" / "node_modules" / "vendored")
+    config = defaults()
+
+    scanner = RepositoryScanner(config)
+    local_paths, _ = scanner.scan_directory(git_tree, max_depth=5)
+    expected = scanner.get_repositories_info(local_paths)
+    found = []
+    repositories, _ = pool.scan(str(git_tree), config, 5, progress_callback=found.append)
+
+    assert sorted(r["path"] for r in repositories) == sorted(
+        str(git_tree / name) for name in ("alpha", "group/beta", "group/nested/gamma"))
+    assert sorted((r["id"], r["current_branch"], r["status"]) for r in repositories) == \
+        sorted((r["id"], r["current_branch"], r["status"]) for r in expected)
+    assert sum(1 for update in found if update.get("type") == "git_repo") == 3
@@ -0,0 +1,127 @@
+import pytest
+
+from modules import rescan_scheduler
+from modules.rescan_scheduler import HOUR, ActivityTracker, RescanScheduler
+
+class Clock:
+    """Stands in for the time module inside rescan_scheduler only"""
+    def __init__(self, now=10000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rescan_scheduler, "time", clock)
+    # First rescans are due at once instead of spread over an interval
+    monkeypatch.setattr(rescan_scheduler.random, "uniform", lambda low, high: low)
+    return clock
+
+class FakeScan:
+    """Rescans by visiting `cost` directories and reporting `changes[path]` changed repositories"""
+    def __init__(self, cost=10):
+        self.cost = cost
+        self.changes = {}
+        self.scanned = []
+
+    def __call__(self, path, max_depth, should_stop):
+        self.scanned.append(path)
+        for _ in range(self.cost):
+            if should_stop():
+                return None
+        return {"added": 0, "removed": 0, "moved": 0, "changed": self.changes.get(path, 0)}
+
+@pytest.fixture
+def scan_root(tmp_path):
+    root = tmp_path / "code"
+    for name in ("alpha", "beta", "node_modules"):
+        (root / name).mkdir(parents=True)
+    return root
+
+def make_scheduler(scan_root, tmp_path, scan, **kwargs):
+    config = {"scan_directory": str(scan_root), "excluded_dirs": ["node_modules"], "max_depth": 5}
+    options = dict(interval=800, min_interval=300, max_interval=2000, jitter=0)
+    options.update(kwargs)
+    return RescanScheduler(scan, lambda: config, state_file=tmp_path / "rescan_state.json", **options)
+
+def subtree(scheduler, name):
+    return next(s for path, s in scheduler._subtrees.items() if path.endswith(name))
+
+def test_tracks_top_level_directories_except_excluded(scan_root, tmp_path, clock):
+    scheduler = make_scheduler(scan_root, tmp_path, FakeScan())
+
+    scheduler._reconcile(scheduler.get_config(), clock.now)
+
+    assert sorted(path.rsplit("/", 1)[1] for path in scheduler._subtrees) == ["alpha", "beta"]
+
+def test_interval_halves_after_changes_and_grows_when_quiet(scan_root, tmp_path, clock):
+    scan = FakeScan()
+    scan.changes[str(scan_root / "alpha")] = 2
+    scheduler = make_scheduler(scan_root, tmp_path, scan)
+
+    for _ in range(2):
+        scheduler.run_once()
+        scheduler.run_once()
+        clock.now += 2000
+    alpha, beta = subtree(scheduler, "alpha"), subtree(scheduler, "beta")
+
+    assert alpha.interval == 300
+    assert alpha.changes == 2
+    assert alpha.change_rate == pytest.approx(0.51)
+    assert beta.interval == 1800
+    assert beta.change_rate == 0
+    assert alpha.due == pytest.approx(10000 + 2000 + 300)
+
+def test_rescans_stop_when_the_hourly_budget_is_spent(scan_root, tmp_path, clock):
+    scan = FakeScan(cost=600)
+    scheduler = make_scheduler(scan_root, tmp_path, scan, budget_per_hour=1000)
+
+    first = scheduler.run_once()
+    assert first["cost"] == 600
+    # The other subtree has no cost yet, so DEFAULT_COST is its estimate
+    assert scheduler.run_once() is None
+    assert len(scan.scanned) == 1
+
+    clock.now += HOUR + 1
+    assert scheduler.run_once() is not None
+    assert scheduler.status()["spent_last_hour"] == 600
+
+def test_no_rescan_starts_while_busy(scan_root, tmp_path, clock):
+    scan = FakeScan()
+    busy = [True]
+    scheduler = make_scheduler(scan_root, tmp_path, scan, is_busy=lambda: busy[0])
+
+    assert scheduler.run_once() is None
+    busy[0] = False
+    assert scheduler.run_once() is not None
+
+def test_state_survives_restart(scan_root, tmp_path, clock):
+    scan = FakeScan()
+    scan.changes[str(scan_root / "alpha")] = 1
+    scheduler = make_scheduler(scan_root, tmp_path, scan)
+    scheduler.run_once()
+    scheduler.run_once()
+
+    restarted = make_scheduler(scan_root, tmp_path, scan)
+    restarted._reconcile(restarted.get_config(), clock.now)
+
+    assert subtree(restarted, "alpha").interval == 400
+    assert subtree(restarted, "beta").interval == 1200
+    assert subtree(restarted, "alpha").scans == 1
+
+def test_activity_tracker_stays_busy_for_the_quiet_period(clock):
+    tracker = ActivityTracker(quiet_period=2.0)
+    assert not tracker.busy()
+
+    tracker.begin()
+    assert tracker.busy() and tracker.in_flight() == 1
+    tracker.end()
+    assert tracker.busy()
+
+    clock.now += 2.5
+    assert not tracker.busy()
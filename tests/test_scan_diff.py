@@ -0,0 +1,98 @@
+import pytest
+
+from modules.config import ConfigManager
+from modules.inventory import InventoryStore
+from modules.scan_diff import ScanChangeLog, compute_scan_diff
+
+def repo(repo_id, path, inode=None, **fields):
+    record = {"id": repo_id, "path": path, "status": "Clean", "ahead": 0}
+    if inode is not None:
+        record.update(device=1, inode=inode)
+    record.update(fields)
+    return record
+
+def test_reports_added_removed_and_changed_repositories():
+    previous = [repo("a", "/a"), repo("b", "/b")]
+    current = [repo("a", "/a", status="Ahead", ahead=2), repo("c", "/c")]
+
+    diff = compute_scan_diff(previous, current)
+
+    assert [r["id"] for r in diff["added"]] == ["c"]
+    assert [r["id"] for r in diff["removed"]] == ["b"]
+    assert diff["moved"] == []
+    assert diff["changed"] == [{"id": "a", "path": "/a", "fields": {"status": ["Clean", "Ahead"], "ahead": [0, 2]}}]
+
+def test_non_status_fields_are_not_changes():
+    diff = compute_scan_diff([repo("a", "/a", size=1)], [repo("a", "/a", size=2)])
+
+    assert diff == {"added": [], "removed": [], "moved": [], "changed": []}
+
+def test_same_inode_under_a_new_id_is_a_move():
+    previous = [repo("old", "/src/project", inode=42), repo("gone", "/src/gone", inode=7)]
+    current = [repo("new", "/archive/project", inode=42), repo("fresh", "/src/fresh", inode=8)]
+
+    diff = compute_scan_diff(previous, current)
+
+    assert diff["moved"] == [{"old_id": "old", "new_id": "new", "from_path": "/src/project", "to_path": "/archive/project"}]
+    assert [r["id"] for r in diff["added"]] == ["fresh"]
+    assert [r["id"] for r in diff["removed"]] == ["gone"]
+
+def test_inode_on_another_device_is_not_a_move():
+    previous = [repo("old", "/src/project", inode=42)]
+    current = [dict(repo("new", "/mnt/project", inode=42), device=2)]
+
+    diff = compute_scan_diff(previous, current)
+
+    assert diff["moved"] == []
+    assert [r["id"] for r in diff["added"]] == ["new"]
+    assert [r["id"] for r in diff["removed"]] == ["old"]
+
+def test_change_log_trims_to_the_newest_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(ScanChangeLog, "MAX_RECORDS", 3)
+    log = ScanChangeLog(tmp_path / "changes.jsonl")
+
+    for generation in range(1, 7):
+        log.append({"generation": generation})
+    assert len(log.get_records()) == 6
+
+    log.append({"generation": 7})
+    assert [r["generation"] for r in log.get_records()] == [5, 6, 7]
+    assert [r["generation"] for r in log.get_records(since=5)] == [6, 7]
+    assert [r["generation"] for r in log.get_records(limit=1)] == [7]
+
+def test_change_log_counts_existing_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(ScanChangeLog, "MAX_RECORDS", 2)
+    path = tmp_path / "changes.jsonl"
+    for generation in range(1, 5):
+        ScanChangeLog(path).append({"generation": generation})
+
+    ScanChangeLog(path).append({"generation": 5})
+
+    assert [r["generation"] for r in ScanChangeLog(path).get_records()] == [4, 5]
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "inventory", InventoryStore(ConfigManager()))
+    monkeypatch.setattr(app, "scan_change_log", ScanChangeLog(tmp_path / "changes.jsonl"))
+    return app
+
+def scan_result(*repositories):
+    return {"scan_time": "2024-01-01T00:00:00", "git_repositories": [dict(r) for r in repositories],
+            "non_git_directories": []}
+
+def test_scans_that_only_refresh_other_fields_are_not_logged(app_module):
+    app_module.store_scan_results(["/work"], scan_result(repo("a", "/work/a", last_modified=1)))
+    summary, _ = app_module.store_scan_results(["/work"], scan_result(repo("a", "/work/a", last_modified=2)))
+
+    assert summary["generation"] == 2
+    assert [r["generation"] for r in app_module.scan_change_log.get_records()] == [1]
+
+@pytest.mark.parametrize("limit, expected", [("0", [3]), ("-5", [3]), ("2", [2, 3])])
+def test_scan_changes_limit_is_clamped(app_module, limit, expected):
+    for generation in range(1, 4):
+        app_module.scan_change_log.append({"generation": generation})
+
+    response = app_module.app.test_client().get(f"/api/scan/changes?limit={limit}")
+
+    assert [r["generation"] for r in response.get_json()] == expected
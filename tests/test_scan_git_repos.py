@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import scan_git_repos
+
+def run(capsys, *argv):
+    status = scan_git_repos.main([*argv, "--jobs", "1"])
+    out, err = capsys.readouterr()
+    return status, out, json.loads(err.strip().splitlines()[-1])
+
+def test_streams_one_ndjson_record_per_repository(git_tree, capsys):
+    status, out, summary = run(capsys, str(git_tree))
+
+    records = [json.loads(line) for line in out.splitlines()]
+    assert status == scan_git_repos.EXIT_OK
+    assert sorted(r["path"] for r in records) == sorted(
+        str(git_tree / name) for name in ("alpha", "group/beta", "group/nested/gamma"))
+    assert all(r["current_branch"] and "error" not in r for r in records)
+    assert summary["repositories"] == 3
+    assert summary["errors"] == 0
+
+def test_incremental_run_reuses_unchanged_records(git_tree, tmp_path, capsys):
+    _, out, _ = run(capsys, str(git_tree))
+    previous = tmp_path / "previous.ndjson"
+    previous.write_text(out)
+
+    status, _, summary = run(capsys, str(git_tree), "--incremental", "--previous", str(previous))
+
+    assert status == scan_git_repos.EXIT_OK
+    assert summary["reused"] == 3
+    assert summary["read"] == 0
+
+def test_missing_scan_path_exits_with_errors(git_tree, tmp_path, capsys):
+    status, out, summary = run(capsys, str(git_tree), str(tmp_path / "missing"))
+
+    assert status == scan_git_repos.EXIT_ERRORS
+    assert len(out.splitlines()) == 3
+    assert summary["errors"] == 1
+
+def test_usage_errors_exit_with_status_2(capsys):
+    with pytest.raises(SystemExit) as exc:
+        scan_git_repos.main(["--previous", "last.ndjson"])
+
+    assert exc.value.code == scan_git_repos.EXIT_USAGE
+
+def test_read_only_run_does_not_write_the_config(git_tree, data_dir, capsys):
+    run(capsys, str(git_tree))
+
+    assert not (data_dir / "config.json").exists()
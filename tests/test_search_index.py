@@ -0,0 +1,81 @@
+import pytest
+
+from modules.config import ConfigManager
+from modules.inventory import InventoryStore
+from modules.search_index import SearchIndex
+
+def repo(name, **fields):
+    record = {"id": name, "path": f"/work/{name}", "name": name, "status": "Clean"}
+    record.update(fields)
+    return record
+
+def scan(*repositories, non_git=()):
+    return {
+        "scan_time": "2024-01-01T00:00:00",
+        "scan_directory": "/work",
+        "git_repositories": [dict(r) for r in repositories],
+        "non_git_directories": list(non_git),
+    }
+
+@pytest.fixture
+def inventory():
+    return InventoryStore(ConfigManager())
+
+@pytest.fixture
+def index(tmp_path, inventory):
+    index = SearchIndex(tmp_path / "search.db")
+    index.attach(inventory)
+    return index
+
+def ids(index, query):
+    return [r["id"] for r in index.search(query)["results"]]
+
+@pytest.fixture
+def no_rebuild(index, monkeypatch):
+    """Fail the test if a query has to rebuild the index instead of using the listener's updates"""
+    def rebuild(*args, **kwargs):
+        raise AssertionError("search index was rebuilt")
+    monkeypatch.setattr(index, "rebuild", rebuild)
+
+def test_scans_are_indexed_incrementally(inventory, index, no_rebuild):
+    inventory.replace_scan(scan(repo("sentinel"), repo("dotfiles")))
+    assert ids(index, "sentinel") == ["sentinel"]
+
+    inventory.replace_scan(scan(repo("sentinel", description="repository dashboard"), repo("dotfiles")))
+
+    assert ids(index, "dashboard") == ["sentinel"]
+
+def test_removed_repositories_leave_the_index(inventory, index, no_rebuild):
+    inventory.replace_scan(scan(repo("sentinel"), repo("dotfiles")))
+
+    inventory.replace_scan(scan(repo("dotfiles")))
+
+    assert ids(index, "sentinel") == []
+    assert ids(index, "dotfiles") == ["dotfiles"]
+
+def test_generation_only_writes_do_not_force_a_rebuild(inventory, index, no_rebuild):
+    inventory.replace_scan(scan(repo("sentinel")))
+
+    inventory.replace_scan(scan(repo("sentinel"), non_git=[{"path": "/work/notes"}]))
+
+    assert inventory.get_generation() == 2
+    assert ids(index, "sentinel") == ["sentinel"]
+
+def test_terms_match_substrings_in_any_column(inventory, index):
+    inventory.replace_scan(scan(
+        repo("sentinel", remotes=[{"name": "origin", "fetch_url": "git@github.com:arunsanna/sentinel.git"}]),
+        repo("dotfiles", commit_subjects=["Add zsh prompt"]),
+    ))
+
+    assert ids(index, "ntine") == ["sentinel"]
+    assert ids(index, "arunsanna") == ["sentinel"]
+    assert ids(index, "ZSH prompt") == ["dotfiles"]
+    # Terms shorter than a trigram fall back to a substring match
+    assert ids(index, "do") == ["dotfiles"]
+
+def test_lagging_index_is_rebuilt_from_the_inventory(tmp_path, inventory):
+    inventory.replace_scan(scan(repo("sentinel")))
+    index = SearchIndex(tmp_path / "search.db")
+    index.attach(inventory)
+
+    assert ids(index, "sentinel") == ["sentinel"]
@@ -0,0 +1,68 @@
+from modules.status_history import DAY, HOUR, STATUS_CODES, StatusHistory
+
+START = 1_700_000_000 - 1_700_000_000 % DAY
+
+def record(history, status, ts, ahead=0, repo_id="a"):
+    return history.record([{"id": repo_id, "status": status, "ahead": ahead, "behind": 0}], timestamp=ts)
+
+def statuses(series):
+    return [STATUS_CODES[code] for code in series["status"]]
+
+def test_only_transitions_are_recorded(tmp_path):
+    history = StatusHistory(tmp_path / "history.bin")
+
+    assert record(history, "Clean", START) == 1
+    assert record(history, "Clean", START + 60) == 0
+    assert record(history, "Changed", START + 120) == 1
+
+    series = history.query(since=START, until=START + HOUR)["repositories"]["a"]
+    assert series["ts"] == [START, START + 120]
+    assert statuses(series) == ["Clean", "Changed"]
+
+def test_aged_points_are_downsampled_to_hours_then_days(tmp_path):
+    history = StatusHistory(tmp_path / "history.bin")
+    # Several transitions inside one hour keep only the last state of that hour
+    record(history, "Clean", START + 10)
+    record(history, "Changed", START + 20)
+    record(history, "Ahead", START + 30, ahead=1)
+
+    record(history, "Clean", START + 3 * DAY)
+    repo = history._repos["a"]
+    assert list(repo.hourly.ts) == [START]
+    assert list(repo.hourly.status) == [STATUS_CODES.index("Ahead")]
+
+    record(history, "Changed", START + 40 * DAY)
+    assert list(repo.daily.ts) == [START, START + 3 * DAY]
+    assert statuses({"status": repo.daily.status}) == ["Ahead", "Clean"]
+    assert len(repo.hourly) == 0
+
+def test_raw_tier_overflow_moves_to_hourly(tmp_path, monkeypatch):
+    monkeypatch.setattr(StatusHistory, "RAW_CAPACITY", 4)
+    history = StatusHistory(tmp_path / "history.bin")
+
+    for index in range(10):
+        record(history, "Ahead", START + index * HOUR, ahead=index + 1)
+
+    repo = history._repos["a"]
+    assert len(repo.raw) == 4
+    assert list(repo.hourly.ts) == [START + index * HOUR for index in range(6)]
+
+def test_query_carries_state_from_before_the_window(tmp_path):
+    history = StatusHistory(tmp_path / "history.bin")
+    record(history, "Behind", START)
+    record(history, "Clean", START + 10 * HOUR)
+
+    series = history.query(since=START + HOUR, until=START + 20 * HOUR)["repositories"]["a"]
+
+    assert series["ts"] == [START + HOUR, START + 10 * HOUR]
+    assert statuses(series) == ["Behind", "Clean"]
+
+def test_history_survives_reload(tmp_path):
+    path = tmp_path / "history.bin"
+    history = StatusHistory(path)
+    record(history, "Clean", START)
+    record(history, "Removed", START + HOUR)
+
+    series = StatusHistory(path).query(since=START, until=START + DAY)["repositories"]["a"]
+
+    assert statuses(series) == ["Clean", "Removed"]
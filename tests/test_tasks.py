@@ -0,0 +1,63 @@
+import itertools
+
+import pytest
+
+from modules import tasks
+from modules.config import defaults
+
+class FakeResult:
+    """An AsyncResult that finishes with `value`, or never when value is None"""
+    ids = itertools.count(1)
+
+    def __init__(self, value=None):
+        self.id = f"task-{next(self.ids)}"
+        self.value = value
+        self.state = "PENDING" if value is None else "SUCCESS"
+        self.info = None
+        self.revoked = False
+
+    def ready(self):
+        return self.value is not None
+
+    def get(self, propagate=True):
+        return self.value
+
+    def revoke(self):
+        self.revoked = True
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    """Replace task dispatch; walks return `walk_result`, enrichments never finish"""
+    results = {"walks": [], "enrichments": [], "walk_result": None}
+
+    def walk(shard, *args):
+        result = FakeResult(None if results["walk_result"] is None else [f"{shard}/repo"])
+        results["walks"].append(result)
+        return result
+
+    def enrich(chunk, config):
+        result = FakeResult()
+        results["enrichments"].append(result)
+        return result
+
+    monkeypatch.setattr(tasks.scan_shard, "delay", walk)
+    monkeypatch.setattr(tasks.enrich_repositories, "delay", enrich)
+    monkeypatch.setattr(tasks, "POLL_INTERVAL", 0.001)
+    return results
+
+def test_timed_out_walks_are_revoked(git_tree, dispatched):
+    with pytest.raises(TimeoutError):
+        tasks.distributed_scan(str(git_tree), defaults(), 5, timeout=-1)
+
+    assert len(dispatched["walks"]) == 3
+    assert all(result.revoked for result in dispatched["walks"])
+
+def test_timed_out_enrichments_are_revoked(git_tree, dispatched):
+    dispatched["walk_result"] = True
+
+    with pytest.raises(TimeoutError):
+        tasks.distributed_scan(str(git_tree), defaults(), 5, timeout=0.01)
+
+    assert len(dispatched["enrichments"]) == 3
+    assert all(result.revoked for result in dispatched["enrichments"])
+    assert not any(result.revoked for result in dispatched["walks"])
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from modules import writer
+
+@pytest.fixture
+def app_module():
+    import app
+    return app
+
+@pytest.fixture
+def fake_writer(tmp_path):
+    """A writer on a unix socket that answers every request with its own path"""
+    socket_path = str(tmp_path / "writer.sock")
+    seen = []
+
+    def application(environ, start_response):
+        seen.append(environ["PATH_INFO"])
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"writer:" + environ["PATH_INFO"].encode()]
+
+    server = make_server(f"unix://{socket_path}", 0, application, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path, seen
+    server.shutdown()
+
+@pytest.fixture
+def reader(app_module, fake_writer, monkeypatch):
+    socket_path, seen = fake_writer
+    monkeypatch.setattr(app_module, "role", writer.READER)
+    monkeypatch.setattr(app_module, "writer_socket", socket_path)
+    return app_module.app.test_client(), seen
+
+def test_reader_forwards_metrics_to_the_writer(reader):
+    client, seen = reader
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.data == b"writer:/metrics"
+    assert seen == ["/metrics"]
+
+def test_reader_answers_read_only_routes_itself(reader):
+    client, seen = reader
+
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/api/repositories").status_code == 200
+    assert seen == []
+
+def test_reader_forwards_writes_and_debug_routes(reader):
+    client, seen = reader
+
+    client.post("/api/scan/paths", json={})
+    client.get("/api/debug/trace/abc")
+
+    assert seen == ["/api/scan/paths", "/api/debug/trace/abc"]
+
+def test_unreachable_writer_is_a_502(app_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "role", writer.READER)
+    monkeypatch.setattr(app_module, "writer_socket", str(tmp_path / "missing.sock"))
+
+    assert app_module.app.test_client().get("/metrics").status_code == 502
+
+def test_writer_lock_is_exclusive(tmp_path):
+    first = writer.WriterLock(str(tmp_path / "writer.lock"))
+    second = writer.WriterLock(str(tmp_path / "writer.lock"))
+
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()